@@ -133,6 +133,7 @@ class SubscriptionForm(forms.ModelForm):
             'subscribe_new_contributor',
             'subscribe_new_comment',
             'subscribe_merge_failure',
+            'digest_notifications',
         )
         widgets = {
             'subscriptions': forms.CheckboxSelectMultiple
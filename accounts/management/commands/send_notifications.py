@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from django.core.management.base import BaseCommand
+from accounts.models import Notification, dispatch_notifications
+
+
+class Command(BaseCommand):
+    help = 'sends queued notifications'
+
+    def handle(self, *args, **options):
+        # Grab all queued notifications from the database
+        notifications = list(Notification.objects.prefetch())
+        if not notifications:
+            return
+
+        # Send them out
+        dispatch_notifications(notifications)
+
+        # Delete processed notifications, these are ordered by id and
+        # anything queued meanwhile has higher id
+        Notification.objects.filter(id__lte=notifications[-1].id).delete()
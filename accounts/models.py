@@ -30,17 +30,32 @@ from django.db.models.signals import post_syncdb
 from registration.signals import user_registered
 from django.contrib.sites.models import Site
 from django.utils import translation as django_translation
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string, get_template
+from django.template import Context
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.core.mail import mail_admins
+from django.db.models import Min
+from django.utils import timezone
 
 from south.signals import post_migrate
 
 from lang.models import Language
-from trans.models import Project, Change
+from trans.models import Project, Change, Unit, Translation
 from trans.util import get_user_display, get_site_url
+from weblate import appsettings
+from copy import copy
 import weblate
 
+# Notifications which can be sent in digest
+DIGEST_NOTIFICATIONS = (
+    ('new_translation', _('New translation')),
+    ('changed_translation', _('Changed translation')),
+    ('new_string', _('New string to translate')),
+    ('new_suggestion', _('New suggestion')),
+    ('new_contributor', _('New contributor')),
+    ('new_comment', _('New comment')),
+)
+
 
 def notify_merge_failure(subproject, error, status):
     '''
@@ -77,17 +92,132 @@ def notify_new_string(translation):
         subscription.notify_new_string(translation)
 
 
-def notify_new_translation(unit, oldunit, user):
+def notify_new_translation(unit, user):
     '''
-    Notify subscribed users about new translation
+    Notify subscribed users about new translation.
+
+    The change is only queued when notifications are offloaded, otherwise
+    it is dispatched immediately.
     '''
-    subscriptions = Profile.objects.subscribed_any_translation(
-        unit.translation.subproject.project,
-        unit.translation.language,
-        user
+    notification = Notification(
+        unit=unit,
+        user=user,
+        target=unit.target,
+        old_target=unit.old_target,
+        old_translated=unit.old_translated,
+        timestamp=timezone.now(),
     )
-    for subscription in subscriptions:
-        subscription.notify_any_translation(unit, oldunit)
+    if appsettings.OFFLOAD_NOTIFICATIONS:
+        notification.save()
+    else:
+        dispatch_notifications([notification])
+
+
+def mark_new_contributors(notifications):
+    '''
+    Sets new_contributor flag on notifications which are first change of
+    the user in the translation.
+    '''
+    if not notifications:
+        return
+
+    first = {}
+    for notification in notifications:
+        notification.new_contributor = False
+        key = (notification.unit.translation_id, notification.user_id)
+        if key not in first or first[key].timestamp > notification.timestamp:
+            first[key] = notification
+
+    # Get time of first change for all users and translations at once
+    changes = Change.objects.filter(
+        translation__in=set([key[0] for key in first]),
+        user__in=set([key[1] for key in first]),
+    ).values('translation', 'user').annotate(Min('timestamp')).order_by()
+    previous = dict([
+        ((item['translation'], item['user']), item['timestamp__min'])
+        for item in changes
+    ])
+
+    for key, notification in first.items():
+        if key not in previous or previous[key] >= notification.timestamp:
+            notification.new_contributor = True
+
+
+def dispatch_notifications(notifications):
+    '''
+    Sends notifications about translation changes.
+
+    Subscribers are looked up once for every project and language and all
+    mails are sent using single connection.
+    '''
+    # Group changes by project and language
+    groups = {}
+    for notification in notifications:
+        translation = notification.unit.translation
+        key = (translation.subproject.project_id, translation.language_id)
+        groups.setdefault(key, []).append(notification)
+
+    # Lookup subscribers
+    subscribers = []
+    watched = []
+    for group in groups.values():
+        translation = group[0].unit.translation
+        project = translation.subproject.project
+        language = translation.language
+        translators = list(
+            Profile.objects.subscribed_any_translation(
+                project, language
+            ).select_related('user')
+        )
+        watchers = list(
+            Profile.objects.subscribed_new_contributor(
+                project, language
+            ).select_related('user')
+        )
+        if watchers:
+            watched.extend(group)
+        subscribers.append((group, translators, watchers))
+
+    mark_new_contributors(watched)
+
+    # Prepare list of mails to send
+    pending = []
+    for group, translators, watchers in subscribers:
+        for notification in group:
+            # Unit might have been changed again since the notification
+            # was queued, render stored targets
+            unit = copy(notification.unit)
+            unit.target = notification.target
+            oldunit = copy(unit)
+            oldunit.target = notification.old_target
+            oldunit.translated = notification.old_translated
+
+            for profile in translators:
+                if profile.user_id != notification.user_id:
+                    pending.append(
+                        (profile.notify_any_translation, (unit, oldunit))
+                    )
+
+            if not getattr(notification, 'new_contributor', False):
+                continue
+
+            for profile in watchers:
+                if profile.user_id != notification.user_id:
+                    pending.append((
+                        profile.notify_new_contributor,
+                        (unit.translation, notification.user)
+                    ))
+
+    if not pending:
+        return
+
+    connection = get_connection()
+    connection.open()
+    try:
+        for method, args in pending:
+            method(*args, connection=connection)
+    finally:
+        connection.close()
 
 
 def notify_new_contributor(unit, user):
@@ -150,8 +280,19 @@ def notify_new_comment(unit, comment, user, report_source_bugs):
         )
 
 
+def add_notification_headers(headers):
+    '''
+    Adds headers marking automatically generated notification.
+    '''
+    headers['Auto-Submitted'] = 'auto-generated'
+    headers['X-AutoGenerated'] = 'yes'
+    headers['Precedence'] = 'bulk'
+    headers['X-Mailer'] = 'Weblate %s' % weblate.VERSION
+
+
 def send_notification_email(language, email, notification, translation_obj,
-                            context=None, headers=None, from_email=None):
+                            context=None, headers=None, from_email=None,
+                            connection=None):
     '''
     Renders and sends notification email.
     '''
@@ -194,10 +335,7 @@ def send_notification_email(language, email, notification, translation_obj,
         html_body = render_to_string(html_body_template, context)
 
         # Define headers
-        headers['Auto-Submitted'] = 'auto-generated'
-        headers['X-AutoGenerated'] = 'yes'
-        headers['Precedence'] = 'bulk'
-        headers['X-Mailer'] = 'Weblate %s' % weblate.VERSION
+        add_notification_headers(headers)
 
         if email == 'ADMINS':
             # Special handling for ADMINS
@@ -214,6 +352,7 @@ def send_notification_email(language, email, notification, translation_obj,
                 to=[email],
                 headers=headers,
                 from_email=from_email,
+                connection=connection,
             )
             email.attach_alternative(
                 html_body,
@@ -226,18 +365,118 @@ def send_notification_email(language, email, notification, translation_obj,
         django_translation.activate(cur_language)
 
 
+def get_digest_translations(profile, entries):
+    '''
+    Groups digest entries by translation, skipping the ones user is no
+    longer allowed to access.
+    '''
+    result = []
+    positions = {}
+    for entry in entries:
+        if entry.translation_id not in positions:
+            if not entry.translation.has_acl(profile.user):
+                continue
+            positions[entry.translation_id] = len(result)
+            result.append((entry.translation, []))
+        result[positions[entry.translation_id]][1].append(entry)
+    return result
+
+
+def send_digests(entries):
+    '''
+    Renders and sends digests of queued notifications.
+
+    Templates are compiled once, subject is rendered once per language and
+    all mails are sent using single connection.
+    '''
+    # Group entries by user and users by language
+    profiles = {}
+    for entry in entries:
+        if entry.profile_id not in profiles:
+            profiles[entry.profile_id] = (entry.profile, [])
+        profiles[entry.profile_id][1].append(entry)
+    languages = {}
+    for profile, profile_entries in profiles.values():
+        languages.setdefault(profile.language, []).append(
+            (profile, profile_entries)
+        )
+    if not languages:
+        return
+
+    # Load templates
+    subject_template = 'mail/digest_subject.txt'
+    subject_tpl = get_template(subject_template)
+    body_tpl = get_template('mail/digest.txt')
+    html_body_tpl = get_template('mail/digest.html')
+
+    # Context shared by all mails
+    site = Site.objects.get_current()
+    base_context = {
+        'current_site': site.domain,
+        'site': site,
+        'subject_template': subject_template,
+    }
+
+    cur_language = django_translation.get_language()
+    connection = get_connection()
+    connection.open()
+    try:
+        for language, items in languages.items():
+            django_translation.activate(language)
+
+            subject = subject_tpl.render(Context(base_context)).strip()
+
+            mails = []
+            for profile, profile_entries in items:
+                translations = get_digest_translations(
+                    profile, profile_entries
+                )
+                if not translations:
+                    continue
+
+                context = Context(base_context)
+                context['translations'] = translations
+
+                headers = {}
+                add_notification_headers(headers)
+
+                email = EmailMultiAlternatives(
+                    settings.EMAIL_SUBJECT_PREFIX + subject,
+                    body_tpl.render(context),
+                    to=[profile.user.email],
+                    headers=headers,
+                    connection=connection,
+                )
+                email.attach_alternative(
+                    html_body_tpl.render(context),
+                    'text/html'
+                )
+                mails.append(email)
+
+            weblate.logger.info(
+                'sending %d notification digests in %s',
+                len(mails),
+                language
+            )
+            connection.send_messages(mails)
+    finally:
+        connection.close()
+        django_translation.activate(cur_language)
+
+
 class ProfileManager(models.Manager):
     '''
     Manager providing shortcuts for subscription queries.
     '''
-    def subscribed_any_translation(self, project, language, user):
-        return self.filter(
+    def subscribed_any_translation(self, project, language, user=None):
+        ret = self.filter(
             subscribe_any_translation=True,
             subscriptions=project,
             languages=language
-        ).exclude(
-            user=user
         )
+        if user is not None:
+            ret = ret.exclude(user=user)
+        return ret
 
     def subscribed_new_string(self, project, language):
         return self.filter(
@@ -257,14 +496,15 @@ class ProfileManager(models.Manager):
             ret = ret.exclude(user=user)
         return ret
 
-    def subscribed_new_contributor(self, project, language, user):
-        return self.filter(
+    def subscribed_new_contributor(self, project, language, user=None):
+        ret = self.filter(
             subscribe_new_contributor=True,
             subscriptions=project,
             languages=language
-        ).exclude(
-            user=user
         )
+        if user is not None:
+            ret = ret.exclude(user=user)
+        return ret
 
     def subscribed_new_comment(self, project, language, user):
         ret = self.filter(
@@ -335,6 +575,10 @@ class Profile(models.Model):
         verbose_name=_('Notification on merge failure'),
         default=False
     )
+    digest_notifications = models.BooleanField(
+        verbose_name=_('Send notifications as periodic digest'),
+        default=False
+    )
 
     objects = ProfileManager()
 
@@ -369,7 +613,7 @@ class Profile(models.Model):
             return None
 
     def notify_user(self, notification, translation_obj,
-                    context=None, headers=None):
+                    context=None, headers=None, connection=None):
         '''
         Wrapper for sending notifications to user.
         '''
@@ -381,6 +625,13 @@ class Profile(models.Model):
         # Check whether user is still allowed to access this project
         if not translation_obj.has_acl(self.user):
             return
+        # Queue notification for digest
+        digest = dict(DIGEST_NOTIFICATIONS)
+        if self.digest_notifications and notification in digest:
+            DigestEntry.objects.queue(
+                self, notification, translation_obj, context
+            )
+            return
         # Actually send notification
         send_notification_email(
             self.language,
@@ -388,10 +639,11 @@ class Profile(models.Model):
             notification,
             translation_obj,
             context,
-            headers
+            headers,
+            connection=connection,
         )
 
-    def notify_any_translation(self, unit, oldunit):
+    def notify_any_translation(self, unit, oldunit, connection=None):
         '''
         Sends notification on translation.
         '''
@@ -405,7 +657,8 @@ class Profile(models.Model):
             {
                 'unit': unit,
                 'oldunit': oldunit,
-            }
+            },
+            connection=connection,
         )
 
     def notify_new_string(self, translation):
@@ -430,7 +683,7 @@ class Profile(models.Model):
             }
         )
 
-    def notify_new_contributor(self, translation, user):
+    def notify_new_contributor(self, translation, user, connection=None):
         '''
         Sends notification on new contributor.
         '''
@@ -439,7 +692,8 @@ class Profile(models.Model):
             translation,
             {
                 'user': user,
-            }
+            },
+            connection=connection,
         )
 
     def notify_new_comment(self, unit, comment):
@@ -477,6 +731,97 @@ class Profile(models.Model):
         return self.user.get_full_name()
 
 
+class NotificationManager(models.Manager):
+    def prefetch(self):
+        '''
+        Fetches related objects needed for dispatching notifications.
+        '''
+        return self.select_related(
+            'user',
+            'unit__translation__language',
+            'unit__translation__subproject__project',
+        )
+
+
+class Notification(models.Model):
+    '''
+    Translation change waiting for notifications to be sent.
+    '''
+    unit = models.ForeignKey(Unit)
+    user = models.ForeignKey(User)
+    target = models.TextField(default='', blank=True)
+    old_target = models.TextField(default='', blank=True)
+    old_translated = models.BooleanField(default=False)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    objects = NotificationManager()
+
+    class Meta:
+        ordering = ['id']
+
+    def __unicode__(self):
+        return u'%s: %s' % (self.user.username, self.unit)
+
+
+class DigestEntryManager(models.Manager):
+    def queue(self, profile, notification, translation, context):
+        '''
+        Stores notification to be sent in digest.
+        '''
+        if 'suggestion' in context:
+            text = context['suggestion'].target
+        elif 'comment' in context:
+            text = context['comment'].comment
+        elif 'unit' in context:
+            text = context['unit'].target
+        else:
+            text = ''
+        return self.create(
+            profile=profile,
+            notification=notification,
+            translation=translation,
+            unit=context.get('unit'),
+            user=context.get('user'),
+            text=text,
+        )
+
+    def prefetch(self):
+        '''
+        Fetches related objects needed for rendering digests.
+        '''
+        return self.select_related(
+            'profile__user',
+            'translation__language',
+            'translation__subproject__project',
+            'unit',
+            'user',
+        )
+
+
+class DigestEntry(models.Model):
+    '''
+    Notification waiting to be sent in digest.
+    '''
+    profile = models.ForeignKey(Profile)
+    notification = models.CharField(
+        max_length=50,
+        choices=DIGEST_NOTIFICATIONS
+    )
+    translation = models.ForeignKey(Translation)
+    unit = models.ForeignKey(Unit, null=True, blank=True)
+    user = models.ForeignKey(User, null=True, blank=True)
+    text = models.TextField(default='', blank=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    objects = DigestEntryManager()
+
+    class Meta:
+        ordering = ['id']
+
+    def __unicode__(self):
+        return u'%s: %s' % (self.profile, self.notification)
+
+
 @receiver(user_logged_in)
 def set_lang(sender, **kwargs):
     '''
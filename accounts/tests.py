@@ -30,6 +30,8 @@ from django.conf import settings
 from django.core.management import call_command
 from accounts.models import (
     Profile,
+    Notification,
+    DigestEntry,
     notify_merge_failure,
     notify_new_string,
     notify_new_suggestion,
@@ -39,6 +41,7 @@ from accounts.models import (
 )
 
 from trans.tests.views import ViewTestCase
+from weblate import appsettings
 from trans.models.unitdata import Suggestion, Comment
 from lang.models import Language
 
@@ -302,21 +305,77 @@ class NotificationTest(ViewTestCase):
 
     def test_notify_new_translation(self):
         unit = self.get_unit()
-        unit2 = self.get_translation().unit_set.get(
-            source='Thank you for using Weblate.'
-        )
+        unit.old_translated = False
         notify_new_translation(
             unit,
-            unit2,
             self.second_user()
         )
 
+        # Check mail (second user is also new contributor)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            mail.outbox[0].subject,
+            '[Weblate] New translation in Test/Test - Czech'
+        )
+        self.assertEqual(
+            mail.outbox[1].subject,
+            '[Weblate] New contributor in Test/Test - Czech'
+        )
+
+    def test_notify_queued(self):
+        unit = self.get_unit()
+        unit.old_translated = False
+        second_user = self.second_user()
+        appsettings.OFFLOAD_NOTIFICATIONS = True
+        try:
+            unit.target = u'Ahoj svete!\n'
+            notify_new_translation(unit, second_user)
+            unit.target = u'Nazdar svete!\n'
+            notify_new_translation(unit, second_user)
+        finally:
+            appsettings.OFFLOAD_NOTIFICATIONS = False
+
+        # Nothing is sent until queue is processed
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Notification.objects.count(), 2)
+
+        call_command('send_notifications')
+
+        # Contributor is notified only once
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(Notification.objects.count(), 0)
+
+        # Every mail shows translation as it was queued
+        bodies = [
+            message.body for message in mail.outbox
+            if 'New translation' in message.subject
+        ]
+        self.assertEqual(len(bodies), 2)
+        self.assertIn('Ahoj svete!', bodies[0])
+        self.assertIn('Nazdar svete!', bodies[1])
+
+    def test_notify_digest(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.digest_notifications = True
+        profile.save()
+
+        notify_new_string(self.get_translation())
+        notify_new_contributor(self.get_unit(), self.second_user())
+
+        # Notifications are queued
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(DigestEntry.objects.count(), 2)
+
+        call_command('send_digest')
+
         # Check mail
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(
             mail.outbox[0].subject,
-            '[Weblate] New translation in Test/Test - Czech'
+            '[Weblate] Notifications digest'
         )
+        self.assertIn('New contributor', mail.outbox[0].body)
+        self.assertEqual(DigestEntry.objects.count(), 0)
 
     def test_notify_new_contributor(self):
         unit = self.get_unit()
@@ -407,7 +407,7 @@ class Language(models.Model, PercentMixin):
         from trans.models.translation import Translation
 
         # Get prercents
-        result = Translation.objects.get_percents(language=self)
+        result = Translation.objects.get_cached_percents(language=self)
 
         # Update cache
         self._percents = result
@@ -28,6 +28,7 @@ from django.contrib import messages
 from django.conf import settings
 from weblate import appsettings
 from trans.util import HAS_LIBRAVATAR
+from trans.instrumentation import get_totals
 from accounts.forms import HAS_ICU
 import weblate
 
@@ -130,6 +131,7 @@ def performance(request):
             request,
             {
                 'checks': checks,
+                'totals': get_totals(),
             }
         )
     )
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Benchmarking of performance critical code paths.
+
+Synthetic repositories in several file formats are generated and used to
+measure importing of translation files, saving of translations, quality
+checks and fulltext search.
+'''
+
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test.client import RequestFactory
+from xml.sax.saxutils import escape
+from accounts.models import Profile
+from lang.data import DEFAULT_LANGS
+from trans.instrumentation import Instrumentation
+from trans.models import Project, SubProject, Unit
+from trans.search import flush_index
+import math
+import os
+import random
+import resource
+import git
+
+# Words used to build synthetic strings
+WORDS = (
+    'account', 'add', 'change', 'check', 'close', 'connection', 'copy',
+    'delete', 'display', 'download', 'edit', 'error', 'file', 'folder',
+    'help', 'image', 'language', 'list', 'message', 'name', 'network',
+    'new', 'open', 'password', 'print', 'project', 'remove', 'save',
+    'search', 'select', 'server', 'settings', 'show', 'start', 'stop',
+    'string', 'translation', 'update', 'user', 'window',
+)
+
+# Endings of synthetic strings, these trigger some of the quality checks
+ENDINGS = ('', '.', '!', ':', '?', '\n')
+
+# File masks and templates used for generated files
+FORMATS = {
+    'po': ('po/*.po', ''),
+    'xliff': ('xliff/*.xlf', ''),
+    'aresource': ('res/values-*/strings.xml', 'res/values/strings.xml'),
+}
+
+PO_HEADER = '''msgid ""
+msgstr ""
+"Project-Id-Version: Benchmark\\n"
+"Language: %s\\n"
+"MIME-Version: 1.0\\n"
+"Content-Type: text/plain; charset=UTF-8\\n"
+"Content-Transfer-Encoding: 8bit\\n"
+'''
+
+PO_UNIT = '''
+#: src/benchmark.c:%(line)d
+msgctxt "%(name)s"
+msgid "%(source)s"
+msgstr "%(target)s"
+'''
+
+XLIFF_HEADER = '''<?xml version="1.0" encoding="utf-8"?>
+<xliff version="1.2" xmlns="urn:oasis:names:tc:xliff:document:1.2">
+<file original="benchmark" source-language="en" target-language="%s" \
+datatype="plaintext">
+<body>
+'''
+
+XLIFF_UNIT = '''<trans-unit id="%(name)s"%(approved)s>
+<source>%(source)s</source>%(target)s
+</trans-unit>
+'''
+
+XLIFF_FOOTER = '''</body>
+</file>
+</xliff>
+'''
+
+ANDROID_HEADER = '''<?xml version="1.0" encoding="utf-8"?>
+<resources>
+'''
+
+ANDROID_UNIT = '''    <string name="%(name)s">%(target)s</string>
+'''
+
+ANDROID_FOOTER = '''</resources>
+'''
+
+
+def get_language_codes(count):
+    '''
+    Returns list of language codes to use in generated repository.
+    '''
+    codes = []
+    for code in DEFAULT_LANGS:
+        code = code.split('_')[0].lower()
+        if code != 'en' and code not in codes:
+            codes.append(code)
+    return codes[:count]
+
+
+def get_words(index):
+    '''
+    Returns words and ending of synthetic string.
+    '''
+    rng = random.Random(index)
+    return rng.sample(WORDS, rng.randint(2, 8)), rng.choice(ENDINGS)
+
+
+def get_source(index):
+    '''
+    Returns synthetic source string, it is the same for every language.
+    '''
+    words, ending = get_words(index)
+    return ' '.join(words).capitalize() + ending
+
+
+def get_target(index, code):
+    '''
+    Returns synthetic translation or empty string for untranslated one.
+    '''
+    rng = random.Random('%s-%d' % (code, index))
+    # Roughly half of strings is translated
+    if rng.random() < 0.5:
+        return ''
+    words, ending = get_words(index)
+    # Occasionally break the translation to trigger checks
+    if rng.random() < 0.1:
+        ending = ''
+    return ' '.join(reversed(words)).upper() + ending
+
+
+def escape_po(text):
+    '''
+    Escapes string for use in PO file.
+    '''
+    return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def escape_android(text):
+    '''
+    Escapes string for use in Android resource file.
+    '''
+    return escape(text).replace('\'', '\\\'').replace('\n', '\\n')
+
+
+def generate_po(code, units):
+    '''
+    Generates Gettext PO file content.
+    '''
+    result = [PO_HEADER % code]
+    for index in xrange(units):
+        result.append(PO_UNIT % {
+            'line': index + 1,
+            'name': 'string%d' % index,
+            'source': escape_po(get_source(index)),
+            'target': escape_po(get_target(index, code)),
+        })
+    return ''.join(result)
+
+
+def generate_xliff(code, units):
+    '''
+    Generates XLIFF file content.
+    '''
+    result = [XLIFF_HEADER % code]
+    for index in xrange(units):
+        target = get_target(index, code)
+        if target:
+            approved = ' approved="yes"'
+            target = '\n<target>%s</target>' % escape(target)
+        else:
+            approved = ''
+        result.append(XLIFF_UNIT % {
+            'name': 'string%d' % index,
+            'approved': approved,
+            'source': escape(get_source(index)),
+            'target': target,
+        })
+    result.append(XLIFF_FOOTER)
+    return ''.join(result)
+
+
+def generate_android(code, units):
+    '''
+    Generates Android resource content, code None generates template.
+    '''
+    result = [ANDROID_HEADER]
+    for index in xrange(units):
+        if code is None:
+            target = get_source(index)
+        else:
+            target = get_target(index, code)
+        if not target:
+            continue
+        result.append(ANDROID_UNIT % {
+            'name': 'string%d' % index,
+            'target': escape_android(target),
+        })
+    result.append(ANDROID_FOOTER)
+    return ''.join(result)
+
+
+def write_file(path, content):
+    '''
+    Writes file, creating directories as needed.
+    '''
+    dirname = os.path.dirname(path)
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+    with open(path, 'w') as handle:
+        handle.write(content)
+
+
+def generate_repo(path, file_format, units, languages):
+    '''
+    Creates local git repository with synthetic translations, returns
+    list of generated language codes.
+    '''
+    codes = get_language_codes(languages)
+    filemask, template = FORMATS[file_format]
+
+    for code in codes:
+        filename = os.path.join(path, filemask.replace('*', code))
+        if file_format == 'po':
+            write_file(filename, generate_po(code, units))
+        elif file_format == 'xliff':
+            write_file(filename, generate_xliff(code, units))
+        else:
+            write_file(filename, generate_android(code, units))
+
+    if template:
+        write_file(
+            os.path.join(path, template),
+            generate_android(None, units)
+        )
+
+    repo = git.Repo.init(path)
+    repo.git.symbolic_ref('HEAD', 'refs/heads/master')
+    repo.git.config('user.name', 'Weblate Benchmark')
+    repo.git.config('user.email', 'noreply@weblate.org')
+    repo.git.add('.')
+    repo.git.commit('-m', 'Synthetic translations')
+    return codes
+
+
+def get_peak_memory():
+    '''
+    Returns peak resident memory of the process in kilobytes.
+    '''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(values, percent):
+    '''
+    Returns percentile of values (using nearest rank method).
+    '''
+    if not values:
+        return 0
+    values = sorted(values)
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(0, index)]
+
+
+class Measurement(object):
+    '''
+    Timings and counters collected for single code path.
+    '''
+    def __init__(self):
+        self.timings = []
+        self.units = 0
+        self.queries = 0
+        self.start_memory = get_peak_memory()
+
+    def measure(self, units, function, *args, **kwargs):
+        '''
+        Invokes function and records its duration, units are used for
+        calculating throughput.
+        '''
+        with Instrumentation() as stats:
+            result = function(*args, **kwargs)
+        self.timings.append(stats.duration)
+        self.units += units
+        self.queries += stats['queries']
+        return result
+
+    def get_result(self):
+        '''
+        Returns summary of collected data.
+        '''
+        total = sum(self.timings)
+        samples = len(self.timings)
+        peak_memory = get_peak_memory()
+        return {
+            'samples': samples,
+            'units': self.units,
+            'time': total,
+            'throughput': self.units / total if total else 0,
+            'latency': {
+                'mean': total / samples if samples else 0,
+                'p50': percentile(self.timings, 50),
+                'p90': percentile(self.timings, 90),
+                'p99': percentile(self.timings, 99),
+                'max': max(self.timings) if samples else 0,
+            },
+            'queries': self.queries,
+            'queries_per_sample': (
+                float(self.queries) / samples if samples else 0
+            ),
+            'peak_memory': peak_memory,
+            'peak_memory_growth': peak_memory - self.start_memory,
+        }
+
+
+class Benchmark(object):
+    '''
+    Runs benchmark of hot paths on generated repositories.
+
+    It works with current database and GIT_ROOT, so these have to be
+    isolated by the caller.
+    '''
+    def __init__(self, path, units=1000, languages=3, iterations=100,
+                 seed=0):
+        self.path = path
+        self.units = units
+        self.languages = languages
+        self.iterations = iterations
+        self.random = random.Random(seed)
+        self.project = None
+        self.user = None
+
+    def setup(self):
+        '''
+        Creates project and user used for benchmarking.
+        '''
+        self.project = Project.objects.create(
+            name='Benchmark',
+            slug='benchmark',
+            web='http://weblate.org/',
+        )
+        self.user = User.objects.create_user(
+            username='benchmark',
+            email='noreply@weblate.org',
+            password='benchmark',
+        )
+        Profile.objects.create(user=self.user)
+
+    def get_request(self):
+        '''
+        Returns fake request object.
+        '''
+        request = RequestFactory().post('/')
+        request.user = self.user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def get_units(self, subproject):
+        '''
+        Returns random sample of subproject units.
+        '''
+        ids = list(
+            Unit.objects.filter(
+                translation__subproject=subproject
+            ).values_list('id', flat=True)
+        )
+        ids = self.random.sample(ids, min(self.iterations, len(ids)))
+        return Unit.objects.filter(id__in=ids).select_related(
+            'translation__subproject__project', 'translation__language'
+        )
+
+    def search(self, translation, query):
+        '''
+        Performs fulltext search within translation.
+        '''
+        return list(translation.unit_set.fulltext(query))
+
+    def run_format(self, file_format):
+        '''
+        Benchmarks single file format, returns dictionary with results.
+        '''
+        repo_path = os.path.join(self.path, 'repo-%s' % file_format)
+        generate_repo(repo_path, file_format, self.units, self.languages)
+        filemask, template = FORMATS[file_format]
+
+        results = {}
+
+        # Initial import of all translations
+        measurement = Measurement()
+        subproject = measurement.measure(
+            self.units * self.languages,
+            SubProject.objects.create,
+            name=file_format,
+            slug=file_format,
+            project=self.project,
+            repo=repo_path,
+            filemask=filemask,
+            template=template,
+            file_format=file_format,
+        )
+        results['import'] = measurement.get_result()
+
+        # Forced reparsing of translation files
+        translations = list(subproject.translation_set.all())
+        measurement = Measurement()
+        for translation in translations:
+            measurement.measure(
+                translation.total,
+                translation.update_from_blob,
+                True
+            )
+        results['update_from_blob'] = measurement.get_result()
+
+        # Saving translations to file and database
+        measurement = Measurement()
+        request = self.get_request()
+        for unit in self.get_units(subproject):
+            unit.target = unit.source.upper()
+            measurement.measure(1, unit.save_backend, request)
+        results['save_backend'] = measurement.get_result()
+
+        # Quality checks
+        measurement = Measurement()
+        for unit in self.get_units(subproject):
+            measurement.measure(1, unit.check)
+        results['check'] = measurement.get_result()
+
+        # Fulltext search
+        flush_index()
+        measurement = Measurement()
+        for dummy in xrange(self.iterations):
+            measurement.measure(
+                1,
+                self.search,
+                self.random.choice(translations),
+                self.random.choice(WORDS)
+            )
+        results['fulltext'] = measurement.get_result()
+
+        return results
+
+    def run(self, formats):
+        '''
+        Runs benchmark for given file formats.
+        '''
+        self.setup()
+        return dict([
+            (file_format, self.run_format(file_format))
+            for file_format in formats
+        ])
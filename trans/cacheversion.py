@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Versioned cache namespaces.
+
+Cache keys can depend on version of project, subproject or translation
+namespace. Increasing the version invalidates all keys within the
+namespace at once, without need to know or delete them.
+'''
+
+from django.core.cache import cache
+import time
+
+# How long are namespace versions kept, entries stored under expired
+# version are not reused as new version is always unique
+VERSION_TIMEOUT = 30 * 86400
+
+
+def get_version_key(namespace):
+    '''
+    Returns cache key storing version of namespace, which is tuple
+    (scope, object id), for example ('project', 1).
+    '''
+    return 'version-%s-%s' % namespace
+
+
+def get_versions(namespaces):
+    '''
+    Returns list of current versions for namespaces.
+
+    All versions are fetched by single cache request, missing ones are
+    created.
+    '''
+    keys = [get_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    missing = {}
+    for key in keys:
+        if key not in versions:
+            missing[key] = versions[key] = int(time.time() * 1000)
+    if missing:
+        cache.set_many(missing, VERSION_TIMEOUT)
+    return [versions[key] for key in keys]
+
+
+def get_versioned_keys(items):
+    '''
+    Returns list of versioned cache keys for list of tuples (key,
+    namespaces).
+    '''
+    namespaces = []
+    for key, item_namespaces in items:
+        for namespace in item_namespaces:
+            if namespace not in namespaces:
+                namespaces.append(namespace)
+    versions = dict(zip(namespaces, get_versions(namespaces)))
+
+    result = []
+    for key, item_namespaces in items:
+        for namespace in item_namespaces:
+            key += '-%s%s.%d' % (namespace + (versions[namespace],))
+        result.append(key)
+    return result
+
+
+def get_versioned_key(key, namespaces):
+    '''
+    Returns cache key valid within current version of namespaces.
+    '''
+    return get_versioned_keys([(key, namespaces)])[0]
+
+
+def invalidate_namespaces(namespaces):
+    '''
+    Invalidates all cache entries within namespaces.
+    '''
+    for namespace in namespaces:
+        try:
+            cache.incr(get_version_key(namespace))
+        except ValueError:
+            # Version is not stored, next access will create new one
+            pass
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+In memory index of dictionary terms.
+
+Terms are normalized to sequences of lowercased stemmed words and matched
+against texts using Aho-Corasick automaton over words, so that looking up
+dictionary entries for a string needs single linear scan regardless of
+dictionary size. This matches multi word phrases as well.
+
+Index is built per project and language and kept in process memory, its
+validity is checked against versioned cache namespace.
+'''
+
+from collections import OrderedDict, deque
+from whoosh.analysis import RegexTokenizer, LowercaseFilter, StemFilter
+from django.utils.encoding import force_unicode
+from trans.cacheversion import get_versions, invalidate_namespaces
+import threading
+
+# Number of indexes kept in process memory
+MAX_ITEMS = 50
+
+# Splits text to lowercased stemmed words
+ANALYZER = RegexTokenizer() | LowercaseFilter() | StemFilter()
+
+
+def get_words(text):
+    '''
+    Returns tuple of normalized words in text.
+
+    Analyzer works on unicode only, so byte strings are decoded as UTF-8.
+    '''
+    return tuple([token.text for token in ANALYZER(force_unicode(text))])
+
+
+def get_namespace(project_id, language_id):
+    '''
+    Returns cache namespace for dictionary.
+    '''
+    return ('dictionary', '%d-%d' % (project_id, language_id))
+
+
+def invalidate_dictionary_index(project_id, language_id):
+    '''
+    Invalidates index in all processes.
+    '''
+    invalidate_namespaces([get_namespace(project_id, language_id)])
+
+
+class DictionaryIndex(object):
+    '''
+    Aho-Corasick automaton matching dictionary terms.
+    '''
+
+    def __init__(self, entries):
+        # List of (source, target) tuples
+        self.entries = []
+        # Transitions, failure links and matched entries for every state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for source, target in entries:
+            words = get_words(source)
+            if not words:
+                continue
+            self.add(words, len(self.entries))
+            self.entries.append((source, target))
+
+        self.link()
+
+    def add(self, words, position):
+        '''
+        Adds term to the trie.
+        '''
+        state = 0
+        for word in words:
+            if word not in self.goto[state]:
+                self.goto[state][word] = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = self.goto[state][word]
+        self.output[state].append(position)
+
+    def link(self):
+        '''
+        Calculates failure links using breadth first walk through the trie.
+        '''
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, target in self.goto[state].iteritems():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.goto[fallback].get(word, 0)
+                self.output[target] = (
+                    self.output[target] + self.output[self.fail[target]]
+                )
+
+    def find(self, text):
+        '''
+        Returns set of positions of entries occurring in text.
+        '''
+        result = set()
+        state = 0
+        for word in get_words(text):
+            while state and word not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(word, 0)
+            result.update(self.output[state])
+        return result
+
+    def match(self, texts):
+        '''
+        Returns list of dictionary entries occurring in any of texts.
+        '''
+        positions = set()
+        for text in texts:
+            positions.update(self.find(text))
+        return sorted(
+            [
+                {'source': source, 'target': target}
+                for source, target in [self.entries[pos] for pos in positions]
+            ],
+            key=lambda item: item['source']
+        )
+
+
+class DictionaryIndexStore(object):
+    '''
+    Process wide LRU cache of dictionary indexes.
+    '''
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, project, language):
+        '''
+        Returns up to date index for project and language.
+        '''
+        from trans.models.dictionary import Dictionary
+
+        key = (project.id, language.id)
+        version = get_versions([get_namespace(*key)])[0]
+
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None and entry[0] == version:
+                self._data[key] = entry
+                return entry[1]
+
+        index = DictionaryIndex(
+            Dictionary.objects.filter(
+                project=project,
+                language=language
+            ).values_list('source', 'target').iterator()
+        )
+
+        with self._lock:
+            self._data[key] = (version, index)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+        return index
+
+
+DICTIONARY_INDEX = DictionaryIndexStore(MAX_ITEMS)
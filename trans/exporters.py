@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Streaming exporters.
+
+The exporters are generators yielding output in small pieces, so that
+memory usage does not depend on size of exported data.
+'''
+
+from django.db.models import Q
+from django.core.urlresolvers import reverse
+from xml.sax.saxutils import escape, quoteattr
+from trans.util import get_site_url
+import weblate
+
+import csv
+import json
+import cStringIO
+
+# Number of rows fetched from the database at once
+CHUNK_SIZE = 500
+
+TBX_HEADER = '''<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE martif PUBLIC "ISO 12200:1999A//DTD MARTIF core (DXFcdV04)//EN" \
+"TBXcdv04.dtd">
+<martif type="TBX" xml:lang="en">
+<martifHeader>
+<fileDesc>
+<sourceDesc>
+<p>Weblate %s</p>
+</sourceDesc>
+</fileDesc>
+</martifHeader>
+<text>
+<body>
+'''
+
+TBX_ENTRY = '''<termEntry>
+<langSet xml:lang="en"><tig><term>%s</term></tig></langSet>
+<langSet xml:lang=%s><tig><term>%s</term></tig></langSet>
+</termEntry>
+'''
+
+TBX_FOOTER = '''</body>
+</text>
+</martif>
+'''
+
+
+def iterate_words(words, chunk_size=CHUNK_SIZE):
+    '''
+    Iterates over dictionary words ordered by source, yielding tuples of
+    source and target.
+
+    The words are fetched in chunks using keyset pagination, which keeps
+    only single chunk in memory.
+    '''
+    words = words.order_by('source', 'id').values_list(
+        'id', 'source', 'target'
+    )
+    chunk = list(words[:chunk_size])
+    while chunk:
+        for word_id, source, target in chunk:
+            yield source, target
+        word_id, source, target = chunk[-1]
+        chunk = list(words.filter(
+            Q(source__gt=source) | Q(source=source, id__gt=word_id)
+        )[:chunk_size])
+
+
+def export_csv(words):
+    '''
+    Yields dictionary in CSV format.
+    '''
+    buf = cStringIO.StringIO()
+    writer = csv.writer(buf)
+    for source, target in iterate_words(words):
+        writer.writerow((source.encode('utf8'), target.encode('utf8')))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def export_tbx(words, language):
+    '''
+    Yields dictionary in TBX format.
+    '''
+    yield TBX_HEADER % weblate.VERSION
+    code = quoteattr(language.code)
+    for source, target in iterate_words(words):
+        entry = TBX_ENTRY % (escape(source), code, escape(target))
+        yield entry.encode('utf8')
+    yield TBX_FOOTER
+
+
+def export_po(words, project, language):
+    '''
+    Yields dictionary in Gettext PO format.
+    '''
+    from translate.storage.po import pofile
+    store = pofile()
+
+    # Set po file header
+    store.updateheader(
+        add=True,
+        language=language.code,
+        x_generator='Weblate %s' % weblate.VERSION,
+        project_id_version='%s (%s)' % (language.name, project.name),
+        language_team='%s <%s>' % (
+            language.name,
+            get_site_url(reverse(
+                'show_dictionary',
+                kwargs={'project': project.slug, 'lang': language.code}
+            )),
+        )
+    )
+    yield str(store)
+
+    # Units are serialized one by one, same way as whole store would be
+    for source, target in iterate_words(words):
+        unit = store.UnitClass(source)
+        unit.target = target
+        yield '\n' + str(unit)
+
+
+def export_json(items, indent=None, default=None):
+    '''
+    Yields JSON list of items.
+    '''
+    if indent is None:
+        separator = ', '
+    else:
+        separator = ',\n'
+    yield '['
+    first = True
+    for item in items:
+        if not first:
+            yield separator
+        first = False
+        yield json.dumps(item, indent=indent, default=default)
+    yield ']'
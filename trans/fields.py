@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+'''
+Model fields for denormalized data.
+'''
+
+from django.db import models
+
+
+class KeepColumn(object):
+    '''
+    Update value which keeps current content of the database column.
+    '''
+    def __init__(self, column):
+        self.column = column
+
+    def prepare_database_save(self, field):
+        return self
+
+    def as_sql(self, qn, connection):
+        return qn(self.column), []
+
+
+class DenormalizedMixin(object):
+    '''
+    Field which is written only when creating the object. Later it is
+    updated only using querysets, so saving possibly stale instance
+    never overwrites it.
+    '''
+    def pre_save(self, model_instance, add):
+        if add:
+            return super(DenormalizedMixin, self).pre_save(
+                model_instance, add
+            )
+        return KeepColumn(self.column)
+
+
+class DenormalizedDateTimeField(DenormalizedMixin, models.DateTimeField):
+    pass
+
+
+class DenormalizedForeignKey(DenormalizedMixin, models.ForeignKey):
+    pass
+
+
+try:
+    from south.modelsinspector import add_introspection_rules
+    add_introspection_rules([], [r'^trans\.fields\.Denormalized'])
+except ImportError:
+    pass
@@ -28,8 +28,10 @@ from translate.storage.po import pounit
 from translate.storage import mo
 from translate.storage import factory
 from trans.util import get_string
+from trans.instrumentation import record
 from translate.misc import quote
 import os.path
+import copy
 import re
 import hashlib
 import importlib
@@ -39,6 +41,19 @@ import __builtin__
 FILE_FORMATS = {}
 
 
+def copy_unit(ttkit_unit):
+    '''
+    Returns copy of translate-toolkit unit, which can be modified and
+    added to other store without affecting store it belongs to.
+    '''
+    # Do not copy whole store the unit links to
+    memo = {}
+    store = getattr(ttkit_unit, '_store', None)
+    if store is not None:
+        memo[id(store)] = store
+    return copy.deepcopy(ttkit_unit, memo)
+
+
 def register_fileformat(fileformat):
     '''
     Registers fileformat in dictionary.
@@ -268,10 +283,14 @@ class FileFormat(object):
         if not isinstance(storefile, basestring):
             storefile.mode = 'r'
 
+        record('parses')
         return cls.parse_store(storefile)
 
     @classmethod
-    def parse_store(cls, storefile):
+    def get_class(cls, storefile=None):
+        '''
+        Returns translate-toolkit class used for handling the format.
+        '''
         # Tuple style loader, import from translate toolkit
         module_name, class_name = cls.loader
         try:
@@ -286,7 +305,12 @@ class FileFormat(object):
             )
 
         # Get the class
-        storeclass = getattr(module, class_name)
+        return getattr(module, class_name)
+
+    @classmethod
+    def parse_store(cls, storefile):
+        # Get the class
+        storeclass = cls.get_class()
 
         # Parse file
         store = storeclass.parsefile(storefile)
@@ -327,9 +351,10 @@ class FileFormat(object):
             template_ttkit_unit = self.template_store.findid(context)
             # We search by ID when using template
             ttkit_unit = self.store.findid(context)
-            # We always need new unit to translate
+            # We always need new unit to translate, template store is
+            # shared with other translations so it must not be modified
             if ttkit_unit is None:
-                ttkit_unit = template_ttkit_unit
+                ttkit_unit = copy_unit(template_ttkit_unit)
                 add = True
             else:
                 add = False
@@ -394,37 +419,67 @@ class FileFormat(object):
                     template_unit
                 )
 
-    @property
-    def mimetype(self):
+    @staticmethod
+    def get_store_mimetype(storeclass):
         '''
-        Returns most common mime type for format.
+        Returns most common mime type for translate-toolkit store class.
         '''
-        if self.store.Mimetypes is None:
+        if getattr(storeclass, 'Mimetypes', None) is None:
             # Properties files do not expose mimetype
             return 'text/plain'
         else:
-            return self.store.Mimetypes[0]
+            return storeclass.Mimetypes[0]
 
-    @property
-    def extension(self):
+    @staticmethod
+    def get_store_extension(storeclass):
         '''
-        Returns most common file extension for format.
+        Returns most common file extension for translate-toolkit store class.
         '''
-        if self.store.Extensions is None:
+        if getattr(storeclass, 'Extensions', None) is None:
             # Typo in translate-toolkit 1.9, see
             # https://github.com/translate/translate/pull/10
-            if hasattr(self.store, 'Exensions'):
-                return self.store.Exensions[0]
+            if hasattr(storeclass, 'Exensions'):
+                return storeclass.Exensions[0]
             else:
                 return 'txt'
         else:
-            return self.store.Extensions[0]
+            return storeclass.Extensions[0]
 
-    def supports_language_pack(self):
+    @classmethod
+    def get_mimetype(cls, storefile):
+        '''
+        Returns most common mime type for format without parsing the file.
+        '''
+        return cls.get_store_mimetype(cls.get_class(storefile))
+
+    @classmethod
+    def get_extension(cls, storefile):
+        '''
+        Returns most common file extension for format without parsing
+        the file.
+        '''
+        return cls.get_store_extension(cls.get_class(storefile))
+
+    @property
+    def mimetype(self):
+        '''
+        Returns most common mime type for format.
+        '''
+        return self.get_store_mimetype(self.store)
+
+    @property
+    def extension(self):
+        '''
+        Returns most common file extension for format.
+        '''
+        return self.get_store_extension(self.store)
+
+    @classmethod
+    def supports_language_pack(cls):
         '''
         Checks whether backend store supports generating language pack.
         '''
-        return hasattr(self, 'get_language_pack')
+        return hasattr(cls, 'get_language_pack')
 
 
 class AutoFormat(FileFormat):
@@ -438,6 +493,22 @@ class AutoFormat(FileFormat):
         '''
         return factory.getobject(storefile)
 
+    @classmethod
+    def get_class(cls, storefile=None):
+        '''
+        Guesses translate-toolkit class based on file extension.
+        '''
+        if not isinstance(storefile, basestring):
+            return None
+        extension = os.path.splitext(storefile)[1][1:]
+        if extension not in factory.classes:
+            return None
+        module_name, class_name = factory.classes[extension]
+        module = importlib.import_module(
+            'translate.storage.%s' % module_name
+        )
+        return getattr(module, class_name)
+
 register_fileformat(AutoFormat)
 
 
@@ -465,13 +536,14 @@ class PoFormat(FileFormat):
             outputfile.addunit(mounit)
         return str(outputfile)
 
-    def get_language_pack_meta(self):
+    @classmethod
+    def get_language_pack_meta(cls, storefile):
         '''
         Returns language pack filename and mime type.
         '''
 
         basefile = os.path.splitext(
-            os.path.basename(self.storefile)
+            os.path.basename(storefile)
         )[0]
 
         return (
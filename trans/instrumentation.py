@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Instrumentation of requests and code blocks.
+
+Counts expensive operations (database queries, git commands, fulltext
+searchers, parsing of translation files and cache access), so that they
+can be logged, watched in aggregate or checked by tests. Git commands are
+counted for repositories passed through instrument_repo and cache access
+only when CountingCache backend is configured:
+
+    with Instrumentation() as stats:
+        do_something()
+    print stats['queries']
+'''
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.backends.util import CursorWrapper, CursorDebugWrapper
+import threading
+import time
+import git
+import weblate
+
+# Names of collected counters
+COUNTERS = (
+    'queries', 'git', 'searchers', 'parses', 'cache_hits', 'cache_misses'
+)
+
+# Per thread stack of active instrumentations
+LOCAL = threading.local()
+
+# Aggregate counters per view
+TOTALS = {}
+TOTALS_LOCK = threading.Lock()
+
+
+def record(name, amount=1):
+    '''
+    Records operation in all instrumentations active in current thread.
+    '''
+    active = getattr(LOCAL, 'active', None)
+    if not active:
+        return
+    for stats in active:
+        stats.counts[name] += amount
+
+
+class CountingCursorWrapper(CursorWrapper):
+    '''
+    Cursor wrapper counting executed queries.
+    '''
+    def execute(self, sql, params=()):
+        self.set_dirty()
+        record('queries')
+        return self.cursor.execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.set_dirty()
+        record('queries')
+        return self.cursor.executemany(sql, param_list)
+
+
+class CountingCursorDebugWrapper(CursorDebugWrapper):
+    '''
+    Debug cursor wrapper counting executed queries.
+    '''
+    def execute(self, sql, params=()):
+        record('queries')
+        return super(CountingCursorDebugWrapper, self).execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        record('queries')
+        return super(CountingCursorDebugWrapper, self).executemany(
+            sql, param_list
+        )
+
+
+class CountingGit(git.cmd.Git):
+    '''
+    Git command wrapper counting executed commands.
+    '''
+    def execute(self, *args, **kwargs):
+        record('git')
+        return super(CountingGit, self).execute(*args, **kwargs)
+
+
+def instrument_repo(repo):
+    '''
+    Makes git repository object count executed commands.
+    '''
+    repo.git = CountingGit(repo.working_dir)
+    return repo
+
+
+class CountingCache(object):
+    '''
+    Cache backend counting hits and misses of other configured cache,
+    everything else is passed to the wrapped cache. LOCATION is the alias
+    of the wrapped cache:
+
+        CACHES = {
+            'default': {
+                'BACKEND': 'trans.instrumentation.CountingCache',
+                'LOCATION': 'counted',
+            },
+            'counted': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        }
+    '''
+    def __init__(self, location, params):
+        self._cache = get_cache(location)
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        result = self._cache.get(key, default, version)
+        if result is default:
+            record('cache_misses')
+        else:
+            record('cache_hits')
+        return result
+
+    def get_many(self, keys, version=None):
+        result = self._cache.get_many(keys, version)
+        record('cache_hits', len(result))
+        record('cache_misses', len(keys) - len(result))
+        return result
+
+
+class Instrumentation(object):
+    '''
+    Context manager collecting counts of operations within a block.
+    '''
+    def __init__(self):
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.start = None
+        self.duration = 0
+        self._connection = None
+        self._debug_cursor = None
+
+    def __getitem__(self, name):
+        return self.counts[name]
+
+    def make_cursor(self, cursor):
+        '''
+        Wraps database cursor, keeping debug logging if it was enabled.
+        '''
+        if (self._debug_cursor
+                or (self._debug_cursor is None and settings.DEBUG)):
+            return CountingCursorDebugWrapper(cursor, self._connection)
+        return CountingCursorWrapper(cursor, self._connection)
+
+    def __enter__(self):
+        if not hasattr(LOCAL, 'active'):
+            LOCAL.active = []
+        # Only outermost instrumentation hooks into database connection
+        if not LOCAL.active:
+            self._connection = connections[DEFAULT_DB_ALIAS]
+            self._debug_cursor = self._connection.use_debug_cursor
+            self._connection.use_debug_cursor = True
+            self._connection.make_debug_cursor = self.make_cursor
+        LOCAL.active.append(self)
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.time() - self.start
+        LOCAL.active.remove(self)
+        if self._connection is not None:
+            self._connection.use_debug_cursor = self._debug_cursor
+            del self._connection.make_debug_cursor
+
+    def format(self):
+        '''
+        Returns textual summary of counters.
+        '''
+        return ', '.join(
+            ['%s: %d' % (name, self.counts[name]) for name in COUNTERS]
+        )
+
+
+def update_totals(name, stats):
+    '''
+    Adds instrumentation results to aggregate counters.
+    '''
+    with TOTALS_LOCK:
+        if name not in TOTALS:
+            TOTALS[name] = dict.fromkeys(COUNTERS + ('requests', 'time'), 0)
+        totals = TOTALS[name]
+        totals['requests'] += 1
+        totals['time'] += stats.duration
+        for counter in COUNTERS:
+            totals[counter] += stats.counts[counter]
+
+
+def get_totals():
+    '''
+    Returns list of aggregate counters as tuples (name, requests, average
+    time and average of every counter).
+    '''
+    result = []
+    with TOTALS_LOCK:
+        for name in sorted(TOTALS):
+            totals = TOTALS[name]
+            requests = float(totals['requests'])
+            result.append(
+                (name, totals['requests'], totals['time'] / requests)
+                + tuple([
+                    totals[counter] / requests for counter in COUNTERS
+                ])
+            )
+    return result
+
+
+def get_view_name(view_func):
+    '''
+    Returns name of view used for aggregating counters, views can be
+    functions or instances of classes (eg. feeds).
+    '''
+    name = getattr(view_func, '__name__', None)
+    if name is None:
+        name = view_func.__class__.__name__
+    module = getattr(view_func, '__module__', None)
+    if module is None:
+        module = view_func.__class__.__module__
+    return '%s.%s' % (module, name)
+
+
+class InstrumentationMiddleware(object):
+    '''
+    Middleware collecting instrumentation counters for every request.
+
+    Results are added to aggregate counters per view and requests
+    slower than SLOW_REQUEST_TIME are logged with all counters.
+    '''
+    def process_request(self, request):
+        request.instrumentation = Instrumentation().__enter__()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.instrumentation_view = get_view_name(view_func)
+
+    def process_response(self, request, response):
+        # Imported here as this module is loaded by cache initialization
+        from weblate import appsettings
+
+        stats = getattr(request, 'instrumentation', None)
+        if stats is None:
+            return response
+        del request.instrumentation
+
+        # Instrumentation must never break serving the request
+        try:
+            stats.__exit__(None, None, None)
+
+            name = getattr(request, 'instrumentation_view', request.path)
+            update_totals(name, stats)
+
+            if stats.duration >= appsettings.SLOW_REQUEST_TIME:
+                weblate.logger.warning(
+                    'slow request %s %s (%s): %.2f s, %s',
+                    request.method,
+                    request.path,
+                    name,
+                    stats.duration,
+                    stats.format()
+                )
+        except Exception as error:
+            weblate.logger.error(
+                'Failed to record instrumentation: %s', str(error)
+            )
+
+        return response
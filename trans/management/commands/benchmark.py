@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from optparse import make_option
+from weblate import appsettings
+from trans.benchmark import Benchmark, FORMATS
+import json
+import os
+import shutil
+import tempfile
+import weblate
+
+# Cache backends private to the process
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class Command(BaseCommand):
+    help = 'benchmarks import, saving, checks and fulltext search'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--units',
+            type='int',
+            default=1000,
+            help='number of units in each translation file'
+        ),
+        make_option(
+            '--languages',
+            type='int',
+            default=3,
+            help='number of languages'
+        ),
+        make_option(
+            '--formats',
+            default='po,xliff,aresource',
+            help='comma separated list of file formats to benchmark'
+        ),
+        make_option(
+            '--iterations',
+            type='int',
+            default=100,
+            help='number of samples for saving, checks and search'
+        ),
+        make_option(
+            '--seed',
+            type='int',
+            default=0,
+            help='seed for random choice of units and search terms'
+        ),
+        make_option(
+            '--output',
+            default=None,
+            help='file where to store results (defaults to stdout)'
+        ),
+    )
+
+    def setup_database(self):
+        '''
+        Creates temporary database, so that benchmark does not touch
+        real data.
+        '''
+        try:
+            from south.management.commands import patch_for_test_db_setup
+            patch_for_test_db_setup()
+        except ImportError:
+            pass
+        return connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True
+        )
+
+    def check_cache(self):
+        '''
+        Checks that default cache is private to this process, so that
+        benchmark does not see or pollute entries of the site.
+        '''
+        config = settings.CACHES[DEFAULT_CACHE_ALIAS]
+        if config['BACKEND'] == 'trans.instrumentation.CountingCache':
+            config = settings.CACHES[config['LOCATION']]
+        if config['BACKEND'] not in LOCAL_CACHES:
+            raise CommandError(
+                'Benchmark needs local memory cache, please run it with '
+                'settings using LocMemCache as default cache.'
+            )
+
+    def handle(self, *args, **options):
+        formats = options['formats'].split(',')
+        for file_format in formats:
+            if file_format not in FORMATS:
+                raise CommandError(
+                    'Unsupported file format: %s' % file_format
+                )
+        self.check_cache()
+
+        workdir = tempfile.mkdtemp(prefix='weblate-benchmark-')
+        old_git_root = appsettings.GIT_ROOT
+        old_whoosh_index = appsettings.WHOOSH_INDEX
+        old_database = connection.settings_dict['NAME']
+        test_database = None
+        try:
+            appsettings.GIT_ROOT = os.path.join(workdir, 'repos')
+            appsettings.WHOOSH_INDEX = os.path.join(workdir, 'whoosh-index')
+            os.mkdir(appsettings.GIT_ROOT)
+
+            weblate.logger.info('Creating benchmark database...')
+            test_database = self.setup_database()
+
+            benchmark = Benchmark(
+                workdir,
+                units=options['units'],
+                languages=options['languages'],
+                iterations=options['iterations'],
+                seed=options['seed'],
+            )
+            results = benchmark.run(formats)
+        finally:
+            if test_database is not None:
+                connection.creation.destroy_test_db(old_database, verbosity=0)
+            appsettings.GIT_ROOT = old_git_root
+            appsettings.WHOOSH_INDEX = old_whoosh_index
+            shutil.rmtree(workdir)
+
+        data = json.dumps(
+            {
+                'version': weblate.VERSION,
+                'parameters': {
+                    'units': options['units'],
+                    'languages': options['languages'],
+                    'iterations': options['iterations'],
+                    'seed': options['seed'],
+                },
+                'results': results,
+            },
+            indent=2,
+            sort_keys=True
+        )
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(data)
+        else:
+            self.stdout.write(data + '\n')
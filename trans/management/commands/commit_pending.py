@@ -53,14 +53,11 @@ class Command(WeblateLangCommand):
                     language_code__in=langs
                 )
 
-            for translation in translations:
-                if not translation.git_needs_commit():
-                    continue
+            # Only translations with old enough changes can be pending
+            translations = translations.filter(last_change__lte=age)
 
-                last_change = translation.get_last_change()
-                if last_change > age:
-                    continue
+            commited = subproject.commit_translations(None, translations)
 
-                if int(options['verbosity']) >= 1:
+            if int(options['verbosity']) >= 1:
+                for translation in commited:
                     print 'Committing %s' % translation
-                translation.commit_pending(None)
@@ -19,6 +19,7 @@
 #
 
 from trans.management.commands import WeblateCommand
+from trans.parallel import push_repositories
 from optparse import make_option
 
 
@@ -32,8 +33,35 @@ class Command(WeblateCommand):
             default=False,
             help='Forces commiting pending changes'
         ),
+        make_option(
+            '--threads',
+            action='store',
+            type='int',
+            dest='threads',
+            default=None,
+            help='Number of repositories pushed in parallel'
+        ),
     )
 
     def handle(self, *args, **options):
-        for subproject in self.get_subprojects(*args, **options):
-            subproject.do_push(None, force_commit=options['force_commit'])
+        results = push_repositories(
+            self.get_subprojects(*args, **options).select_related('project'),
+            force_commit=options['force_commit'],
+            threads=options['threads']
+        )
+
+        for item in results:
+            if item['error'] is not None:
+                print '%s: push failed: %s' % (
+                    item['subproject'],
+                    item['error'],
+                )
+            elif int(options['verbosity']) >= 2:
+                print '%s: commit %.2fs, fetch %.2fs, update %.2fs, ' \
+                    'push %.2fs' % (
+                        item['subproject'],
+                        item['commit'],
+                        item['fetch'] or 0,
+                        item['update'] or 0,
+                        item['push'] or 0,
+                    )
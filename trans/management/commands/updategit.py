@@ -19,11 +19,38 @@
 #
 
 from trans.management.commands import WeblateCommand
+from trans.parallel import update_repositories
+from optparse import make_option
 
 
 class Command(WeblateCommand):
     help = 'updates git repos'
+    option_list = WeblateCommand.option_list + (
+        make_option(
+            '--threads',
+            action='store',
+            type='int',
+            dest='threads',
+            default=None,
+            help='Number of repositories fetched in parallel'
+        ),
+    )
 
     def handle(self, *args, **options):
-        for subproject in self.get_subprojects(*args, **options):
-            subproject.do_update()
+        results = update_repositories(
+            self.get_subprojects(*args, **options).select_related('project'),
+            threads=options['threads']
+        )
+
+        for item in results:
+            if item['error'] is not None:
+                print '%s: fetch failed: %s' % (
+                    item['subproject'],
+                    item['error'],
+                )
+            elif int(options['verbosity']) >= 2:
+                print '%s: fetch %.2fs, update %.2fs' % (
+                    item['subproject'],
+                    item['fetch'],
+                    item['update'],
+                )
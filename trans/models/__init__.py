@@ -22,6 +22,8 @@ from trans.models.project import Project
 from trans.models.subproject import SubProject
 from trans.models.translation import Translation
 from trans.models.unit import Unit
-from trans.models.unitdata import Check, Suggestion, Comment, IndexUpdate
+from trans.models.unitdata import (
+    Check, Suggestion, Comment, IndexUpdate, UnitCheck
+)
 from trans.models.changes import Change
 from trans.models.dictionary import Dictionary
@@ -18,14 +18,54 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from django.db import models
+from django.db import models, connection
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db.models import Count
+from django.core.cache import cache
 from django.utils.translation import ugettext as _, ugettext_lazy
 from django.utils import timezone
 from trans.models.unit import Unit
 from trans.models.translation import Translation
+from trans.models.subproject import SubProject
+from trans.models.project import Project
 from trans.util import get_user_display
+from datetime import datetime, timedelta
+
+# Number of days for which daily activity is counted (longest chart period)
+ACTIVITY_DAYS = 53 * 7
+
+# Cached activity is keyed by current day, so it does not have to live longer
+ACTIVITY_CACHE_TIMEOUT = 24 * 3600
+
+
+def get_activity_cache_key(day, scope, language_id=None, user_id=None):
+    '''
+    Returns cache key for daily activity counts.
+    '''
+    return 'activity-%s-%s-%s-%s' % (
+        day.isoformat(), scope, language_id, user_id
+    )
+
+
+def get_activity_count_key(day, scope, language_id=None, user_id=None):
+    '''
+    Returns cache key for number of changes on given day.
+    '''
+    return 'activity-count-%s-%s-%s-%s' % (
+        day.isoformat(), scope, language_id, user_id
+    )
+
+
+def timestamp_date(value):
+    '''
+    Returns date of timestamp in current timezone.
+    '''
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
 
 
 class ChangeManager(models.Manager):
@@ -34,32 +74,73 @@ class ChangeManager(models.Manager):
         Retuns queryset with content changes.
         '''
         return self.filter(
-            action__in=(Change.ACTION_CHANGE, Change.ACTION_NEW),
+            action__in=Change.ACTIONS_CONTENT,
             user__isnull=False,
         )
 
-    def count_stats(self, days, step, dtstart, base):
+    def prefetch(self):
+        '''
+        Fetches related objects needed for rendering list of changes.
+        '''
+        return self.select_related(
+            'user',
+            'unit',
+            'translation__language',
+            'translation__subproject__project',
+        )
+
+    def count_days(self, base, dtstart):
         '''
-        Counts number of changes in given dataset and period groupped by
-        step days.
+        Returns dictionary with number of changes in given dataset for
+        every day since dtstart.
         '''
+        base = base.filter(timestamp__gte=dtstart)
 
-        # Count number of changes
+        # With timezone support dates have to be calculated in local time,
+        # so we bucket them in Python from single scan
+        if settings.USE_TZ:
+            result = {}
+            timestamps = base.values_list('timestamp', flat=True)
+            for timestamp in timestamps.iterator():
+                day = timestamp_date(timestamp)
+                result[day] = result.get(day, 0) + 1
+            return result
+
+        # Let database group changes by day
+        day_sql = connection.ops.date_trunc_sql('day', '%s.%s' % (
+            connection.ops.quote_name(Change._meta.db_table),
+            connection.ops.quote_name('timestamp'),
+        ))
+        counts = base.extra(
+            select={'day': day_sql}
+        ).values('day').annotate(Count('id')).order_by()
+
+        result = {}
+        for item in counts:
+            day = item['day']
+            # SQLite returns string here
+            if isinstance(day, basestring):
+                day = datetime.strptime(day[:10], '%Y-%m-%d')
+            day = timestamp_date(day)
+            result[day] = result.get(day, 0) + item['id__count']
+        return result
+
+    def count_stats(self, days, step, dtstart, daily):
+        '''
+        Counts number of changes in given period groupped by step days
+        from dictionary of daily counts.
+        '''
         result = []
         for dummy in xrange(0, days, step):
-            # Calculate interval
-            int_start = dtstart
-            int_end = int_start + timezone.timedelta(days=step)
-
-            # Count changes
-            int_base = base.filter(timestamp__range=(int_start, int_end))
-            count = int_base.aggregate(Count('id'))
+            count = 0
+            for offset in xrange(step):
+                count += daily.get(dtstart + timedelta(days=offset), 0)
 
             # Append to result
-            result.append((int_start, count['id__count']))
+            result.append((dtstart, count))
 
             # Advance to next interval
-            dtstart = int_end
+            dtstart += timedelta(days=step)
 
         return result
 
@@ -70,9 +151,10 @@ class ChangeManager(models.Manager):
         Core of daily/weekly/monthly stats calculation.
         '''
 
-        # Get range (actually start)
+        # Get range (actually start), last interval ends with today
         dtend = timezone.now().date()
-        dtstart = dtend - timezone.timedelta(days=days)
+        intervals = len(xrange(0, days, step))
+        dtstart = dtend - timedelta(days=intervals * step - 1)
 
         # Base for filtering
         base = self.all()
@@ -80,20 +162,47 @@ class ChangeManager(models.Manager):
         # Filter by translation/project
         if translation is not None:
             base = base.filter(translation=translation)
+            scope = 'translation-%d' % translation.id
         elif subproject is not None:
             base = base.filter(translation__subproject=subproject)
+            scope = 'subproject-%d' % subproject.id
         elif project is not None:
             base = base.filter(translation__subproject__project=project)
+            scope = 'project-%d' % project.id
+        else:
+            scope = 'all'
 
         # Filter by language
         if language is not None:
             base = base.filter(translation__language=language)
+            language = language.id
 
-        # Filter by language
+        # Filter by user
         if user is not None:
             base = base.filter(user=user)
+            user = user.id
+
+        # Daily counts are shared by all periods, count for today is kept
+        # separately as it is incremented on new changes
+        cache_key = get_activity_cache_key(dtend, scope, language, user)
+        count_key = get_activity_count_key(dtend, scope, language, user)
+        cached = cache.get_many([cache_key, count_key])
+        if cache_key in cached and count_key in cached:
+            daily = cached[cache_key]
+            daily[dtend] = cached[count_key]
+        else:
+            daily = self.count_days(
+                base, dtend - timedelta(days=ACTIVITY_DAYS)
+            )
+            count = daily.pop(dtend, 0)
+            cache.set(cache_key, daily, ACTIVITY_CACHE_TIMEOUT)
+            # Keep counter if it was created meanwhile, it could have
+            # been already incremented
+            if not cache.add(count_key, count, ACTIVITY_CACHE_TIMEOUT):
+                count = cache.get(count_key, count)
+            daily[dtend] = count
 
-        return self.count_stats(days, step, dtstart, base)
+        return self.count_stats(days, step, dtstart, daily)
 
     def month_stats(self, *args, **kwargs):
         '''
@@ -129,6 +238,9 @@ class Change(models.Model):
         (ACTION_ACCEPT, ugettext_lazy('Suggestion accepted')),
     )
 
+    # Actions changing content of translation
+    ACTIONS_CONTENT = (ACTION_CHANGE, ACTION_NEW)
+
     unit = models.ForeignKey(Unit, null=True)
     translation = models.ForeignKey(Translation)
     user = models.ForeignKey(User, null=True)
@@ -160,6 +272,78 @@ class Change(models.Model):
         Returns link either to unit or translation.
         '''
         if self.unit is not None:
-            return self.unit.get_absolute_url()
+            # Unit belongs to same translation, this avoids fetching it
+            return '%s?checksum=%s' % (
+                self.translation.get_translate_url(), self.unit.checksum
+            )
         else:
             return self.translation.get_absolute_url()
+
+    def update_activity_cache(self):
+        '''
+        Increments all cached counts of today's activity this change
+        belongs to.
+        '''
+        translation = self.translation
+        scopes = (
+            'all',
+            'translation-%d' % translation.id,
+            'subproject-%d' % translation.subproject_id,
+            'project-%d' % translation.subproject.project_id,
+        )
+        languages = (None, translation.language_id)
+        if self.user_id is None:
+            users = (None,)
+        else:
+            users = (None, self.user_id)
+
+        today = timezone.now().date()
+        keys = [
+            get_activity_count_key(today, scope, language, user)
+            for scope in scopes for language in languages for user in users
+        ]
+
+        # Counters are incremented atomically, missing ones are counted
+        # from the database on next use
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass
+
+    def update_last_change(self):
+        '''
+        Updates denormalized last change of translation, subproject and
+        project if this is content change.
+        '''
+        if self.action not in self.ACTIONS_CONTENT or self.user_id is None:
+            return
+
+        # Update instance as well, so that it is not overwritten by saving
+        translation = self.translation
+        translation.last_change = self.timestamp
+        translation.last_author_id = self.user_id
+        translation.subproject.last_change = self.timestamp
+
+        Translation.objects.filter(id=translation.id).update(
+            last_change=self.timestamp,
+            last_author=self.user_id,
+        )
+        SubProject.objects.filter(id=translation.subproject_id).update(
+            last_change=self.timestamp,
+        )
+        Project.objects.filter(
+            id=translation.subproject.project_id
+        ).update(
+            last_change=self.timestamp,
+        )
+
+
+@receiver(post_save, sender=Change)
+def change_created(sender, instance, created, **kwargs):
+    '''
+    Updates cached activity and last change on new changes.
+    '''
+    if created:
+        instance.update_activity_cache()
+        instance.update_last_change()
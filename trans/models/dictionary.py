@@ -18,22 +18,49 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from lang.models import Language
 from trans.formats import AutoFormat
 from trans.models.project import Project
+from trans.dictionaryindex import invalidate_dictionary_index
+
+
+# Number of objects created or updated by single query
+BATCH_SIZE = 200
 
 
 class DictionaryManager(models.Manager):
     def upload(self, project, language, fileobj, method):
         '''
         Handles dictionary update.
+
+        Existing entries are loaded at once, changes are calculated in
+        memory and applied in batches within single transaction.
+
+        Returns dictionary with number of created, updated and skipped
+        words.
         '''
-        ret = 0
+        result = {'created': 0, 'updated': 0, 'skipped': 0}
 
         # Load file using translate-toolkit
         store = AutoFormat.load(fileobj)
 
+        # Known entries, source -> list of [id, target, new object]
+        existing = {}
+        words = self.filter(
+            project=project,
+            language=language
+        ).values_list('id', 'source', 'target')
+        for word_id, source, target in words.iterator():
+            existing.setdefault(source, []).append([word_id, target, None])
+
+        # Objects to create
+        created = []
+        # Updated entries, id -> target
+        updated = {}
+
         # process all units
         for unit in store.units:
             # We care only about translated things
@@ -44,36 +71,63 @@ class DictionaryManager(models.Manager):
             if len(unit.source) > 200 or len(unit.target) > 200:
                 continue
 
-            # Get object
-            word, created = self.get_or_create(
-                project=project,
-                language=language,
-                source=unit.source
-            )
+            entries = existing.get(unit.source)
 
-            # Already existing entry found
-            if not created:
+            if entries:
                 # Same as current -> ignore
-                if unit.target == word.target:
+                if unit.target in [entry[1] for entry in entries]:
+                    result['skipped'] += 1
                     continue
-                if method == 'add':
-                    # Add word
-                    word = self.create(
-                        project=project,
-                        language=language,
-                        source=unit.source
-                    )
-                elif method != 'overwrite':
+                if method == 'overwrite':
+                    # Update first matching word
+                    entry = entries[0]
+                    entry[1] = unit.target
+                    if entry[2] is not None:
+                        entry[2].target = unit.target
+                    else:
+                        updated[entry[0]] = unit.target
+                    result['updated'] += 1
+                    continue
+                elif method != 'add':
                     # No overwriting or adding
+                    result['skipped'] += 1
                     continue
 
-            # Store word
-            word.target = unit.target
-            word.save()
+            # Add word
+            word = self.model(
+                project=project,
+                language=language,
+                source=unit.source,
+                target=unit.target
+            )
+            created.append(word)
+            existing.setdefault(unit.source, []).append(
+                [None, unit.target, word]
+            )
+            result['created'] += 1
+
+        if not created and not updated:
+            return result
+
+        with transaction.commit_on_success():
+            # Create new entries
+            for pos in xrange(0, len(created), BATCH_SIZE):
+                self.bulk_create(created[pos:pos + BATCH_SIZE])
+
+            # Update existing entries, grouped by target
+            targets = {}
+            for word_id, target in updated.iteritems():
+                targets.setdefault(target, []).append(word_id)
+            for target, ids in targets.iteritems():
+                for pos in xrange(0, len(ids), BATCH_SIZE):
+                    self.filter(id__in=ids[pos:pos + BATCH_SIZE]).update(
+                        target=target
+                    )
 
-            ret += 1
+        # Bulk operations do not emit signals
+        invalidate_dictionary_index(project.id, language.id)
 
-        return ret
+        return result
 
 
 class Dictionary(models.Model):
@@ -98,3 +152,12 @@ class Dictionary(models.Model):
             self.source,
             self.target
         )
+
+
+@receiver(post_save, sender=Dictionary)
+@receiver(post_delete, sender=Dictionary)
+def dictionary_changed(sender, instance, **kwargs):
+    '''
+    Invalidates dictionary index on change.
+    '''
+    invalidate_dictionary_index(instance.project_id, instance.language_id)
@@ -19,6 +19,8 @@
 #
 
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from weblate import appsettings
 from django.utils.translation import ugettext as _, ugettext_lazy
 from django.core.exceptions import ValidationError, PermissionDenied
@@ -30,8 +32,10 @@ import os
 import os.path
 from lang.models import Language
 from trans.validators import validate_commit_message
+from trans.fields import DenormalizedDateTimeField
 from trans.mixins import PercentMixin, URLMixin
 from trans.util import get_site_url
+from trans.cacheversion import invalidate_namespaces
 
 
 DEFAULT_COMMIT_MESSAGE = (
@@ -146,6 +150,11 @@ class Project(models.Model, PercentMixin, URLMixin):
         )
     )
 
+    # Denormalized timestamp of last content change in any subproject
+    last_change = DenormalizedDateTimeField(
+        null=True, blank=True, default=None, editable=False
+    )
+
     objects = ProjectManager()
 
     class Meta:
@@ -223,6 +232,12 @@ class Project(models.Model, PercentMixin, URLMixin):
     def get_path(self):
         return os.path.join(appsettings.GIT_ROOT, self.slug)
 
+    def get_widgets_path(self):
+        '''
+        Returns path where pre-rendered widgets are stored.
+        '''
+        return self.get_path() + '.widgets'
+
     def __unicode__(self):
         return self.name
 
@@ -274,7 +289,9 @@ class Project(models.Model, PercentMixin, URLMixin):
         from trans.models.translation import Translation
 
         # Get prercents
-        result = Translation.objects.get_percents(project=self, language=lang)
+        result = Translation.objects.get_cached_percents(
+            project=self, language=lang
+        )
 
         # Update cache
         if lang is None:
@@ -297,13 +314,7 @@ class Project(models.Model, PercentMixin, URLMixin):
         assumption that all languages have same number of strings.
         '''
         from trans.models.translation import Translation
-        total = 0
-        for resource in self.subproject_set.all():
-            try:
-                total += resource.translation_set.all()[0].total
-            except Translation.DoesNotExist:
-                pass
-        return total
+        return Translation.objects.get_cached_total(self)
 
     def get_languages(self):
         '''
@@ -349,20 +360,30 @@ class Project(models.Model, PercentMixin, URLMixin):
 
     def do_update(self, request=None):
         '''
-        Updates all git repos.
+        Updates all git repos, one after another as this is used within
+        web requests.
         '''
-        ret = False
-        for resource in self.subproject_set.all():
-            ret &= resource.do_update(request)
+        from trans.parallel import update_repositories
+        results = update_repositories(
+            self.subproject_set.select_related('project'), request
+        )
+        ret = True
+        for item in results:
+            ret &= bool(item['result'])
         return ret
 
     def do_push(self, request=None):
         '''
-        Pushes all git repos.
+        Pushes all git repos, one after another as this is used within
+        web requests.
         '''
+        from trans.parallel import push_repositories
+        results = push_repositories(
+            self.subproject_set.select_related('project'), request
+        )
         ret = False
-        for resource in self.subproject_set.all():
-            ret |= resource.do_push(request)
+        for item in results:
+            ret |= item['result']
         return ret
 
     def do_reset(self, request=None):
@@ -387,11 +408,12 @@ class Project(models.Model, PercentMixin, URLMixin):
         '''
         Returns date of last change done in Weblate.
         '''
-        from trans.models.changes import Change
-        try:
-            change = Change.objects.content().filter(
-                translation__subproject__project=self
-            )
-            return change[0].timestamp
-        except IndexError:
-            return None
+        return self.last_change
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, **kwargs):
+    '''
+    Invalidates cached data of project, eg. widgets showing its name.
+    '''
+    invalidate_namespaces([('project', instance.id)])
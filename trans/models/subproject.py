@@ -19,6 +19,8 @@
 #
 
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils.translation import ugettext as _, ugettext_lazy
 from django.core.mail import mail_admins
 from django.core.exceptions import ValidationError
@@ -27,15 +29,22 @@ from django.core.urlresolvers import reverse
 from glob import glob
 import os
 import os.path
+import hashlib
+import tempfile
+import zipfile
 import weblate
 import git
 from trans.formats import FILE_FORMAT_CHOICES, FILE_FORMATS
 from trans.models.project import Project
+from trans.fields import DenormalizedDateTimeField
 from trans.mixins import PercentMixin, URLMixin
 from trans.filelock import FileLock
+from trans.storecache import STORE_CACHE
 from trans.util import is_repo_link
 from trans.util import get_site_url
-from trans.util import sleep_while_git_locked
+from trans.util import sleep_while_git_locked, remove_stale_files
+from trans.cacheversion import invalidate_namespaces
+from trans.instrumentation import instrument_repo
 from trans.validators import (
     validate_repoweb, validate_filemask, validate_repo,
     validate_extra_file,
@@ -174,6 +183,11 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         )
     )
 
+    # Denormalized timestamp of last content change in any translation
+    last_change = DenormalizedDateTimeField(
+        null=True, blank=True, default=None, editable=False
+    )
+
     objects = SubProjectManager()
 
     class Meta:
@@ -261,6 +275,76 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         '''
         return os.path.join(self.project.get_path(), self.slug + '.lock')
 
+    def get_language_pack_path(self):
+        '''
+        Returns full path to directory with compiled language packs.
+        '''
+        return os.path.join(self.project.get_path(), self.slug + '.packs')
+
+    def supports_language_pack(self):
+        '''
+        Checks whether translations can be downloaded as language packs.
+        '''
+        return self.file_format_cls.supports_language_pack()
+
+    def get_language_packs_etag(self, translations=None):
+        '''
+        Returns ETag identifying current content of all translations.
+        '''
+        if translations is None:
+            translations = self.translation_set.select_related(
+                'subproject', 'subproject__project'
+            )
+        md5 = hashlib.md5()
+        for translation in translations:
+            md5.update(translation.language_code.encode('utf-8'))
+            md5.update(translation.get_etag())
+        return md5.hexdigest()
+
+    def get_language_packs_archive(self):
+        '''
+        Returns filename of ZIP archive with compiled language packs for
+        all translations, creating it if it does not exist yet.
+        '''
+        translations = list(
+            self.translation_set.select_related(
+                'subproject', 'subproject__project'
+            )
+        )
+        dirname = self.get_language_pack_path()
+        filename = os.path.join(
+            dirname,
+            'all-%s.zip' % self.get_language_packs_etag(translations)
+        )
+        if os.path.exists(filename):
+            return filename
+
+        # Create archive in temporary file and atomically move it into
+        # place (there might be concurrent requests creating it)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        handle, tmpname = tempfile.mkstemp(dir=dirname)
+        os.chmod(tmpname, 0644)
+        with os.fdopen(handle, 'wb') as tmpfile:
+            archive = zipfile.ZipFile(tmpfile, 'w', zipfile.ZIP_DEFLATED)
+            for translation in translations:
+                pack = translation.get_language_pack()
+                archive.write(
+                    pack,
+                    '%s/LC_MESSAGES/%s%s' % (
+                        translation.language_code,
+                        self.slug,
+                        os.path.splitext(pack)[1],
+                    )
+                )
+            archive.close()
+        os.rename(tmpname, filename)
+
+        # Remove stale archives
+        remove_stale_files(dirname, filename, 'all-')
+
+        return filename
+
     @property
     def git_lock(self):
         '''
@@ -308,10 +392,11 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         if self._git_repo is None:
             path = self.get_path()
             try:
-                self._git_repo = git.Repo(path)
+                repo = git.Repo(path)
             except:
                 # Fallback to initializing the repository
-                self._git_repo = git.Repo.init(path)
+                repo = git.Repo.init(path)
+            self._git_repo = instrument_repo(repo)
 
         return self._git_repo
 
@@ -370,16 +455,8 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         if self.is_repo_link():
             return self.linked_subproject.update_remote_branch(validate)
 
-        # Update
-        weblate.logger.info('updating repo %s', self.__unicode__())
         try:
-            try:
-                self.git_repo.git.remote('update', 'origin')
-            except git.GitCommandError:
-                # There might be another attempt on pull in same time
-                # so we will sleep a bit an retry
-                sleep_while_git_locked()
-                self.git_repo.git.remote('update', 'origin')
+            self.fetch_remote_branch()
         except Exception as e:
             weblate.logger.error('Failed to update Git repo: %s', str(e))
             if validate:
@@ -387,6 +464,19 @@ class SubProject(models.Model, PercentMixin, URLMixin):
                     _('Failed to fetch git repository: %s') % str(e)
                 )
 
+    def fetch_remote_branch(self):
+        '''
+        Fetches remote repository, raises exception on failure.
+        '''
+        weblate.logger.info('updating repo %s', self.__unicode__())
+        try:
+            self.git_repo.git.remote('update', 'origin')
+        except git.GitCommandError:
+            # There might be another attempt on pull in same time
+            # so we will sleep a bit an retry
+            sleep_while_git_locked()
+            self.git_repo.git.remote('update', 'origin')
+
     def configure_repo(self, validate=False):
         '''
         Ensures repository is correctly configured and points to current
@@ -431,15 +521,18 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         # switch to correct branch
         self.git_repo.git.checkout(self.branch)
 
-    def do_update(self, request=None):
+    def do_update(self, request=None, fetch=True):
         '''
         Wrapper for doing repository update and pushing them to translations.
+
+        Fetching from remote can be skipped if it was already done.
         '''
         if self.is_repo_link():
-            return self.linked_subproject.do_update(request)
+            return self.linked_subproject.do_update(request, fetch)
 
         # pull remote
-        self.update_remote_branch()
+        if fetch:
+            self.update_remote_branch()
 
         # do we have something to merge?
         if not self.git_needs_merge():
@@ -469,6 +562,21 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         if self.is_repo_link():
             return self.linked_subproject.do_push(request)
 
+        if not self.prepare_push(request, force_commit, do_update):
+            return False
+
+        return self.push_repo(request)
+
+    def prepare_push(self, request, force_commit=True, do_update=True):
+        '''
+        Commits and merges changes before push, returns whether there is
+        something to push.
+        '''
+        if self.is_repo_link():
+            return self.linked_subproject.prepare_push(
+                request, force_commit, do_update
+            )
+
         # Do we have push configured
         if not self.can_push():
             if request is not None:
@@ -494,34 +602,51 @@ class SubProject(models.Model, PercentMixin, URLMixin):
             if self.git_needs_merge():
                 return False
 
-        # Do actual push
+        return True
+
+    def push_repo(self, request):
+        '''
+        Pushes local branch to remote repo.
+        '''
         try:
-            weblate.logger.info(
-                'pushing to remote repo %s',
-                self.__unicode__()
-            )
-            self.git_repo.git.push(
-                'origin',
-                '%s:%s' % (self.branch, self.branch)
-            )
+            self.push_remote_branch()
             return True
         except Exception as e:
-            weblate.logger.warning(
-                'failed push on repo %s',
+            self.notify_push_failure(request, e)
+            return False
+
+    def push_remote_branch(self):
+        '''
+        Pushes local branch to remote repo, raises exception on failure.
+        '''
+        weblate.logger.info(
+            'pushing to remote repo %s',
+            self.__unicode__()
+        )
+        self.git_repo.git.push(
+            'origin',
+            '%s:%s' % (self.branch, self.branch)
+        )
+
+    def notify_push_failure(self, request, error):
+        '''
+        Reports failed push to admins and user.
+        '''
+        weblate.logger.warning(
+            'failed push on repo %s',
+            self.__unicode__()
+        )
+        msg = 'Error:\n%s' % str(error)
+        mail_admins(
+            'failed push on repo %s' % self.__unicode__(),
+            msg
+        )
+        if request is not None:
+            messages.error(
+                request,
+                _('Failed to push to remote branch on %s.') %
                 self.__unicode__()
             )
-            msg = 'Error:\n%s' % str(e)
-            mail_admins(
-                'failed push on repo %s' % self.__unicode__(),
-                msg
-            )
-            if request is not None:
-                messages.error(
-                    request,
-                    _('Failed to push to remote branch on %s.') %
-                    self.__unicode__()
-                )
-            return False
 
     def do_reset(self, request=None):
         '''
@@ -581,12 +706,53 @@ class SubProject(models.Model, PercentMixin, URLMixin):
                 request, True, skip_push=skip_push
             )
 
-        for translation in self.translation_set.all():
-            translation.commit_pending(request, skip_push=skip_push)
+        from trans.models.translation import Translation
 
-        # Process linked projects
-        for subproject in self.get_linked_childs():
-            subproject.commit_pending(request, True, skip_push=skip_push)
+        # Process translations of linked projects as well, they share
+        # the repository
+        subprojects = [self] + list(self.get_linked_childs())
+        translations = Translation.objects.filter(
+            subproject__in=subprojects
+        )
+        self.commit_translations(request, translations, skip_push)
+
+    def commit_translations(self, request, translations, skip_push=False):
+        '''
+        Commits pending changes in translations from the repository.
+
+        Changed files are detected by single git status call and all
+        commits are done within single lock acquisition. Returns list of
+        commited translations.
+        '''
+        changed = self.git_changed_files()
+        if not changed:
+            return []
+
+        # Only translations with changes done in Weblate can be commited
+        translations = translations.filter(
+            last_change__isnull=False
+        ).select_related(
+            'subproject__project', 'language', 'last_author'
+        ).order_by('last_change')
+        pending = [
+            translation for translation in translations
+            if translation.filename in changed
+        ]
+        if not pending:
+            return []
+
+        gitrepo = self.git_repo
+        with self.git_lock:
+            for translation in pending:
+                translation.git_commit_pending(gitrepo)
+
+        # Push if we should
+        if (self.project.push_on_commit
+                and not skip_push
+                and self.can_push()):
+            self.do_push(request, force_commit=False)
+
+        return pending
 
     def notify_merge_failure(self, error, status):
         '''
@@ -867,8 +1033,11 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         if self._percents is not None:
             return self._percents
 
+        # Import translations
+        from trans.models.translation import Translation
+
         # Get prercents
-        result = self.translation_set.get_percents()
+        result = Translation.objects.get_cached_percents(subproject=self)
 
         # Update cache
         self._percents = result
@@ -885,6 +1054,24 @@ class SubProject(models.Model, PercentMixin, URLMixin):
             return False
         return True
 
+    def git_changed_files(self):
+        '''
+        Returns set of files with not commited changes.
+        '''
+        status = self.git_repo.git.status('--porcelain', '-z')
+        if isinstance(status, str):
+            status = status.decode('utf-8')
+        result = set()
+        entries = iter(status.split('\0'))
+        for entry in entries:
+            if entry == '':
+                continue
+            result.add(entry[3:])
+            # Renamed or copied file is followed by original name
+            if entry[0] in 'RC':
+                next(entries, None)
+        return result
+
     def git_check_merge(self, revision):
         '''
         Checks whether there are any unmerged commits compared to given
@@ -924,9 +1111,14 @@ class SubProject(models.Model, PercentMixin, URLMixin):
     def load_template_store(self):
         '''
         Loads translate-toolkit store for template.
+
+        The store is shared with all translations using same template.
         '''
-        return self.file_format_cls.load(
-            self.get_template_filename(),
+        filename = self.get_template_filename()
+        return STORE_CACHE.get(
+            filename,
+            lambda: self.file_format_cls.load(filename),
+            tag='template-%s' % self.file_format,
         )
 
     @property
@@ -947,11 +1139,15 @@ class SubProject(models.Model, PercentMixin, URLMixin):
         '''
         Returns date of last change done in Weblate.
         '''
-        from trans.models.changes import Change
-        try:
-            change = Change.objects.content().filter(
-                translation__subproject=self
-            )
-            return change[0].timestamp
-        except IndexError:
-            return None
+        return self.last_change
+
+
+@receiver(post_save, sender=SubProject)
+def subproject_saved(sender, instance, **kwargs):
+    '''
+    Invalidates cached data of subproject and its project.
+    '''
+    invalidate_namespaces([
+        ('project', instance.project_id),
+        ('subproject', instance.id),
+    ])
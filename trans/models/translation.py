@@ -21,7 +21,9 @@
 from django.db import models
 from django.contrib.auth.models import User
 from weblate import appsettings
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, Max
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.utils.translation import ugettext as _
 from django.utils.safestring import mark_safe
 from django.core.exceptions import ValidationError
@@ -30,6 +32,8 @@ from django.utils import timezone
 from django.core.urlresolvers import reverse
 import os
 import git
+import hashlib
+import tempfile
 import traceback
 from translate.storage import poheader
 from datetime import datetime, timedelta
@@ -40,10 +44,98 @@ from trans.formats import AutoFormat
 from trans.checks import CHECKS
 from trans.models.subproject import SubProject
 from trans.models.project import Project
-from trans.util import get_user_display, get_site_url, sleep_while_git_locked
+from trans.storecache import STORE_CACHE, get_file_stamp
+from trans.fields import DenormalizedDateTimeField, DenormalizedForeignKey
+from trans.cacheversion import (
+    get_versioned_key, get_versioned_keys, invalidate_namespaces
+)
+from trans.util import (
+    get_user_display, get_site_url, sleep_while_git_locked, remove_stale_files
+)
 from trans.mixins import URLMixin
 
 
+def get_percents_key(project_id=None, subproject_id=None, language_id=None):
+    '''
+    Returns tuple of cache key for aggregated status percents and list of
+    namespaces it belongs to.
+    '''
+    namespaces = []
+    if project_id is not None:
+        namespaces.append(('project', project_id))
+    if subproject_id is not None:
+        namespaces.append(('subproject', subproject_id))
+    return (
+        'percents-%s-%s-%s' % (project_id, subproject_id, language_id),
+        namespaces
+    )
+
+
+def get_percents_cache_key(project_id=None, subproject_id=None,
+                           language_id=None):
+    '''
+    Returns cache key for aggregated status percents.
+    '''
+    return get_versioned_key(
+        *get_percents_key(project_id, subproject_id, language_id)
+    )
+
+
+def get_widgets_cache_key(project_id):
+    '''
+    Returns cache key marking pre-rendered widgets of project as current.
+    '''
+    return get_versioned_key(
+        'widgets-%s' % project_id, [('project', project_id)]
+    )
+
+
+def get_counts_cache_key(translation_id):
+    '''
+    Returns cache key for summary of units matching filters.
+    '''
+    return get_versioned_key(
+        'counts-%s' % translation_id, [('translation', translation_id)]
+    )
+
+
+def get_total_cache_key(project_id):
+    '''
+    Returns cache key for total number of strings in project.
+    '''
+    return get_versioned_key(
+        'total-%s' % project_id, [('project', project_id)]
+    )
+
+
+PERCENT_SUMS = (
+    Sum('translated'),
+    Sum('fuzzy'),
+    Sum('failing_checks'),
+    Sum('total'),
+)
+
+
+def calculate_percents(sums):
+    '''
+    Calculates status percents tuple from aggregated PERCENT_SUMS.
+    '''
+    total = sums['total__sum']
+
+    # Catch no translations (division by zero)
+    if total == 0 or total is None:
+        return (0, 0, 0)
+
+    # Fetch values
+    result = [
+        sums['translated__sum'],
+        sums['fuzzy__sum'],
+        sums['failing_checks__sum'],
+    ]
+    # Calculate percent
+    return tuple([round(value * 100.0 / total, 1) for value in result])
+
+
 class TranslationManager(models.Manager):
     def update_from_blob(self, subproject, code, path, force=False,
                          request=None):
@@ -93,27 +185,83 @@ class TranslationManager(models.Manager):
             translations = translations.filter(language=language)
 
         # Aggregate
-        translations = translations.aggregate(
-            Sum('translated'),
-            Sum('fuzzy'),
-            Sum('failing_checks'),
-            Sum('total'),
+        return calculate_percents(translations.aggregate(*PERCENT_SUMS))
+
+    def get_cached_percents(self, project=None, subproject=None,
+                            language=None):
+        '''
+        Returns status percents like get_percents, but the result is
+        stored in the cache shared by all requests. It is invalidated
+        whenever statistics of any matching translation are updated.
+        '''
+        cache_key = get_percents_cache_key(
+            None if project is None else project.id,
+            None if subproject is None else subproject.id,
+            None if language is None else language.id,
         )
+        result = cache.get(cache_key)
+        if result is None:
+            result = self.get_percents(project, subproject, language)
+            cache.set(cache_key, result)
+        return result
+
+    def prefetch_percents(self, objects, field):
+        '''
+        Fills in status percents for list of projects, subprojects or
+        languages (field is one of project, subproject or language).
+
+        Cached values are fetched at once, missing ones are calculated
+        using single grouped query. This avoids query per object when
+        rendering lists.
+        '''
+        objects = list(objects)
+        cache_keys = get_versioned_keys([
+            get_percents_key(**{field + '_id': obj.id}) for obj in objects
+        ])
+        keys = dict(zip(cache_keys, objects))
+
+        missing = {}
+        cached = cache.get_many(keys.keys())
+        for key, obj in keys.items():
+            if key in cached:
+                obj._percents = cached[key]
+            else:
+                obj._percents = (0, 0, 0)
+                missing[obj.id] = key
 
-        total = translations['total__sum']
+        if missing:
+            if field == 'project':
+                lookup = 'subproject__project'
+            else:
+                lookup = field
+            sums = self.filter(
+                **{lookup + '__in': missing.keys()}
+            ).values(lookup).annotate(*PERCENT_SUMS).order_by()
+            for item in sums:
+                keys[missing[item[lookup]]]._percents = calculate_percents(
+                    item
+                )
+            cache.set_many(dict(
+                [(key, keys[key]._percents) for key in missing.values()]
+            ))
 
-        # Catch no translations (division by zero)
-        if total == 0 or total is None:
-            return (0, 0, 0)
+        return objects
 
-        # Fetch values
-        result = [
-            translations['translated__sum'],
-            translations['fuzzy__sum'],
-            translations['failing_checks__sum'],
-        ]
-        # Calculate percent
-        return tuple([round(value * 100.0 / total, 1) for value in result])
+    def get_cached_total(self, project):
+        '''
+        Returns cached total number of strings in project. This is done
+        based on assumption that all languages have same number of strings,
+        so we just sum maximum for every subproject.
+        '''
+        cache_key = get_total_cache_key(project.id)
+        result = cache.get(cache_key)
+        if result is None:
+            totals = self.filter(
+                subproject__project=project
+            ).values('subproject').annotate(Max('total')).order_by()
+            result = sum([item['total__max'] for item in totals])
+            cache.set(cache_key, result)
+        return result
 
 
 class Translation(models.Model, URLMixin):
@@ -137,6 +285,15 @@ class Translation(models.Model, URLMixin):
     lock_user = models.ForeignKey(User, null=True, blank=True, default=None)
     lock_time = models.DateTimeField(default=datetime.now)
 
+    # Denormalized last content change, updated on creating Change
+    last_change = DenormalizedDateTimeField(
+        null=True, blank=True, default=None, editable=False
+    )
+    last_author = DenormalizedForeignKey(
+        User, null=True, blank=True, default=None, editable=False,
+        related_name='+', on_delete=models.SET_NULL
+    )
+
     objects = TranslationManager()
 
     class Meta:
@@ -161,6 +318,27 @@ class Translation(models.Model, URLMixin):
         super(Translation, self).__init__(*args, **kwargs)
         self._store = None
 
+    def refresh_last_change(self):
+        '''
+        Loads last change and author from the database.
+
+        These are updated only using querysets when creating Change, so
+        the instance might hold stale values.
+        '''
+        if self.id is None:
+            return
+        values = Translation.objects.filter(id=self.id).values_list(
+            'last_change', 'last_author'
+        )
+        if not values:
+            return
+        last_change, last_author_id = values[0]
+        if last_author_id != self.last_author_id:
+            # Drop cached user object for previous author
+            self.__dict__.pop('_last_author_cache', None)
+        self.last_change = last_change
+        self.last_author_id = last_author_id
+
     def has_acl(self, user):
         '''
         Checks whether current user is allowed to access this
@@ -380,13 +558,108 @@ class Translation(models.Model, URLMixin):
 
     def load_store(self):
         '''
-        Loads translate-toolkit storage from disk.
+        Loads translate-toolkit storage from disk (or process wide cache).
+        '''
+        filename = self.get_filename()
+        if self.subproject.has_template():
+            depends = (self.subproject.get_template_filename(),)
+        else:
+            depends = ()
+        return STORE_CACHE.get(
+            filename,
+            lambda: self.subproject.file_format_cls(
+                filename,
+                self.subproject.template_store
+            ),
+            depends,
+            self.subproject.file_format
+        )
+
+    def save_store(self):
+        '''
+        Saves translate-toolkit storage to disk and updates the cache.
+        '''
+        self.store.save()
+        STORE_CACHE.refresh(
+            self.get_filename(), self.subproject.file_format
+        )
+
+    def get_etag(self):
+        '''
+        Returns ETag identifying current content of translation file.
+
+        It is based on Git revision, but file stamp is included as well
+        as there might be uncommitted changes with lazy commits.
+        '''
+        md5 = hashlib.md5()
+        md5.update(self.revision.encode('utf-8'))
+        md5.update(repr(get_file_stamp(self.get_filename())))
+        return md5.hexdigest()
+
+    def supports_language_pack(self):
+        '''
+        Checks whether translation can be downloaded as language pack.
+        '''
+        return self.subproject.supports_language_pack()
+
+    def get_language_pack_meta(self):
+        '''
+        Returns language pack filename and mime type.
         '''
-        return self.subproject.file_format_cls(
-            self.get_filename(),
-            self.subproject.template_store
+        return self.subproject.file_format_cls.get_language_pack_meta(
+            self.get_filename()
         )
 
+    def get_language_pack_filename(self):
+        '''
+        Returns filename of compiled language pack for current content.
+        '''
+        extension = os.path.splitext(self.get_language_pack_meta()[0])[1]
+        return os.path.join(
+            self.subproject.get_language_pack_path(),
+            self.language_code,
+            self.get_etag() + extension
+        )
+
+    def get_language_pack(self):
+        '''
+        Returns filename of compiled language pack, compiling it if it
+        does not exist yet.
+        '''
+        filename = self.get_language_pack_filename()
+        if not os.path.exists(filename):
+            self.update_language_pack()
+        return filename
+
+    def update_language_pack(self):
+        '''
+        Compiles language pack for current content and removes stale ones.
+        '''
+        filename = self.get_language_pack_filename()
+        if os.path.exists(filename):
+            return
+
+        dirname = os.path.dirname(filename)
+        if not os.path.exists(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Possibly created by concurrent process
+                if not os.path.exists(dirname):
+                    raise
+
+        # Write to temporary file and atomically move it into place
+        handle, tmpname = tempfile.mkstemp(dir=dirname)
+        os.chmod(tmpname, 0644)
+        with STORE_CACHE.get_lock(self.get_filename()):
+            data = self.store.get_language_pack()
+        with os.fdopen(handle, 'wb') as tmpfile:
+            tmpfile.write(data)
+        os.rename(tmpname, filename)
+
+        # Remove language packs for older revisions
+        remove_stale_files(dirname, filename)
+
     @property
     def store(self):
         '''
@@ -630,6 +903,20 @@ class Translation(models.Model, URLMixin):
 
         self.save()
         self.store_hash()
+        self.invalidate_stats_cache()
+
+    def invalidate_stats_cache(self):
+        '''
+        Invalidates cached aggregated stats of project, subproject and
+        language this translation belongs to. This also marks project
+        widgets as stale, they are rendered again on next request.
+        '''
+        invalidate_namespaces([
+            ('project', self.subproject.project_id),
+            ('subproject', self.subproject_id),
+        ])
+        # Language wide stats do not belong to any namespace
+        cache.delete(get_percents_cache_key(language_id=self.language_id))
 
     def store_hash(self):
         '''
@@ -643,29 +930,22 @@ class Translation(models.Model, URLMixin):
         '''
         Returns last autor of change done in Weblate.
         '''
-        from trans.models.changes import Change
-        try:
-            change = Change.objects.content().filter(translation=self)[0]
-            return self.get_author_name(change.user, email)
-        except IndexError:
+        if self.last_author_id is None:
             return None
+        return self.get_author_name(self.last_author, email)
 
     def get_last_change(self):
         '''
         Returns date of last change done in Weblate.
         '''
-        from trans.models.changes import Change
-        try:
-            change = Change.objects.content().filter(translation=self)[0]
-            return change.timestamp
-        except IndexError:
-            return None
+        return self.last_change
 
     def commit_pending(self, request, author=None, skip_push=False):
         '''
         Commits any pending changes.
         '''
-        # Get author of last changes
+        # Get author of last changes, it might have been changed meanwhile
+        self.refresh_last_change()
         last = self.get_last_author()
 
         # If it is same as current one, we don't have to commit
@@ -790,6 +1070,30 @@ class Translation(models.Model, URLMixin):
         if sync:
             self.store_hash()
 
+    def git_commit_pending(self, gitrepo):
+        '''
+        Commits pending changes as last author of translation.
+
+        The caller is responsible for checking that there are changes to
+        commit, for holding git lock of the repository and for updating
+        language pack afterwards.
+        '''
+        author = self.get_last_author()
+        timestamp = self.get_last_change()
+        weblate.logger.info(
+            'Commiting %s in %s as %s',
+            self.filename,
+            self,
+            author
+        )
+        try:
+            self.__git_commit(gitrepo, author, timestamp, True)
+        except git.GitCommandError:
+            # There might be another attempt on commit in same time
+            # so we will sleep a bit an retry
+            sleep_while_git_locked()
+            self.__git_commit(gitrepo, author, timestamp, True)
+
     def git_needs_commit(self):
         '''
         Checks whether there are some not commited changes.
@@ -862,8 +1166,9 @@ class Translation(models.Model, URLMixin):
         '''
         if user is None:
             user = request.user
-        # Save with lock acquired
-        with self.subproject.git_lock:
+        # Save with lock acquired, cached store is dropped on failure
+        filename = self.get_filename()
+        with self.subproject.git_lock, STORE_CACHE.modify(filename):
 
             src = unit.get_source_plurals()[0]
             add = False
@@ -931,7 +1236,7 @@ class Translation(models.Model, URLMixin):
             # commit possible previous changes (by other author)
             self.commit_pending(request, author)
             # save translation changes
-            self.store.save()
+            self.save_store()
             # commit Git repo if needed
             self.git_commit(request, author, timezone.now(), sync=True)
 
@@ -942,30 +1247,30 @@ class Translation(models.Model, URLMixin):
         Returns list of failing source checks on current subproject.
         '''
         result = [('all', _('All strings'))]
+        counts = self.get_counts()
 
         # All checks
-        sourcechecks = self.unit_set.count_type('sourcechecks', self)
-        if sourcechecks > 0:
+        if counts['sourcechecks'] > 0:
             result.append((
                 'sourcechecks',
-                _('Strings with any failing checks (%d)') % sourcechecks
+                _('Strings with any failing checks (%d)') %
+                counts['sourcechecks']
             ))
 
         # Process specific checks
         for check in CHECKS:
             if not CHECKS[check].source:
                 continue
-            cnt = self.unit_set.count_type(check, self)
+            cnt = counts[check]
             if cnt > 0:
                 desc = CHECKS[check].description + (' (%d)' % cnt)
                 result.append((check, desc))
 
         # Grab comments
-        sourcecomments = self.unit_set.count_type('sourcecomments', self)
-        if sourcecomments > 0:
+        if counts['sourcecomments'] > 0:
             result.append((
                 'sourcecomments',
-                _('Strings with comments (%d)') % sourcecomments
+                _('Strings with comments (%d)') % counts['sourcecomments']
             ))
 
         return result
@@ -975,9 +1280,10 @@ class Translation(models.Model, URLMixin):
         Returns list of failing checks on current translation.
         '''
         result = [('all', _('All strings'))]
+        counts = self.get_counts()
 
         # Untranslated strings
-        nottranslated = self.unit_set.count_type('untranslated', self)
+        nottranslated = self.total - self.translated
         if nottranslated > 0:
             result.append((
                 'untranslated',
@@ -985,11 +1291,10 @@ class Translation(models.Model, URLMixin):
             ))
 
         # Fuzzy strings
-        fuzzy = self.unit_set.count_type('fuzzy', self)
-        if fuzzy > 0:
+        if self.fuzzy > 0:
             result.append((
                 'fuzzy',
-                _('Fuzzy strings (%d)') % fuzzy
+                _('Fuzzy strings (%d)') % self.fuzzy
             ))
 
         # Translations with suggestions
@@ -1000,28 +1305,27 @@ class Translation(models.Model, URLMixin):
             ))
 
         # All checks
-        allchecks = self.unit_set.count_type('allchecks', self)
-        if allchecks > 0:
+        if self.failing_checks > 0:
             result.append((
                 'allchecks',
-                _('Strings with any failing checks (%d)') % allchecks
+                _('Strings with any failing checks (%d)') %
+                self.failing_checks
             ))
 
         # Process specific checks
         for check in CHECKS:
             if not CHECKS[check].target:
                 continue
-            cnt = self.unit_set.count_type(check, self)
+            cnt = counts[check]
             if cnt > 0:
                 desc = CHECKS[check].description + (' (%d)' % cnt)
                 result.append((check, desc))
 
         # Grab comments
-        targetcomments = self.unit_set.count_type('targetcomments', self)
-        if targetcomments > 0:
+        if counts['targetcomments'] > 0:
             result.append((
                 'targetcomments',
-                _('Strings with comments (%d)') % targetcomments
+                _('Strings with comments (%d)') % counts['targetcomments']
             ))
 
         return result
@@ -1031,8 +1335,9 @@ class Translation(models.Model, URLMixin):
         '''
         Merges translate-toolkit store into current translation.
         '''
-        # Merge with lock acquired
-        with self.subproject.git_lock:
+        # Merge with lock acquired, cached store is dropped on failure
+        filename = self.get_filename()
+        with self.subproject.git_lock, STORE_CACHE.modify(filename):
 
             store1 = self.store.store
             store1.require_index()
@@ -1072,7 +1377,7 @@ class Translation(models.Model, URLMixin):
 
             # Write to backend and commit
             self.commit_pending(request, author)
-            store1.save()
+            self.save_store()
             ret = self.git_commit(request, author, timezone.now(), True)
             self.check_sync()
 
@@ -1184,24 +1489,28 @@ class Translation(models.Model, URLMixin):
             return 0
         return round(self.get_failing_checks(check) * 100.0 / self.total, 1)
 
-    def invalidate_cache(self, cache_type=None):
+    def get_counts(self):
         '''
-        Invalidates any cached stats.
+        Returns dictionary with number of units matching filters.
+
+        All counts are calculated at once and stored as single cache
+        entry.
         '''
-        # Get parts of key cache
-        slug = self.subproject.get_full_slug()
-        code = self.language.code
+        cache_key = get_counts_cache_key(self.id)
+        counts = cache.get(cache_key)
+        if counts is None:
+            counts = self.unit_set.count_summary(self)
+            cache.set(cache_key, counts)
+        return counts
 
-        # Are we asked for specific cache key?
-        if cache_type is None:
-            keys = list(CHECKS)
-        else:
-            keys = [cache_type]
+    def invalidate_cache(self, cache_type=None):
+        '''
+        Invalidates any cached stats.
 
-        # Actually delete the cache
-        for rqtype in keys:
-            cache_key = 'counts-%s-%s-%s' % (slug, code, rqtype)
-            cache.delete(cache_key)
+        All counts are stored together within translation cache namespace,
+        so they are invalidated at once regardless of cache_type.
+        '''
+        invalidate_namespaces([('translation', self.id)])
 
     def get_kwargs(self):
         return {
@@ -1209,3 +1518,14 @@ class Translation(models.Model, URLMixin):
             'subproject': self.subproject.slug,
             'project': self.subproject.project.slug
         }
+
+
+@receiver(post_delete, sender=Translation)
+def translation_deleted(sender, instance, **kwargs):
+    '''
+    Invalidates aggregated stats when translation is removed.
+    '''
+    try:
+        instance.invalidate_stats_cache()
+    except SubProject.DoesNotExist:
+        pass
@@ -20,11 +20,10 @@
 
 from django.db import models
 from weblate import appsettings
-from django.db.models import Q
+from django.db.models import Q, Count, F
 from django.utils.translation import ugettext as _
 from django.utils.safestring import mark_safe
 from django.contrib import messages
-from django.core.cache import cache
 from whoosh import qparser
 import traceback
 from trans.checks import CHECKS
@@ -80,44 +79,74 @@ class UnitManager(models.Manager):
     def filter_checks(self, rqtype, translation):
         '''
         Filtering for checks.
+
+        Uses index of failing checks, which links units only to checks
+        for their language and to source checks.
         '''
-        from trans.models.unitdata import Check
+        from trans.models.unitdata import UnitCheck
 
-        # Filter checks for current project
-        checks = Check.objects.filter(
-            project=translation.subproject.project,
-            ignore=False
+        # All checks are covered by flag
+        if rqtype == 'allchecks':
+            return self.filter(has_failing_check=True)
+
+        # Filter checks for current translation
+        checks = UnitCheck.objects.filter(
+            unit__translation=translation,
+            check__ignore=False
         )
 
-        filter_translated = True
+        filter_translated = False
 
-        # Filter by language
-        if rqtype == 'allchecks':
-            return self.filter(has_failing_check=True)
-        elif rqtype == 'sourcechecks':
-            checks = checks.filter(language=None)
-            filter_translated = False
-        elif CHECKS[rqtype].source and CHECKS[rqtype].target:
-            checks = checks.filter(
-                Q(language=translation.language) | Q(language=None)
-            )
-            filter_translated = False
-        elif CHECKS[rqtype].source:
-            checks = checks.filter(language=None)
-            filter_translated = False
-        elif CHECKS[rqtype].target:
-            checks = checks.filter(language=translation.language)
-
-        # Filter by check type
-        if not rqtype in ['allchecks', 'sourcechecks']:
-            checks = checks.filter(check=rqtype)
-
-        checks = checks.values_list('checksum', flat=True)
-        ret = self.filter(checksum__in=checks)
+        if rqtype == 'sourcechecks':
+            checks = checks.filter(check__language=None)
+        else:
+            checks = checks.filter(check__check=rqtype)
+            filter_translated = not CHECKS[rqtype].source
+
+        ret = self.filter(id__in=checks.values('unit'))
         if filter_translated:
             ret = ret.filter(translated=True)
         return ret
 
+    def count_checks(self, translation):
+        '''
+        Returns dictionary with number of units failing each check
+        calculated by single grouped query.
+        '''
+        from trans.models.unitdata import UnitCheck
+
+        result = dict([(check, 0) for check in CHECKS])
+
+        rows = UnitCheck.objects.filter(
+            unit__translation=translation,
+            check__ignore=False
+        ).values(
+            'check__check', 'unit__translated'
+        ).annotate(
+            Count('unit', distinct=True)
+        ).order_by()
+
+        for row in rows:
+            check = row['check__check']
+            if check not in CHECKS:
+                continue
+            # Target only checks are counted on translated units
+            if not row['unit__translated'] and not CHECKS[check].source:
+                continue
+            result[check] += row['unit__count']
+
+        return result
+
+    def count_summary(self, translation):
+        '''
+        Returns dictionary with number of units matching filters, which
+        are not covered by translation counters.
+        '''
+        result = self.count_checks(translation)
+        for rqtype in ('sourcechecks', 'sourcecomments', 'targetcomments'):
+            result[rqtype] = self.filter_type(rqtype, translation).count()
+        return result
+
     def filter_type(self, rqtype, translation):
         '''
         Basic filtering based on unit state or failed checks.
@@ -161,22 +190,13 @@ class UnitManager(models.Manager):
         elif rqtype == 'suggestions':
             return translation.have_suggestion
 
-        # Try to get value from cache
-        cache_key = 'counts-%s-%s-%s' % (
-            translation.subproject.get_full_slug(),
-            translation.language.code,
-            rqtype
-        )
-        ret = cache.get(cache_key)
-        if ret is not None:
-            return ret
+        # Use cached summary of counts
+        counts = translation.get_counts()
+        if rqtype in counts:
+            return counts[rqtype]
 
         # Actually count units
-        ret = self.filter_type(rqtype, translation).count()
-
-        # Update cache
-        cache.set(cache_key, ret)
-        return ret
+        return self.filter_type(rqtype, translation).count()
 
     def review(self, date, user):
         '''
@@ -444,6 +464,12 @@ class Unit(models.Model):
 
     objects = UnitManager()
 
+    def __init__(self, *args, **kwargs):
+        super(Unit, self).__init__(*args, **kwargs)
+        # Remember state loaded from the database for change notifications
+        self.old_target = self.target
+        self.old_translated = self.translated
+
     class Meta:
         permissions = (
             ('save_translation', "Can save translation"),
@@ -577,9 +603,7 @@ class Unit(models.Model):
         '''
         Stores unit to backend.
         '''
-        from accounts.models import (
-            notify_new_translation, notify_new_contributor
-        )
+        from accounts.models import Profile, notify_new_translation
         from trans.models.changes import Change
 
         # Update lock timestamp
@@ -627,9 +651,6 @@ class Unit(models.Model):
         # removed)
         self.flags = pounit.get_flags()
 
-        # Get old unit from database (for notifications)
-        oldunit = Unit.objects.get(id=self.id)
-
         # Save updated unit to database
         self.save(backend=True)
 
@@ -637,25 +658,18 @@ class Unit(models.Model):
         old_translated = self.translation.translated
         self.translation.update_stats()
 
-        # Notify subscribed users about new translation
-        notify_new_translation(self, oldunit, request.user)
+        # Notify subscribed users about new translation (this includes
+        # notification about new contributor)
+        notify_new_translation(self, request.user)
 
         # Update user stats
-        profile = request.user.get_profile()
-        profile.translated += 1
-        profile.save()
-
-        # Notify about new contributor
-        user_changes = Change.objects.filter(
-            translation=self.translation,
-            user=request.user
+        Profile.objects.filter(user=request.user).update(
+            translated=F('translated') + 1
         )
-        if not user_changes.exists():
-            notify_new_contributor(self, request.user)
 
         # Generate Change object for this change
         if gen_change:
-            if oldunit.translated:
+            if self.old_translated:
                 action = Change.ACTION_CHANGE
             else:
                 action = Change.ACTION_NEW
@@ -667,6 +681,10 @@ class Unit(models.Model):
                 user=request.user
             )
 
+        # Remember current state as base for further changes
+        self.old_target = self.target
+        self.old_translated = self.translated
+
         # Force commiting on completing translation
         if (old_translated < self.translation.translated
                 and self.translation.translated == self.translation.total):
@@ -873,10 +891,12 @@ class Unit(models.Model):
             if not same_source.exists():
                 self.checks().delete()
                 self.translation.invalidate_cache()
+                self.update_check_index()
                 return
 
             # If there is no consistency checking, we can return
             if not 'inconsistent' in CHECKS:
+                self.update_check_index()
                 return
 
             # Limit checks to consistency check for fuzzy messages
@@ -906,7 +926,7 @@ class Unit(models.Model):
                         language=self.translation.language,
                         ignore=False,
                         check=check
-                    )
+                    ).link_units()
             # Source check
             if check_obj.source and check_obj.check_source(src, self):
                 if check in old_source_checks:
@@ -920,15 +940,38 @@ class Unit(models.Model):
                         language=None,
                         ignore=False,
                         check=check
-                    )
+                    ).link_units()
 
         # Delete no longer failing checks
         if cleanup_checks:
             self.cleanup_checks(old_source_checks, old_target_checks)
 
+        # Link checks created by other units
+        self.update_check_index()
+
         # Update failing checks flag
         self.update_has_failing_check()
 
+    def update_check_index(self):
+        '''
+        Adds missing checks to index of failing checks for this unit.
+
+        Links to checks which were removed are deleted together with the
+        checks.
+        '''
+        from trans.models.unitdata import Check, UnitCheck
+        checks = set(Check.objects.filter(
+            checksum=self.checksum,
+            project=self.translation.subproject.project,
+        ).filter(
+            Q(language=self.translation.language) | Q(language=None)
+        ).values_list('id', flat=True))
+        linked = set(self.unitcheck_set.values_list('check_id', flat=True))
+        UnitCheck.objects.bulk_create([
+            UnitCheck(unit=self, check_id=check_id)
+            for check_id in checks - linked
+        ])
+
     def update_has_failing_check(self):
         '''
         Updates flag counting failing checks.
@@ -263,6 +263,31 @@ class Check(models.Model, RelatedUnitMixin):
         for unit in self.get_related_units():
             unit.update_has_failing_check()
 
+    def link_units(self):
+        '''
+        Adds check to index of failing checks of all related units.
+        '''
+        linked = UnitCheck.objects.filter(check=self).values('unit')
+        unit_ids = self.get_related_units().exclude(
+            id__in=linked
+        ).values_list('id', flat=True)
+        UnitCheck.objects.bulk_create([
+            UnitCheck(unit_id=unit_id, check=self) for unit_id in unit_ids
+        ])
+
+
+class UnitCheck(models.Model):
+    '''
+    Index of failing checks for units, used for fast filtering and
+    counting of units failing given check.
+    '''
+    unit = models.ForeignKey(Unit)
+    check = models.ForeignKey(Check)
+
+    class Meta:
+        app_label = 'trans'
+        unique_together = ('unit', 'check')
+
 
 class IndexUpdate(models.Model):
     unit = models.ForeignKey(Unit)
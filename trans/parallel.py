@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Parallel processing of operations on git repositories.
+
+Network operations (fetching and pushing) are done in parallel for
+distinct repositories, while merging and rescanning translations is done
+serially in calling thread as it needs database access and linked
+subprojects share the repository. Failures are reported in calling thread
+as well, as reporting them needs request or sends mails.
+
+Threads are used only when asked for, which is done by management
+commands, operations triggered from web requests run serially.
+'''
+
+from weblate import appsettings
+import weblate
+
+import Queue
+import threading
+import time
+
+
+def get_repositories(subprojects):
+    '''
+    Returns list of subprojects owning repositories used by given
+    subprojects, every repository is included just once.
+    '''
+    result = []
+    seen = set()
+    for subproject in subprojects:
+        if subproject.is_repo_link():
+            subproject = subproject.linked_subproject
+        if subproject.id in seen:
+            continue
+        seen.add(subproject.id)
+        result.append(subproject)
+    return result
+
+
+def run_parallel(function, items, threads=None):
+    '''
+    Calls function for all items using at most given number of threads
+    (defaults to PARALLEL_REPOSITORIES).
+
+    Returns list of tuples with result and exception raised by the
+    function (None if it succeeded) in same order as items.
+    '''
+    if threads is None:
+        threads = appsettings.PARALLEL_REPOSITORIES
+    results = [(None, None)] * len(items)
+
+    def worker(queue):
+        while True:
+            try:
+                index, item = queue.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[index] = (function(item), None)
+            except Exception as error:
+                results[index] = (None, error)
+
+    queue = Queue.Queue()
+    for index, item in enumerate(items):
+        queue.put((index, item))
+
+    # Avoid spawning threads if there is nothing to parallelize
+    if threads <= 1 or len(items) <= 1:
+        worker(queue)
+        return results
+
+    workers = [
+        threading.Thread(target=worker, args=(queue,))
+        for dummy in range(min(threads, len(items)))
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results
+
+
+def fetch_repository(subproject):
+    '''
+    Fetches remote changes, returns time spent.
+    '''
+    start = time.time()
+    subproject.fetch_remote_branch()
+    return time.time() - start
+
+
+def update_repositories(subprojects, request=None, threads=1):
+    '''
+    Updates repositories used by subprojects, fetching them in given
+    number of threads (None for PARALLEL_REPOSITORIES).
+
+    Returns list of dictionaries with subproject owning the repository,
+    result of update, timings of fetch and update (merge and rescan) and
+    error message if fetching failed.
+    '''
+    repositories = get_repositories(subprojects)
+    # Make sure related objects are fetched in this thread
+    names = [repository.__unicode__() for repository in repositories]
+
+    fetches = run_parallel(fetch_repository, repositories, threads)
+
+    results = []
+    items = zip(repositories, names, fetches)
+    for repository, name, (fetch, error) in items:
+        item = {
+            'subproject': repository,
+            'result': False,
+            'fetch': fetch,
+            'update': None,
+            'error': None,
+        }
+        results.append(item)
+
+        # Nothing to merge if fetch has failed
+        if error is not None:
+            item['error'] = str(error)
+            weblate.logger.error(
+                'failed to fetch repo %s: %s', name, item['error']
+            )
+            continue
+
+        start = time.time()
+        item['result'] = repository.do_update(request, fetch=False)
+        item['update'] = time.time() - start
+        weblate.logger.info(
+            'updated repo %s (fetch %.2fs, update %.2fs)',
+            name, item['fetch'], item['update']
+        )
+    return results
+
+
+def push_repository(subproject):
+    '''
+    Pushes repository, returns time spent.
+    '''
+    start = time.time()
+    subproject.push_remote_branch()
+    return time.time() - start
+
+
+def push_repositories(subprojects, request=None, force_commit=True,
+                      threads=1):
+    '''
+    Pushes repositories used by subprojects.
+
+    Local changes are commited and merged with remote serially, fetches
+    and pushes are done in given number of threads (None for
+    PARALLEL_REPOSITORIES). Returns list of dictionaries with subproject
+    owning the repository, result of push, timings of commit, fetch,
+    update (merge and rescan) and push and error message if fetching or
+    pushing failed.
+    '''
+    repositories = get_repositories(subprojects)
+    # Make sure related objects are fetched in this thread
+    names = [repository.__unicode__() for repository in repositories]
+
+    # Commit pending changes and check whether there is something to push
+    results = []
+    pending = []
+    for repository in repositories:
+        start = time.time()
+        prepared = repository.prepare_push(
+            request, force_commit, do_update=False
+        )
+        results.append({
+            'subproject': repository,
+            'result': False,
+            'commit': time.time() - start,
+            'fetch': None,
+            'update': None,
+            'push': None,
+            'error': None,
+        })
+        if prepared:
+            pending.append(results[-1])
+
+    # Merge remote changes, pushing is possible only if all are merged
+    fetches = run_parallel(
+        fetch_repository,
+        [item['subproject'] for item in pending],
+        threads
+    )
+    merged = []
+    for item, (fetch, error) in zip(pending, fetches):
+        if error is not None:
+            item['error'] = str(error)
+            weblate.logger.error(
+                'failed to fetch repo %s: %s',
+                item['subproject'].__unicode__(),
+                item['error']
+            )
+            continue
+        item['fetch'] = fetch
+        start = time.time()
+        item['subproject'].do_update(request, fetch=False)
+        item['update'] = time.time() - start
+        if not item['subproject'].git_needs_merge():
+            merged.append(item)
+
+    pushes = run_parallel(
+        push_repository,
+        [item['subproject'] for item in merged],
+        threads
+    )
+    for item, (push, error) in zip(merged, pushes):
+        if error is not None:
+            item['error'] = str(error)
+            item['subproject'].notify_push_failure(request, error)
+            continue
+        item['result'] = True
+        item['push'] = push
+
+    for item, name in zip(results, names):
+        if item['error'] is not None:
+            continue
+        weblate.logger.info(
+            'pushed repo %s (commit %.2fs, fetch %.2fs, update %.2fs, '
+            'push %.2fs)',
+            name,
+            item['commit'],
+            item['fetch'] or 0,
+            item['update'] or 0,
+            item['push'] or 0,
+        )
+    return results
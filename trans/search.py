@@ -31,6 +31,7 @@ from whoosh.index import create_in, open_dir
 from whoosh.writing import BufferedWriter
 from django.dispatch import receiver
 from lang.models import Language
+from trans.instrumentation import record
 
 TARGET_SCHEMA = Schema(
     checksum=ID(stored=True, unique=True),
@@ -184,6 +185,7 @@ class Index(object):
         '''
         Returns source index searcher (on buffered writer).
         '''
+        record('searchers')
         if not buffered:
             return self.source().searcher()
         return self.source_writer(buffered).searcher()
@@ -192,6 +194,7 @@ class Index(object):
         '''
         Returns target index searcher (on buffered writer) for given language.
         '''
+        record('searchers')
         if not buffered:
             return self.target(lang).searcher()
         return self.target_writer(lang, buffered).searcher()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Storage of search results used while translating.
+'''
+
+from array import array
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db.models import Q
+import threading
+import time
+import uuid
+
+# Number of unit IDs fetched from database at once
+CHUNK_SIZE = 1000
+
+# Number of search results kept in process memory
+MAX_ITEMS = 100
+
+# How long are search results kept
+TIMEOUT = 86400
+
+
+def after_unit(queryset, position, unit_id):
+    '''
+    Filters units following given one in (position, id) order.
+    '''
+    return queryset.filter(
+        Q(position__gt=position) | Q(position=position, id__gt=unit_id)
+    )
+
+
+def before_unit(queryset, position, unit_id):
+    '''
+    Filters units preceding given one in (position, id) order.
+    '''
+    return queryset.filter(
+        Q(position__lt=position) | Q(position=position, id__lt=unit_id)
+    )
+
+
+def get_cursor(unit):
+    '''
+    Returns keyset cursor for unit to be used in URLs.
+    '''
+    return '%d-%d' % (unit.position, unit.id)
+
+
+def parse_cursor(value):
+    '''
+    Parses keyset cursor, returns tuple (position, id) or None.
+    '''
+    try:
+        position, unit_id = value.split('-')
+        return int(position), int(unit_id)
+    except ValueError:
+        return None
+
+
+class SearchResult(object):
+    '''
+    Lazily evaluated search result.
+
+    Only the query is stored initially, unit IDs are fetched in chunks
+    using keyset pagination as they are needed and kept in compact array.
+    '''
+
+    def __init__(self, translation, name, queryset, owner):
+        self.search_id = str(uuid.uuid4())
+        self.translation_id = translation.id
+        # Search results are private to user (or session) who searched
+        self.owner = owner
+        self.name = name
+        self.query = queryset.query
+        self.count = queryset.count()
+        self.offset = 0
+        self.ids = array('l')
+        self.last = None
+        self.complete = False
+
+    def __len__(self):
+        return self.count
+
+    def get_queryset(self):
+        '''
+        Returns queryset matching search result.
+        '''
+        from trans.models.unit import Unit
+        queryset = Unit.objects.all()
+        queryset.query = self.query
+        return queryset.order_by('position', 'id')
+
+    def load_chunk(self):
+        '''
+        Fetches next chunk of unit IDs.
+        '''
+        queryset = self.get_queryset()
+        if self.last is not None:
+            queryset = after_unit(queryset, *self.last)
+        rows = list(queryset.values_list('position', 'id')[:CHUNK_SIZE])
+        self.ids.extend([row[1] for row in rows])
+        if rows:
+            self.last = rows[-1]
+        if len(rows) < CHUNK_SIZE:
+            self.complete = True
+
+    def get_id(self, offset):
+        '''
+        Returns unit ID at given offset or None if it is out of range.
+        '''
+        while len(self.ids) <= offset and not self.complete:
+            self.load_chunk()
+        if offset < 0 or offset >= len(self.ids):
+            return None
+        return self.ids[offset]
+
+    def get_next(self, position, unit_id):
+        '''
+        Returns first unit following given position and still matching
+        the search or None.
+        '''
+        units = after_unit(self.get_queryset(), position, unit_id)[:1]
+        if len(units) == 0:
+            return None
+        return units[0]
+
+    def get_previous(self, position, unit_id):
+        '''
+        Returns last unit preceding given position and still matching
+        the search or None.
+        '''
+        units = before_unit(
+            self.get_queryset(), position, unit_id
+        ).reverse()[:1]
+        if len(units) == 0:
+            return None
+        return units[0]
+
+    def get_offset(self, unit):
+        '''
+        Returns offset of unit within the result.
+        '''
+        return before_unit(
+            self.get_queryset(), unit.position, unit.id
+        ).count()
+
+
+class SearchStore(object):
+    '''
+    Store of search results.
+
+    Results are kept in process wide LRU cache and in shared Django cache,
+    so that they are available in all processes. Results are never
+    deleted, they expire after timeout.
+    '''
+
+    def __init__(self, max_items, timeout):
+        self.max_items = max_items
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_cache_key(self, search_id):
+        '''
+        Returns key for shared cache.
+        '''
+        return 'search-%s' % search_id
+
+    def get(self, search_id):
+        '''
+        Returns stored search result or None.
+        '''
+        now = time.time()
+        with self._lock:
+            entry = self._data.pop(search_id, None)
+            if entry is not None and entry[0] > now:
+                self._data[search_id] = entry
+                return entry[1]
+
+        result = cache.get(self.get_cache_key(search_id))
+        if result is not None:
+            self._store_local(result)
+        return result
+
+    def _store_local(self, result):
+        '''
+        Stores search result in process memory.
+        '''
+        with self._lock:
+            self._data.pop(result.search_id, None)
+            self._data[result.search_id] = (time.time() + self.timeout, result)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def set(self, result):
+        '''
+        Stores search result.
+        '''
+        self._store_local(result)
+        cache.set(self.get_cache_key(result.search_id), result, self.timeout)
+
+
+SEARCH_STORE = SearchStore(MAX_ITEMS, TIMEOUT)
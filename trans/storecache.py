@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Process wide cache of parsed translation files.
+'''
+
+import os
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from weblate import appsettings
+
+# Parsed translate-toolkit stores take roughly this many times more memory
+# than the file on disk
+MEMORY_FACTOR = 10
+
+
+def get_file_stamp(*paths):
+    '''
+    Returns tuple identifying current state of given files.
+    '''
+    result = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            result.append((stat.st_mtime, stat.st_size, stat.st_ino))
+        except OSError:
+            result.append(None)
+    return tuple(result)
+
+
+class StoreCache(object):
+    '''
+    LRU cache of parsed stores keyed by absolute filename and tag.
+
+    Every entry remembers modification stamp of the file (and files it
+    depends on, eg. template) and is considered valid only while the
+    stamp matches. Entries are evicted based on approximate memory size.
+    '''
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._file_locks = {}
+
+    def get(self, filename, loader, depends=(), tag=None):
+        '''
+        Returns cached object for filename or loads it using loader.
+
+        The tag can be used to distinguish different ways of loading
+        same file (eg. different file formats or loading it as template),
+        these are cached independently.
+        '''
+        if self.max_size <= 0:
+            return loader()
+
+        key = (os.path.abspath(filename), tag)
+        stamp = get_file_stamp(key[0], *depends)
+
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                if entry['stamp'] == stamp:
+                    # Move to the end of LRU list
+                    self._data[key] = entry
+                    self.hits += 1
+                    return entry['value']
+                self.size -= entry['size']
+            self.misses += 1
+
+        value = loader()
+        self._store(key, value, stamp, depends)
+        return value
+
+    def _store(self, key, value, stamp, depends):
+        '''
+        Stores object in the cache and evicts old entries if needed.
+        '''
+        size = MEMORY_FACTOR * sum(
+            [item[1] for item in stamp if item is not None]
+        )
+        # Do not cache objects which would not fit at all
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old['size']
+            self._data[key] = {
+                'stamp': stamp,
+                'size': size,
+                'value': value,
+                'depends': depends,
+            }
+            self.size += size
+
+            while self.size > self.max_size:
+                dummy, old = self._data.popitem(last=False)
+                self.size -= old['size']
+
+    def refresh(self, filename, tag=None):
+        '''
+        Updates stamp of cached object after it has been written to disk,
+        so that we do not have to parse it again.
+
+        Objects loaded from same file with other tags are not refreshed,
+        they will be loaded again as the file has changed.
+        '''
+        key = (os.path.abspath(filename), tag)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return
+            stamp = get_file_stamp(key[0], *entry['depends'])
+            self._store(key, entry['value'], stamp, entry['depends'])
+
+    def invalidate(self, filename):
+        '''
+        Removes file from the cache (loaded with any tag).
+        '''
+        filename = os.path.abspath(filename)
+        with self._lock:
+            for key in self._data.keys():
+                if key[0] == filename:
+                    self.size -= self._data.pop(key)['size']
+
+    def get_lock(self, filename):
+        '''
+        Returns lock serializing access to objects loaded from filename.
+        '''
+        filename = os.path.abspath(filename)
+        with self._lock:
+            if filename not in self._file_locks:
+                self._file_locks[filename] = threading.RLock()
+            return self._file_locks[filename]
+
+    @contextmanager
+    def modify(self, filename):
+        '''
+        Context manager for in place modifications of cached object.
+
+        Cached objects are shared by all threads, so the lock for the file
+        is held during the modification. The object is dropped from the
+        cache if modification fails.
+        '''
+        with self.get_lock(filename):
+            try:
+                yield
+            except:
+                self.invalidate(filename)
+                raise
+
+    def clear(self):
+        '''
+        Removes all cached objects.
+        '''
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+STORE_CACHE = StoreCache(appsettings.STORE_CACHE_SIZE)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+'''
+Lightweight SVG rendering helpers.
+
+Text is not rasterized, so its width is only estimated from precomputed
+font metrics, which is good enough for fitting texts into images.
+'''
+
+from xml.sax.saxutils import escape, quoteattr
+import base64
+import struct
+
+# Fonts used in SVG images, DejaVu Sans is default Sans font on most systems
+# and metrics below match it
+FONT_FAMILY = 'DejaVu Sans, Verdana, Geneva, sans-serif'
+
+# Pango font sizes are in points, images are rendered at 96 DPI
+POINT_SIZE = 96.0 / 72
+
+# Distance of baseline from top of text and line height (in em)
+ASCENT = 0.93
+LINE_HEIGHT = 1.17
+
+# Bold font is roughly this much wider
+BOLD_FACTOR = 1.1
+
+# Advance widths of DejaVu Sans characters (in 1/2048 em) for printable
+# ASCII characters starting with space
+CHAR_WIDTHS = (
+    651, 821, 942, 1716, 1303, 1946, 1597, 563, 799, 799, 1024, 1716, 651,
+    739, 651, 690, 1303, 1303, 1303, 1303, 1303, 1303, 1303, 1303, 1303,
+    1303, 690, 690, 1716, 1716, 1716, 1087, 2048, 1401, 1405, 1430, 1577,
+    1294, 1178, 1587, 1540, 604, 604, 1343, 1141, 1767, 1532, 1612, 1235,
+    1612, 1423, 1300, 1251, 1499, 1401, 2025, 1403, 1251, 1403, 799, 690,
+    799, 1716, 1024, 1024, 1255, 1300, 1126, 1300, 1260, 721, 1300, 1298,
+    569, 569, 1186, 569, 1995, 1298, 1253, 1300, 1300, 842, 1067, 803,
+    1298, 1212, 1675, 1212, 1212, 1075, 1303, 690, 1303, 1716,
+)
+
+# Width used for characters not listed above
+DEFAULT_WIDTH = 1300
+
+SVG_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<svg xmlns="http://www.w3.org/2000/svg" '
+    'xmlns:xlink="http://www.w3.org/1999/xlink" '
+    'width="%(width)d" height="%(height)d">\n'
+    '%(content)s'
+    '</svg>\n'
+)
+
+RECT_TEMPLATE = (
+    '<rect x="%(x).1f" y="%(y).1f" width="%(width).1f" '
+    'height="%(height).1f" %(style)s/>\n'
+)
+
+IMAGE_TEMPLATE = (
+    '<image x="0" y="0" width="%(width)d" height="%(height)d" '
+    'xlink:href="data:image/png;base64,%(data)s"/>\n'
+)
+
+TEXT_TEMPLATE = (
+    '<text x="%(x).1f" y="%(y).1f" font-family=%(family)s '
+    'font-size="%(size).1f" fill="%(color)s"%(extra)s>%(text)s</text>\n'
+)
+
+TSPAN_TEMPLATE = '<tspan x="%(x).1f" dy="%(dy).1f">%(text)s</tspan>'
+
+# Cache of embedded images
+IMAGES = {}
+
+
+def get_text_width(text, size, bold=False):
+    '''
+    Returns estimated width of text in pixels for given font size (in
+    pixels).
+    '''
+    width = 0
+    for char in text:
+        code = ord(char) - 32
+        if 0 <= code < len(CHAR_WIDTHS):
+            width += CHAR_WIDTHS[code]
+        else:
+            width += DEFAULT_WIDTH
+    width = width * size / 2048.0
+    if bold:
+        width *= BOLD_FACTOR
+    return width
+
+
+def get_color(rgb):
+    '''
+    Converts cairo color tuple to SVG color.
+    '''
+    return '#%02x%02x%02x' % tuple(
+        [int(round(min(1, max(0, value)) * 255)) for value in rgb]
+    )
+
+
+def get_png_image(filename):
+    '''
+    Returns tuple (width, height, base64 data) for PNG image.
+    '''
+    if filename not in IMAGES:
+        with open(filename, 'rb') as handle:
+            data = handle.read()
+        # Dimensions are stored in IHDR chunk
+        width, height = struct.unpack('>II', data[16:24])
+        IMAGES[filename] = (width, height, base64.b64encode(data))
+    return IMAGES[filename]
+
+
+def render_image(filename):
+    '''
+    Returns SVG code for embedded PNG image.
+    '''
+    width, height, data = get_png_image(filename)
+    return IMAGE_TEMPLATE % {
+        'width': width,
+        'height': height,
+        'data': data,
+    }
+
+
+def render_rect(pos_x, pos_y, width, height, fill=None, stroke=None,
+                line_width=1):
+    '''
+    Returns SVG code for rectangle.
+    '''
+    if fill is None:
+        style = 'fill="none" '
+    else:
+        style = 'fill="%s" ' % get_color(fill)
+    if stroke is not None:
+        style += 'stroke="%s" stroke-width="%.1f" ' % (
+            get_color(stroke), line_width
+        )
+    return RECT_TEMPLATE % {
+        'x': pos_x,
+        'y': pos_y,
+        'width': width,
+        'height': height,
+        'style': style,
+    }
+
+
+def render_text(text, pos_x, pos_y, size, color, bold=False, extra=''):
+    '''
+    Returns SVG code for text, position is top left corner of the text
+    (as used by Pango). Text can have multiple lines.
+    '''
+    lines = text.split('\n')
+    if len(lines) == 1:
+        content = escape(text)
+    else:
+        content = ''.join([
+            TSPAN_TEMPLATE % {
+                'x': pos_x,
+                'dy': 0 if pos == 0 else size * LINE_HEIGHT,
+                'text': escape(line),
+            }
+            for pos, line in enumerate(lines)
+        ])
+    if bold:
+        extra += ' font-weight="bold"'
+    return TEXT_TEMPLATE % {
+        'x': pos_x,
+        'y': pos_y + size * ASCENT,
+        'family': quoteattr(FONT_FAMILY),
+        'size': size,
+        'color': get_color(color),
+        'extra': extra,
+        'text': content,
+    }
+
+
+def render_svg(width, height, content):
+    '''
+    Returns complete SVG document.
+    '''
+    result = SVG_TEMPLATE % {
+        'width': width,
+        'height': height,
+        'content': ''.join(content),
+    }
+    if isinstance(result, unicode):
+        result = result.encode('utf-8')
+    return result
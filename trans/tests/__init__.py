@@ -46,3 +46,10 @@ from trans.tests.machine import *
 from trans.tests.changes import *
 from trans.tests.admin import *
 from trans.tests.requirements import *
+from trans.tests.storecache import *
+from trans.tests.searchstore import *
+from trans.tests.cacheversion import *
+from trans.tests.instrumentation import *
+from trans.tests.benchmark import *
+from trans.tests.dictionaryindex import *
+from trans.tests.parallel import *
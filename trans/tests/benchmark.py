@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Tests for benchmarking helpers.
+"""
+
+from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+from translate.storage.pypo import pofile
+from trans.benchmark import (
+    Benchmark, generate_repo, get_language_codes, percentile
+)
+from trans.management.commands.benchmark import Command
+import tempfile
+import shutil
+import os
+import git
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.workdir = tempfile.mkdtemp()
+        self.project_path = os.path.join(settings.GIT_ROOT, 'benchmark')
+        if os.path.exists(self.project_path):
+            shutil.rmtree(self.project_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+        if os.path.exists(self.project_path):
+            shutil.rmtree(self.project_path)
+
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 90), 5)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile([], 50), 0)
+
+    def test_generate(self):
+        path = os.path.join(self.workdir, 'repo')
+        codes = generate_repo(path, 'po', 20, 2)
+        self.assertEqual(codes, get_language_codes(2))
+        store = pofile.parsefile(os.path.join(path, 'po', '%s.po' % codes[0]))
+        self.assertEqual(len(store.units), 21)
+        repo = git.Repo(path)
+        self.assertFalse(repo.is_dirty())
+
+    def test_generate_android(self):
+        path = os.path.join(self.workdir, 'repo')
+        generate_repo(path, 'aresource', 20, 1)
+        self.assertTrue(
+            os.path.exists(os.path.join(path, 'res/values/strings.xml'))
+        )
+
+    def test_run(self):
+        benchmark = Benchmark(self.workdir, 10, 2, 3)
+        results = benchmark.run(['po'])
+        self.assertEqual(
+            set(results['po'].keys()),
+            set(['import', 'update_from_blob', 'save_backend', 'check',
+                 'fulltext'])
+        )
+        self.assertEqual(results['po']['import']['units'], 20)
+        self.assertEqual(results['po']['fulltext']['samples'], 3)
+        self.assertTrue(results['po']['import']['queries'] > 0)
+
+    def test_shared_cache(self):
+        command = Command()
+        # Test settings use wrapped local memory cache
+        command.check_cache()
+        with override_settings(CACHES={
+            'default': {
+                'BACKEND':
+                    'django.core.cache.backends.memcached.MemcachedCache',
+                'LOCATION': '127.0.0.1:11211',
+            }
+        }):
+            self.assertRaises(CommandError, command.check_cache)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tests for versioned cache namespaces.
+"""
+
+from django.test import TestCase
+from django.core.cache import cache
+from trans.cacheversion import (
+    get_versioned_key, get_versioned_keys, invalidate_namespaces
+)
+
+
+class CacheVersionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stable(self):
+        self.assertEqual(
+            get_versioned_key('test', [('project', 1)]),
+            get_versioned_key('test', [('project', 1)]),
+        )
+        self.assertEqual(get_versioned_key('test', []), 'test')
+
+    def test_invalidate(self):
+        key = get_versioned_key('test', [('project', 1), ('subproject', 2)])
+        other = get_versioned_key('test', [('project', 2)])
+        invalidate_namespaces([('subproject', 2)])
+        self.assertNotEqual(
+            get_versioned_key('test', [('project', 1), ('subproject', 2)]),
+            key
+        )
+        self.assertEqual(get_versioned_key('test', [('project', 2)]), other)
+
+    def test_batch(self):
+        keys = get_versioned_keys([
+            ('first', [('project', 1)]),
+            ('second', [('project', 1), ('translation', 3)]),
+        ])
+        self.assertEqual(keys[0], get_versioned_key('first', [('project', 1)]))
+        self.assertEqual(
+            keys[1],
+            get_versioned_key('second', [('project', 1), ('translation', 3)])
+        )
@@ -24,6 +24,8 @@ Tests for changes browsing.
 
 from trans.tests.views import ViewTestCase
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
+from trans.models import Change
 
 
 class ChangesTest(ViewTestCase):
@@ -74,3 +76,37 @@ class ChangesTest(ViewTestCase):
         )
         self.assertContains(response, 'New translation')
         self.assertNotContains(response, 'Invalid search string!')
+
+
+class ActivityStatsTest(ViewTestCase):
+    def get_total(self, stats):
+        return sum([item[1] for item in stats])
+
+    def test_stats(self):
+        translation = self.get_translation()
+        monthly = Change.objects.month_stats(translation=translation)
+        self.assertEqual(len(monthly), 30)
+        yearly = Change.objects.year_stats(project=self.project)
+        self.assertEqual(len(yearly), 53)
+        user = Change.objects.month_stats(user=self.user)
+        self.assertEqual(self.get_total(user), 0)
+
+        self.change_unit('Nazdar svete!\n')
+
+        # Cached stats are updated
+        self.assertEqual(
+            self.get_total(
+                Change.objects.month_stats(translation=translation)
+            ),
+            self.get_total(monthly) + 1
+        )
+        self.assertEqual(
+            self.get_total(Change.objects.year_stats(project=self.project)),
+            self.get_total(yearly) + 1
+        )
+        user = Change.objects.month_stats(user=self.user)
+        self.assertEqual(self.get_total(user), 1)
+
+        # Fresh calculation gives same result
+        cache.clear()
+        self.assertEqual(Change.objects.month_stats(user=self.user), user)
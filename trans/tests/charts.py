@@ -24,6 +24,8 @@ Tests for charts and widgets.
 
 from trans.tests.views import ViewTestCase
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
+from trans.models.changes import Change
 
 
 class ChartsTest(ViewTestCase):
@@ -132,3 +134,69 @@ class ChartsTest(ViewTestCase):
             )
         )
         self.assertPNG(response)
+
+    def test_activity_cache(self):
+        '''
+        Test of caching activity charts.
+        '''
+        url = reverse(
+            'monthly_activity_translation',
+            kwargs=self.kw_translation
+        )
+        response = self.client.get(url)
+        self.assertPNG(response)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # New change invalidates the chart
+        self.change_unit('Nazdar svete!\n')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertPNG(response)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_activity_count(self):
+        '''
+        Test of incrementing cached activity on new changes.
+        '''
+        translation = self.get_translation()
+        before = Change.objects.month_stats(translation=translation)
+        self.change_unit('Nazdar svete!\n')
+        self.change_unit('Ahoj svete!\n')
+        after = Change.objects.month_stats(translation=translation)
+        self.assertTrue(after[-1][1] >= before[-1][1] + 2)
+        self.assertEqual(after[:-1], before[:-1])
+
+        # Cached counts match the database
+        cache.clear()
+        self.assertEqual(
+            Change.objects.month_stats(translation=translation),
+            after
+        )
+
+    def test_activity_svg(self):
+        '''
+        Test of SVG activity charts.
+        '''
+        response = self.client.get(
+            reverse(
+                'yearly_activity_project',
+                kwargs={'project': self.project.slug, 'extension': 'svg'}
+            )
+        )
+        self.assertSVG(response)
+
+        response = self.client.get(
+            reverse(
+                'monthly_user_activity',
+                kwargs={'user': self.user.username, 'extension': 'svg'}
+            )
+        )
+        self.assertSVG(response)
@@ -24,7 +24,10 @@ Tests for dictionary manipulations.
 
 from trans.tests.views import ViewTestCase
 from trans.models import Dictionary
+from trans.exporters import iterate_words
+from lang.models import Language
 from django.core.urlresolvers import reverse
+from django.core.files import File
 from trans.tests.util import get_test_file
 
 TEST_TBX = get_test_file('terms.tbx')
@@ -98,6 +101,47 @@ class DictionaryTest(ViewTestCase):
         # Check number of imported objects
         self.assertEquals(Dictionary.objects.count(), 165)
 
+    def test_import_counts(self):
+        '''
+        Test for counts reported by glossary import.
+        '''
+        language = Language.objects.get(code='cs')
+
+        with open(TEST_TBX) as handle:
+            result = Dictionary.objects.upload(
+                self.project, language, File(handle), 'add'
+            )
+        self.assertEqual(
+            result,
+            {'created': 164, 'updated': 0, 'skipped': 0}
+        )
+
+        word = Dictionary.objects.get(target=u'podpůrná vrstva')
+        word.target = u'zkouška sirén'
+        word.save()
+
+        with open(TEST_TBX) as handle:
+            result = Dictionary.objects.upload(
+                self.project, language, File(handle), 'keep'
+            )
+        self.assertEqual(
+            result,
+            {'created': 0, 'updated': 0, 'skipped': 164}
+        )
+
+        with open(TEST_TBX) as handle:
+            result = Dictionary.objects.upload(
+                self.project, language, File(handle), 'overwrite'
+            )
+        self.assertEqual(
+            result,
+            {'created': 0, 'updated': 1, 'skipped': 163}
+        )
+        self.assertEquals(Dictionary.objects.count(), 164)
+        self.assertTrue(
+            Dictionary.objects.filter(target=u'podpůrná vrstva').exists()
+        )
+
     def test_edit(self):
         '''
         Test for manually adding words to glossary.
@@ -181,6 +225,21 @@ class DictionaryTest(ViewTestCase):
             u'msgid "wizard"\nmsgstr "průvodce"'
         )
 
+    def test_iterate_words(self):
+        '''
+        Test for chunked iteration over words.
+        '''
+        self.import_tbx()
+
+        words = Dictionary.objects.filter(
+            project=self.subproject.project,
+            language__code='cs',
+        )
+        expected = list(
+            words.order_by('source', 'id').values_list('source', 'target')
+        )
+        self.assertEqual(list(iterate_words(words, 3)), expected)
+
     def test_list(self):
         '''
         Test for listing dictionaries.
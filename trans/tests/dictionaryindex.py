@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tests for dictionary index.
+"""
+
+from django.test import TestCase
+from trans.dictionaryindex import DictionaryIndex
+
+
+class DictionaryIndexTest(TestCase):
+    def get_sources(self, index, *texts):
+        return [item['source'] for item in index.match(texts)]
+
+    def test_words(self):
+        index = DictionaryIndex([
+            (u'file', u'soubor'),
+            (u'Folders', u'slozky'),
+        ])
+        self.assertEqual(
+            self.get_sources(index, u'Open files in folder'),
+            [u'Folders', u'file']
+        )
+        self.assertEqual(self.get_sources(index, u'profile'), [])
+
+    def test_phrases(self):
+        index = DictionaryIndex([
+            (u'she sells', u'a'),
+            (u'sells sea', u'b'),
+            (u'sea', u'c'),
+            (u'sea shore', u'd'),
+            (u'', u'e'),
+        ])
+        self.assertEqual(
+            self.get_sources(index, u'She sells sea shells'),
+            [u'sea', u'sells sea', u'she sells']
+        )
+        self.assertEqual(
+            self.get_sources(index, u'sea', u'shore'),
+            [u'sea']
+        )
+
+    def test_bytes(self):
+        index = DictionaryIndex([
+            ('file', 'soubor'),
+        ])
+        self.assertEqual(self.get_sources(index, 'Open file'), ['file'])
@@ -25,6 +25,8 @@ Tests for data exports.
 from django.core.urlresolvers import reverse
 from django.utils import simplejson
 from trans.tests.views import ViewTestCase
+from trans.models import SubProject
+from trans.views.api import get_stats
 
 
 class ExportsViewTest(ViewTestCase):
@@ -56,9 +58,58 @@ class ExportsViewTest(ViewTestCase):
         response = self.client.get(
             reverse('export_stats', kwargs=self.kw_subproject)
         )
-        parsed = simplejson.loads(response.content)
+        parsed = simplejson.loads(''.join(response))
         self.assertEqual(parsed[0]['name'], 'Czech')
 
+    def test_export_stats_indent(self):
+        response = self.client.get(
+            reverse('export_stats', kwargs=self.kw_subproject),
+            {'indent': 2}
+        )
+        parsed = simplejson.loads(''.join(response))
+        self.assertEqual(parsed[0]['code'], 'cs')
+
+    def test_export_stats_project(self):
+        response = self.client.get(
+            reverse('export_stats_project', kwargs=self.kw_project)
+        )
+        parsed = simplejson.loads(''.join(response))
+        self.assertEqual(parsed[0]['name'], 'Czech')
+        self.assertEqual(parsed[0]['subproject'], self.subproject.slug)
+
+    def test_export_stats_root(self):
+        response = self.client.get(
+            reverse('export_stats_root')
+        )
+        parsed = simplejson.loads(''.join(response))
+        self.assertEqual(parsed[0]['project'], self.project.slug)
+
+    def test_export_stats_last_change(self):
+        self.change_unit(u'Nazdar svete!\n')
+        response = self.client.get(
+            reverse('export_stats', kwargs=self.kw_subproject)
+        )
+        parsed = simplejson.loads(''.join(response))
+        self.assertEqual(parsed[0]['last_author'], self.user.username)
+        self.assertNotEqual(parsed[0]['last_change'], None)
+
+    def test_stats_chunks(self):
+        SubProject.objects.create(
+            name='Extra',
+            slug='extra',
+            project=self.project,
+            repo='weblate://test/test',
+            file_format='po',
+            filemask='po/*.po',
+        )
+        subprojects = SubProject.objects.order_by('id')
+        stats = list(get_stats(subprojects))
+        self.assertEqual(
+            set([item['subproject'] for item in stats]),
+            set(['test', 'extra'])
+        )
+        self.assertEqual(list(get_stats(subprojects, chunk_size=1)), stats)
+
     def test_data(self):
         response = self.client.get(
             reverse('data_root')
@@ -25,6 +25,11 @@ Tests for import and export.
 from trans.tests.views import ViewTestCase
 from django.core.urlresolvers import reverse
 from trans.tests.util import get_test_file
+from cStringIO import StringIO
+from trans.util import remove_stale_files, STALE_FILE_GRACE
+import zipfile
+import os
+import time
 
 TEST_PO = get_test_file('cs.po')
 
@@ -170,6 +175,14 @@ class ExportTest(ViewTestCase):
     def create_subproject(self):
         return self.create_po()
 
+    def get_content(self, response):
+        '''
+        Returns content of possibly streamed response.
+        '''
+        if hasattr(response, 'streaming_content'):
+            return ''.join(response.streaming_content)
+        return response.content
+
     def test_export(self):
         response = self.client.get(
             reverse(
@@ -177,11 +190,38 @@ class ExportTest(ViewTestCase):
                 kwargs=self.kw_translation
             )
         )
-        self.assertContains(response, 'Weblate Hello World 2012')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            'Weblate Hello World 2012' in self.get_content(response)
+        )
         self.assertEqual(
             response['Content-Disposition'],
             'attachment; filename=test-test-cs.po'
         )
+        self.assertEqual(
+            response['Content-Type'],
+            'text/x-gettext-catalog'
+        )
+
+    def test_export_etag(self):
+        url = reverse(
+            'download_translation',
+            kwargs=self.kw_translation
+        )
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.get_content(response)
+
+        # Conditional GET
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Content change invalidates ETag
+        self.change_unit(u'Nazdar světe!\n')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.get_content(response)
 
     def test_language_pack(self):
         response = self.client.get(
@@ -194,3 +234,60 @@ class ExportTest(ViewTestCase):
             response['Content-Disposition'],
             'attachment; filename=cs.mo'
         )
+
+        # Conditional GET
+        response = self.client.get(
+            reverse(
+                'download_language_pack',
+                kwargs=self.kw_translation
+            ),
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_language_packs(self):
+        response = self.client.get(
+            reverse(
+                'download_language_packs',
+                kwargs=self.kw_subproject
+            )
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename=test-test.zip'
+        )
+        archive = zipfile.ZipFile(StringIO(self.get_content(response)))
+        self.assertTrue('cs/LC_MESSAGES/test.mo' in archive.namelist())
+
+        # Conditional GET
+        response = self.client.get(
+            reverse(
+                'download_language_packs',
+                kwargs=self.kw_subproject
+            ),
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_language_pack_precompiled(self):
+        translation = self.get_translation()
+        filename = translation.get_language_pack()
+        self.assertTrue(os.path.exists(filename))
+
+        # Change creates new language pack, old one is kept for a while
+        self.change_unit(u'Nazdar světe!\n')
+        translation = self.get_translation()
+        translation.update_language_pack()
+        current = translation.get_language_pack_filename()
+        self.assertNotEqual(filename, current)
+        self.assertTrue(os.path.exists(current))
+        self.assertTrue(os.path.exists(filename))
+
+        # Old pack is removed once superseded for longer than grace period
+        stamp = time.time() - STALE_FILE_GRACE - 10
+        os.utime(filename, (stamp - 10, stamp - 10))
+        os.utime(current, (stamp, stamp))
+        remove_stale_files(os.path.dirname(current), current)
+        self.assertTrue(os.path.exists(current))
+        self.assertFalse(os.path.exists(filename))
@@ -105,6 +105,12 @@ class GitChangeProjectTest(GitNoChangeProjectTest):
         super(GitChangeProjectTest, self).setUp()
         self.change_unit(u'Ahoj světe!\n')
 
+    def test_changed_files(self):
+        self.assertEqual(
+            self.subproject.git_changed_files(),
+            set([self.get_translation().filename])
+        )
+
 
 class GitChangeSubProjectTest(GitChangeProjectTest):
     '''
@@ -129,9 +135,18 @@ class GitCommitedChangeProjectTest(GitNoChangeProjectTest):
 
     def setUp(self):
         super(GitCommitedChangeProjectTest, self).setUp()
+        # Author without email can not be parsed back from commit
+        self.user.email = 'noreply@weblate.org'
+        self.user.save()
         self.change_unit(u'Ahoj světe!\n')
         self.project.commit_pending(self.get_request('/'))
 
+    def test_commited(self):
+        self.assertEqual(self.subproject.git_changed_files(), set())
+        commit = self.subproject.git_repo.head.commit
+        self.assertEqual(commit.author.name, self.user.username)
+        self.assertEqual(commit.author.email, self.user.email)
+
 
 class GitCommitedChangeSubProjectTest(GitCommitedChangeProjectTest):
     '''
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tests for instrumentation.
+"""
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.test.client import RequestFactory
+from django.http import HttpResponse
+from django.core.cache import get_cache
+from django.contrib.auth.models import User
+from trans import instrumentation
+from trans.instrumentation import (
+    Instrumentation, InstrumentationMiddleware, record, instrument_repo
+)
+import tempfile
+import shutil
+import git
+
+
+class InstrumentationTest(TestCase):
+    def test_queries(self):
+        with Instrumentation() as stats:
+            User.objects.count()
+            list(User.objects.all())
+        self.assertEqual(stats['queries'], 2)
+
+    def test_nested(self):
+        with Instrumentation() as outer:
+            User.objects.count()
+            with Instrumentation() as inner:
+                User.objects.count()
+                record('git')
+        self.assertEqual(outer['queries'], 2)
+        self.assertEqual(inner['queries'], 1)
+        self.assertEqual(outer['git'], 1)
+        self.assertEqual(inner['git'], 1)
+
+    def test_inactive(self):
+        # Recording outside of instrumentation is ignored
+        record('git')
+        with Instrumentation() as stats:
+            pass
+        self.assertEqual(stats['git'], 0)
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'counted': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'instrumentation-test',
+        },
+    })
+    def test_cache(self):
+        cache = get_cache(
+            'trans.instrumentation.CountingCache', LOCATION='counted'
+        )
+        cache.set('instrumentation-test', 1)
+        with Instrumentation() as stats:
+            cache.get('instrumentation-test')
+            cache.get('instrumentation-missing')
+            cache.get_many(['instrumentation-test', 'instrumentation-none'])
+        self.assertEqual(stats['cache_hits'], 2)
+        self.assertEqual(stats['cache_misses'], 2)
+        # Not configured cache is not counted
+        with Instrumentation() as stats:
+            get_cache('counted').get('instrumentation-test')
+        self.assertEqual(stats['cache_hits'], 0)
+
+    def test_git(self):
+        path = tempfile.mkdtemp()
+        try:
+            repo = instrument_repo(git.Repo.init(path))
+            with Instrumentation() as stats:
+                repo.git.status()
+            self.assertEqual(stats['git'], 1)
+        finally:
+            shutil.rmtree(path)
+
+    def test_middleware(self):
+        instrumentation.TOTALS.clear()
+        middleware = InstrumentationMiddleware()
+        request = RequestFactory().get('/')
+        middleware.process_request(request)
+        middleware.process_view(request, dummy_view, (), {})
+        dummy_view(request)
+        middleware.process_response(request, HttpResponse())
+        totals = instrumentation.get_totals()
+        self.assertEqual(len(totals), 1)
+        self.assertEqual(
+            totals[0][:2],
+            ('trans.tests.instrumentation.dummy_view', 1)
+        )
+        self.assertEqual(totals[0][3], 1)
+
+    def test_middleware_class_view(self):
+        instrumentation.TOTALS.clear()
+        middleware = InstrumentationMiddleware()
+        request = RequestFactory().get('/')
+        view = DummyView()
+        middleware.process_request(request)
+        middleware.process_view(request, view, (), {})
+        middleware.process_response(request, view(request))
+        self.assertEqual(
+            instrumentation.get_totals()[0][0],
+            'trans.tests.instrumentation.DummyView'
+        )
+
+
+class DummyView(object):
+    '''
+    Dummy view implemented as callable instance (like feeds).
+    '''
+    def __call__(self, request):
+        return HttpResponse()
+
+
+def dummy_view(request):
+    '''
+    Dummy view doing single query.
+    '''
+    return HttpResponse(str(User.objects.count()))
@@ -23,6 +23,7 @@ Tests for AJAX/JS views.
 """
 
 from trans.tests.views import ViewTestCase
+from trans.models import Dictionary
 from django.core.urlresolvers import reverse
 from django.utils import simplejson
 
@@ -103,3 +104,35 @@ class JSViewsTest(ViewTestCase):
             response,
             "'dummy'"
         )
+
+    def test_get_dictionary_terms(self):
+        unit = self.get_unit()
+        translation = self.get_translation()
+        url = reverse('js-dictionary', kwargs={'unit_id': unit.id})
+
+        Dictionary.objects.create(
+            project=self.project,
+            language=translation.language,
+            source='worlds',
+            target='svet',
+        )
+        Dictionary.objects.create(
+            project=self.project,
+            language=translation.language,
+            source='thank you',
+            target='dekuji',
+        )
+        response = self.client.get(url)
+        self.assertContains(response, 'svet')
+        self.assertNotContains(response, 'dekuji')
+
+        # Index is updated on change
+        Dictionary.objects.create(
+            project=self.project,
+            language=translation.language,
+            source='Hello World',
+            target='ahoj svete',
+        )
+        response = self.client.get(url)
+        self.assertContains(response, 'svet')
+        self.assertContains(response, 'ahoj svete')
@@ -26,9 +26,11 @@ from django.test import TestCase
 from django.conf import settings
 from django.contrib.auth.models import Permission, User
 from django.core.exceptions import ValidationError
+from django.core.cache import cache
 import shutil
 import os
 import git
+from lang.models import Language
 from trans.models import (
     Project, SubProject
 )
@@ -43,6 +45,9 @@ class RepoTestCase(TestCase):
     Generic class for tests working with repositories.
     '''
     def setUp(self):
+        # Cached stats are keyed by object ids which get reused
+        cache.clear()
+
         if 'test-repos' in settings.GIT_ROOT:
             test_dir = os.path.join(settings.GIT_ROOT, 'test')
             if os.path.exists(test_dir):
@@ -82,6 +87,11 @@ class RepoTestCase(TestCase):
         if os.path.exists(test_repo_path):
             shutil.rmtree(test_repo_path)
 
+        # Remove possibly existing pre-rendered widgets
+        test_widgets_path = test_repo_path + '.widgets'
+        if os.path.exists(test_widgets_path):
+            shutil.rmtree(test_widgets_path)
+
     def create_project(self):
         '''
         Creates test project.
@@ -313,3 +323,43 @@ class TranslationTest(RepoTestCase):
         self.assertEqual(translation.translated, 0)
         self.assertEqual(translation.total, 4)
         self.assertEqual(translation.fuzzy, 0)
+
+    def test_stats_cache(self):
+        subproject = self.create_subproject()
+        translation = subproject.translation_set.get(language_code='cs')
+        language = translation.language
+
+        project = Project.objects.get(pk=subproject.project.pk)
+        self.assertEqual(project.get_translated_percent(language), 0)
+        self.assertEqual(project.get_total(), 4)
+
+        # Changing units does not affect cached stats
+        translation.unit_set.update(translated=True)
+        project = Project.objects.get(pk=subproject.project.pk)
+        self.assertEqual(project.get_translated_percent(language), 0)
+
+        # Stats update invalidates them
+        translation.update_stats()
+        project = Project.objects.get(pk=subproject.project.pk)
+        self.assertEqual(project.get_translated_percent(language), 100)
+        language = Language.objects.get(pk=language.pk)
+        self.assertEqual(language.get_translated_percent(), 100)
+        subproject = SubProject.objects.get(pk=subproject.pk)
+        self.assertNotEqual(subproject.get_translated_percent(), 0)
+
+    def test_counts_cache(self):
+        subproject = self.create_subproject()
+        translation = subproject.translation_set.get(language_code='cs')
+        self.assertEqual(translation.get_counts()['targetcomments'], 0)
+
+        # Counts are stored in cache
+        translation.unit_set.update(has_comment=True)
+        self.assertEqual(translation.get_counts()['targetcomments'], 0)
+
+        # Invalidating bumps version of all counts
+        translation.invalidate_cache()
+        self.assertEqual(translation.get_counts()['targetcomments'], 4)
+        self.assertEqual(
+            translation.unit_set.count_type('targetcomments', translation),
+            4
+        )
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Tests for parallel processing of repositories.
+"""
+
+from django.test import TestCase
+from trans.tests.models import RepoTestCase
+from trans.parallel import (
+    run_parallel, get_repositories, update_repositories, push_repositories
+)
+
+
+def square(value):
+    if value < 0:
+        raise ValueError('Negative value')
+    return value * value
+
+
+class RunParallelTest(TestCase):
+    def test_order(self):
+        self.assertEqual(
+            run_parallel(square, range(10), 3),
+            [(value * value, None) for value in range(10)]
+        )
+
+    def test_serial(self):
+        self.assertEqual(
+            run_parallel(square, [1, 2], 1),
+            [(1, None), (4, None)]
+        )
+
+    def test_error(self):
+        results = run_parallel(square, [-1, 2], 2)
+        self.assertIsNone(results[0][0])
+        self.assertTrue(isinstance(results[0][1], ValueError))
+        self.assertEqual(results[1], (4, None))
+
+
+class ParallelRepositoriesTest(RepoTestCase):
+    def setUp(self):
+        super(ParallelRepositoriesTest, self).setUp()
+        self.link = self.create_link()
+        self.parent = self.link.linked_subproject
+
+    def test_repositories(self):
+        self.assertEqual(
+            get_repositories([self.link, self.parent]),
+            [self.parent]
+        )
+
+    def test_update(self):
+        results = update_repositories([self.link, self.parent], threads=2)
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]['result'])
+        self.assertIsNotNone(results[0]['fetch'])
+        self.assertIsNone(results[0]['error'])
+
+    def test_update_failed_fetch(self):
+        self.parent.git_repo.git.remote(
+            'set-url', 'origin', '/nonexisting/repository'
+        )
+        results = update_repositories([self.parent], threads=2)
+        self.assertFalse(results[0]['result'])
+        self.assertIsNotNone(results[0]['error'])
+        self.assertIsNone(results[0]['update'])
+
+    def test_push(self):
+        results = push_repositories([self.link, self.parent], threads=2)
+        self.assertEqual(len(results), 1)
+        # Nothing to push
+        self.assertFalse(results[0]['result'])
+        self.assertIsNone(results[0]['push'])
+        self.assertIsNone(results[0]['error'])
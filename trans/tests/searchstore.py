@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tests for search results storage.
+"""
+
+from trans.tests.views import ViewTestCase
+from trans import searchstore
+from trans.searchstore import SearchResult, SearchStore
+
+
+class SearchStoreTest(ViewTestCase):
+    def setUp(self):
+        super(SearchStoreTest, self).setUp()
+        self.translation = self.get_translation()
+        self.units = list(
+            self.translation.unit_set.order_by('position', 'id')
+        )
+
+    def tearDown(self):
+        searchstore.CHUNK_SIZE = 1000
+        super(SearchStoreTest, self).tearDown()
+
+    def get_result(self):
+        return SearchResult(
+            self.translation,
+            'All strings',
+            self.translation.unit_set.all(),
+            'user-%d' % self.user.id
+        )
+
+    def test_chunks(self):
+        searchstore.CHUNK_SIZE = 2
+        result = self.get_result()
+        self.assertEqual(len(result), len(self.units))
+        self.assertEqual(len(result.ids), 0)
+        self.assertEqual(result.get_id(0), self.units[0].id)
+        self.assertEqual(len(result.ids), 2)
+        for offset, unit in enumerate(self.units):
+            self.assertEqual(result.get_id(offset), unit.id)
+            self.assertEqual(result.get_offset(unit), offset)
+        self.assertEqual(result.get_id(len(self.units)), None)
+        self.assertEqual(result.get_id(-1), None)
+        self.assertTrue(result.complete)
+
+    def test_store(self):
+        store = SearchStore(1, 100)
+        result = self.get_result()
+        store.set(result)
+        self.assertTrue(store.get(result.search_id) is result)
+        # Evicted from local storage, but still in shared cache
+        other = self.get_result()
+        store.set(other)
+        self.assertEqual(
+            store.get(result.search_id).translation_id,
+            self.translation.id
+        )
+        self.assertEqual(store.get('missing'), None)
+
+    def test_search_ids(self):
+        self.assertNotEqual(
+            self.get_result().search_id,
+            self.get_result().search_id
+        )
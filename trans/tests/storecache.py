@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2012 - 2013 Michal Čihař <michal@cihar.com>
+#
+# This file is part of Weblate <http://weblate.org/>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tests for parsed store cache.
+"""
+
+from django.test import TestCase
+from trans.storecache import StoreCache
+from trans.formats import copy_unit
+from trans.tests.models import RepoTestCase
+import tempfile
+import shutil
+import os
+
+
+class StoreCacheTest(TestCase):
+    '''
+    Testing of store cache itself.
+    '''
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.loads = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def create_file(self, name, content='x' * 100):
+        filename = os.path.join(self.tempdir, name)
+        with open(filename, 'w') as handle:
+            handle.write(content)
+        return filename
+
+    def loader(self):
+        self.loads += 1
+        return object()
+
+    def test_cached(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        first = cache.get(filename, self.loader)
+        second = cache.get(filename, self.loader)
+        self.assertTrue(first is second)
+        self.assertEqual(self.loads, 1)
+
+    def test_changed(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        cache.get(filename, self.loader)
+        self.create_file('test.po', 'y' * 200)
+        cache.get(filename, self.loader)
+        self.assertEqual(self.loads, 2)
+
+    def test_depends(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        template = self.create_file('template.po')
+        cache.get(filename, self.loader, (template,))
+        self.create_file('template.po', 'y' * 200)
+        cache.get(filename, self.loader, (template,))
+        self.assertEqual(self.loads, 2)
+
+    def test_tag(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        cache.get(filename, self.loader, tag='po')
+        cache.get(filename, self.loader, tag='auto')
+        self.assertEqual(self.loads, 2)
+
+    def test_tag_kept(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        cache.get(filename, self.loader, tag='template-po')
+        cache.get(filename, self.loader, tag='po')
+        cache.get(filename, self.loader, tag='template-po')
+        cache.get(filename, self.loader, tag='po')
+        self.assertEqual(self.loads, 2)
+
+    def test_invalidate_tags(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        cache.get(filename, self.loader, tag='template-po')
+        cache.get(filename, self.loader, tag='po')
+        cache.invalidate(filename)
+        self.assertEqual(cache.size, 0)
+
+    def test_eviction(self):
+        cache = StoreCache(2500)
+        first = self.create_file('first.po')
+        second = self.create_file('second.po')
+        third = self.create_file('third.po')
+        cache.get(first, self.loader)
+        cache.get(second, self.loader)
+        # Touch first to make second least recently used
+        cache.get(first, self.loader)
+        cache.get(third, self.loader)
+        self.assertEqual(self.loads, 3)
+        self.assertTrue(cache.size <= 2500)
+        cache.get(first, self.loader)
+        self.assertEqual(self.loads, 3)
+        cache.get(second, self.loader)
+        self.assertEqual(self.loads, 4)
+
+    def test_invalidate(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        cache.get(filename, self.loader)
+        cache.invalidate(filename)
+        self.assertEqual(cache.size, 0)
+        cache.get(filename, self.loader)
+        self.assertEqual(self.loads, 2)
+
+    def test_modify(self):
+        cache = StoreCache(10000)
+        filename = self.create_file('test.po')
+        cache.get(filename, self.loader)
+        try:
+            with cache.modify(filename):
+                raise ValueError()
+        except ValueError:
+            pass
+        cache.get(filename, self.loader)
+        self.assertEqual(self.loads, 2)
+
+    def test_lock(self):
+        cache = StoreCache(10000)
+        first = self.create_file('first.po')
+        second = self.create_file('second.po')
+        self.assertTrue(cache.get_lock(first) is cache.get_lock(first))
+        self.assertFalse(cache.get_lock(first) is cache.get_lock(second))
+
+    def test_disabled(self):
+        cache = StoreCache(0)
+        filename = self.create_file('test.po')
+        cache.get(filename, self.loader)
+        cache.get(filename, self.loader)
+        self.assertEqual(self.loads, 2)
+
+
+class TranslationStoreCacheTest(RepoTestCase):
+    '''
+    Testing of store sharing between model instances.
+    '''
+    def test_shared_store(self):
+        subproject = self._create_subproject(
+            'po-mono',
+            'po-mono/*.po',
+            'po-mono/en.po',
+        )
+        first = subproject.translation_set.get(language_code='cs')
+        second = subproject.translation_set.get(language_code='cs')
+        self.assertTrue(first.store is second.store)
+
+    def test_shared_template(self):
+        subproject = self._create_subproject(
+            'po-mono',
+            'po-mono/*.po',
+            'po-mono/en.po',
+        )
+        first, second = subproject.translation_set.all()[:2]
+        self.assertTrue(
+            first.store.template_store is second.store.template_store
+        )
+
+    def test_template_unit_copy(self):
+        subproject = self._create_subproject(
+            'po-mono',
+            'po-mono/*.po',
+            'po-mono/en.po',
+        )
+        translation = subproject.translation_set.all()[0]
+        template_unit = translation.store.template_store.units[1]
+        source = template_unit.target
+        unit = copy_unit(template_unit)
+        unit.settarget(u'Changed')
+        self.assertEqual(template_unit.target, source)
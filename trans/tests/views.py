@@ -22,16 +22,22 @@
 Tests for translation views.
 """
 
-from django.test.client import RequestFactory
+from django.test.client import RequestFactory, Client
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connection, reset_queries
 from django.contrib.messages.storage.fallback import FallbackStorage
 from trans.tests.models import RepoTestCase
+from trans.instrumentation import Instrumentation
+from trans.models import Project, SubProject
 from accounts.models import Profile
 import cairo
 import re
 from urlparse import urlsplit
 from cStringIO import StringIO
+from xml.etree import ElementTree
 
 
 class ViewTestCase(RepoTestCase):
@@ -129,15 +135,36 @@ class ViewTestCase(RepoTestCase):
             'Offset %s not in %s' % (exp_offset, query)
         )
 
+    def assertSVG(self, response):
+        '''
+        Checks whether response contains valid SVG image.
+        '''
+        # Check response status code
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        # Get content of possibly streamed response
+        if getattr(response, 'streaming', False):
+            content = ''.join(response.streaming_content)
+        else:
+            content = response.content
+        # Try to parse the XML
+        tree = ElementTree.fromstring(content)
+        self.assertEqual(tree.tag, '{http://www.w3.org/2000/svg}svg')
+
     def assertPNG(self, response):
         '''
         Checks whether response contains valid PNG image.
         '''
         # Check response status code
         self.assertEqual(response.status_code, 200)
+        # Get content of possibly streamed response
+        if getattr(response, 'streaming', False):
+            content = ''.join(response.streaming_content)
+        else:
+            content = response.content
         # Try to load PNG with Cairo
         cairo.ImageSurface.create_from_png(
-            StringIO(response.content)
+            StringIO(content)
         )
 
 
@@ -186,6 +213,107 @@ class BasicViewTest(ViewTestCase):
         self.assertContains(response, 'Hello, world!')
 
 
+class DashboardViewTest(ViewTestCase):
+    '''
+    Tests that dashboards do not need query per object.
+    '''
+    def get_query_count(self, url):
+        '''
+        Returns number of queries needed to render given URL.
+        '''
+        # Query log is otherwise reset on start of every request
+        request_started.disconnect(reset_queries)
+        old_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        try:
+            start = len(connection.queries)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(connection.queries) - start
+        finally:
+            connection.use_debug_cursor = old_debug_cursor
+            request_started.connect(reset_queries)
+
+    def add_subproject(self):
+        SubProject.objects.create(
+            name='Extra',
+            slug='extra',
+            project=self.project,
+            repo='weblate://test/test',
+            file_format='po',
+            filemask='po/*.po',
+        )
+        cache.clear()
+
+    def assertQueryBudget(self, url):
+        '''
+        Checks that number of queries does not depend on number of
+        subprojects.
+        '''
+        # Warm up process wide caches (eg. current site)
+        self.client.get(url)
+        cache.clear()
+        count = self.get_query_count(url)
+        self.add_subproject()
+        self.assertEqual(self.get_query_count(url), count)
+
+    def test_home(self):
+        # Second project to show projects list
+        Project.objects.create(
+            name='Other',
+            slug='other',
+            web='http://weblate.org/'
+        )
+        self.assertQueryBudget(reverse('home'))
+
+    def test_home_single(self):
+        self.assertQueryBudget(reverse('home'))
+
+    def test_project(self):
+        self.assertQueryBudget(self.project_url)
+
+    def test_languages(self):
+        self.assertQueryBudget(reverse('languages'))
+
+
+class BudgetViewTest(ViewTestCase):
+    '''
+    Tests that views stay within budget of expensive operations.
+    '''
+    def assertBudget(self, url, **budget):
+        '''
+        Checks that rendering URL does not exceed given counters.
+        '''
+        # Warm up process wide caches (eg. current site)
+        self.client.get(url)
+        cache.clear()
+        with Instrumentation() as stats:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for name, limit in budget.items():
+            self.assertTrue(
+                stats[name] <= limit,
+                '%s: %d over budget %d' % (name, stats[name], limit)
+            )
+
+    def test_home(self):
+        self.assertBudget(
+            reverse('home'), queries=25, git=0, parses=0, searchers=0
+        )
+
+    def test_show_translation(self):
+        self.assertBudget(
+            self.translation_url, queries=35, git=0, searchers=0
+        )
+
+    def test_translate(self):
+        self.assertBudget(
+            self.get_translation().get_translate_url(),
+            queries=45,
+            searchers=0
+        )
+
+
 class BasicResourceViewTest(BasicViewTest):
     def create_subproject(self):
         return self.create_android()
@@ -256,6 +384,48 @@ class EditTest(ViewTestCase):
         self.assertTrue(unit.translated)
         self.assertFalse(unit.fuzzy)
 
+    def test_last_change(self):
+        self.assertIsNone(self.translation.get_last_change())
+        self.edit_unit(
+            'Hello, world!\n',
+            'Nazdar svete!\n'
+        )
+        translation = self.get_translation()
+        self.assertIsNotNone(translation.get_last_change())
+        self.assertEqual(
+            translation.get_last_author(False),
+            self.user.username
+        )
+        self.assertEqual(
+            SubProject.objects.get(pk=self.subproject.pk).get_last_change(),
+            translation.get_last_change()
+        )
+        self.assertEqual(
+            Project.objects.get(pk=self.project.pk).get_last_change(),
+            translation.get_last_change()
+        )
+
+        # Saving stale instances does not overwrite it
+        self.translation.save()
+        self.subproject.save()
+        self.project.save()
+        self.assertEqual(
+            self.get_translation().get_last_change(),
+            translation.get_last_change()
+        )
+        self.assertEqual(
+            SubProject.objects.get(pk=self.subproject.pk).get_last_change(),
+            translation.get_last_change()
+        )
+        self.assertEqual(
+            Project.objects.get(pk=self.project.pk).get_last_change(),
+            translation.get_last_change()
+        )
+
+        # Removing author keeps the translation
+        self.user.delete()
+        self.assertIsNone(self.get_translation().get_last_author())
+
     def test_suggest(self):
         # Try empty suggestion (should not be added)
         response = self.edit_unit(
@@ -415,6 +585,39 @@ class EditTest(ViewTestCase):
         self.assertEqual(len(unit.checks()), 0)
         self.assertEqual(unit.translation.failing_checks, 0)
 
+    def test_edit_check_index(self):
+        # Save with failing check
+        self.edit_unit(
+            'Hello, world!\n',
+            'Nazdar svete!'
+        )
+        unit = self.get_unit()
+        translation = unit.translation
+        names = unit.checks().values_list('check', flat=True)
+        self.assertEqual(unit.unitcheck_set.count(), 2)
+        counts = translation.unit_set.count_checks(translation)
+        for name in names:
+            self.assertEqual(counts[name], 1)
+            self.assertEqual(
+                list(translation.unit_set.filter_checks(name, translation)),
+                [unit]
+            )
+
+        # Ignored checks are not counted
+        unit.checks()[0].set_ignore()
+        counts = translation.unit_set.count_checks(translation)
+        self.assertEqual(sum(counts.values()), 1)
+
+        # Fixed checks are removed from index
+        self.edit_unit(
+            'Hello, world!\n',
+            'Nazdar svete!\n'
+        )
+        unit = self.get_unit()
+        self.assertEqual(unit.unitcheck_set.count(), 0)
+        counts = translation.unit_set.count_checks(translation)
+        self.assertEqual(sum(counts.values()), 0)
+
     def test_commit_push(self):
         response = self.edit_unit(
             'Hello, world!\n',
@@ -566,11 +769,50 @@ class SearchViewTest(ViewTestCase):
             response,
             self.translation.get_absolute_url()
         )
-        # Try invalid SID (should be deleted above)
+        # Search is kept until it expires
         response = self.client.get(
             self.translate_url,
             {'sid': search_id, 'offset': 1}
         )
+        self.assertContains(
+            response,
+            'Thank you for using Weblate.',
+        )
+        # Search can not be used by others
+        response = Client().get(
+            self.translate_url,
+            {'sid': search_id, 'offset': 1}
+        )
+        self.assertRedirects(
+            response,
+            self.translation.get_absolute_url()
+        )
+
+    def get_link(self, response, name):
+        '''
+        Extracts navigation link from translate page.
+        '''
+        link = re.findall(
+            r'id="button-%s" href="([^"]*)"' % name, response.content
+        )[0]
+        return link.replace('&amp;', '&')
+
+    def test_search_keyset(self):
+        response = self.do_search(
+            {'type': 'all'},
+            '1 / 4'
+        )
+        next_url = self.get_link(response, 'next')
+        self.assertTrue('after=' in next_url)
+        response = self.client.get(next_url)
+        self.assertContains(response, '2 / 4')
+        response = self.client.get(self.get_link(response, 'next'))
+        self.assertContains(response, '3 / 4')
+        response = self.client.get(self.get_link(response, 'prev'))
+        self.assertContains(response, '2 / 4')
+        # Previous from first unit ends translating
+        response = self.client.get(self.get_link(response, 'prev'))
+        response = self.client.get(self.get_link(response, 'prev'))
         self.assertRedirects(
             response,
             self.translation.get_absolute_url()
@@ -24,6 +24,12 @@ Tests for widgets.
 
 from trans.tests.views import ViewTestCase
 from trans.views.widgets import WIDGETS
+from trans.widgets import (
+    get_widget_filename, render_widget, render_project_widgets
+)
+from trans.models.translation import get_widgets_cache_key
+from django.core.cache import cache
+import os.path
 from django.core.urlresolvers import reverse
 
 
@@ -72,6 +78,7 @@ class WidgetsTest(ViewTestCase):
                             'project': self.project.slug,
                             'widget': widget,
                             'color': color,
+                            'extension': 'png',
                         }
                     )
                 )
@@ -89,8 +96,62 @@ class WidgetsTest(ViewTestCase):
                             'widget': widget,
                             'color': color,
                             'lang': 'cs',
+                            'extension': 'png',
                         }
                     )
                 )
                 # This is pretty stupid test for PNG image
                 self.assertPNG(response)
+
+    def test_view_widget_image_cache(self):
+        url = reverse(
+            'widget-image',
+            kwargs={
+                'project': self.project.slug,
+                'widget': '287x66',
+                'color': 'white',
+                'extension': 'png',
+            }
+        )
+        # Placeholder is served until widget is rendered
+        response = self.client.get(url)
+        self.assertPNG(response)
+        self.assertFalse(response.has_header('ETag'))
+
+        # Render widget as background thread would do
+        render_widget(self.project, '287x66', 'white')
+        self.assertTrue(os.path.exists(
+            get_widget_filename(self.project, '287x66', 'white')
+        ))
+        response = self.client.get(url)
+        self.assertPNG(response)
+
+        # Conditional GET
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_widgets_stale(self):
+        render_project_widgets(self.project)
+        key = get_widgets_cache_key(self.project.id)
+        self.assertTrue(cache.get(key))
+
+        # Changing stats only marks widgets as stale
+        self.change_unit('Nazdar svete!\n')
+        self.assertIsNone(cache.get(key))
+
+    def test_view_widget_image_svg(self):
+        for widget in WIDGETS:
+            for color in WIDGETS[widget].colors:
+                response = self.client.get(
+                    reverse(
+                        'widget-image-lang',
+                        kwargs={
+                            'project': self.project.slug,
+                            'widget': widget,
+                            'color': color,
+                            'lang': 'cs',
+                            'extension': 'svg',
+                        }
+                    )
+                )
+                self.assertSVG(response)
@@ -54,6 +54,10 @@ AVATAR_DEFAULT_IMAGE = getattr(
 
 PLURAL_SEPARATOR = '\x00\x00'
 
+# How long are superseded generated files kept (they might be still being
+# served to clients)
+STALE_FILE_GRACE = 3600
+
 
 def avatar_for_email(email, size=80):
     '''
@@ -233,3 +237,36 @@ def get_distinct_translations(units):
         targets[unit.target] = 1
         result.append(unit)
     return result
+
+
+def remove_stale_files(dirname, current, prefix=''):
+    '''
+    Removes generated files superseded by current one.
+
+    Every file is kept for STALE_FILE_GRACE seconds after newer file was
+    generated, as it might be still being sent to the client (possibly by
+    the web server).
+    '''
+    files = []
+    for name in os.listdir(dirname):
+        path = os.path.join(dirname, name)
+        if not name.startswith(prefix) or name.startswith('tmp'):
+            continue
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    files.sort(reverse=True)
+
+    # File is superseded since time when next newer file was created
+    deadline = time.time() - STALE_FILE_GRACE
+    superseded = None
+    for mtime, path in files:
+        if (path != current
+                and superseded is not None
+                and superseded < deadline):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        superseded = mtime
@@ -24,10 +24,16 @@ from django.http import (
     HttpResponse, HttpResponseNotAllowed, HttpResponseBadRequest
 )
 
-from trans.models import SubProject
-from trans.views.helper import get_project, get_subproject
+from django.core.cache import cache
+from trans.models import Project, SubProject, Translation
+from trans.cacheversion import get_versioned_keys
+from trans.views.helper import (
+    get_project, get_subproject, StreamingHttpResponse
+)
+from trans.exporters import export_json
 from trans.util import get_site_url
 
+from itertools import islice
 import json
 import weblate
 import threading
@@ -44,6 +50,9 @@ GITHUB_REPOS = (
     'git@github.com:%(owner)s/%(slug)s.git',
 )
 
+# Number of subprojects which stats are fetched at once
+STATS_CHUNK_SIZE = 20
+
 
 @csrf_exempt
 def update_subproject(request, project, subproject):
@@ -200,39 +209,137 @@ def json_dt_handler(obj):
         )
 
 
-def export_stats(request, project, subproject):
+def get_stats_key(subproject):
     '''
-    Exports stats in JSON format.
+    Returns tuple of cache key for subproject stats and list of
+    namespaces it belongs to.
     '''
-    subprj = get_subproject(request, project, subproject)
+    return (
+        'stats-%d' % subproject.id,
+        [('project', subproject.project_id), ('subproject', subproject.id)]
+    )
+
+
+def get_translation_stats(trans):
+    '''
+    Returns stats dictionary for translation.
+    '''
+    return {
+        'project': trans.subproject.project.slug,
+        'subproject': trans.subproject.slug,
+        'code': trans.language.code,
+        'name': trans.language.name,
+        'total': trans.total,
+        'last_change': trans.get_last_change(),
+        'last_author': trans.get_last_author(False),
+        'translated': trans.translated,
+        'translated_percent': trans.get_translated_percent(),
+        'fuzzy': trans.fuzzy,
+        'fuzzy_percent': trans.get_fuzzy_percent(),
+        'failing': trans.get_failing_checks(),
+        'failing_percent': trans.get_failing_checks_percent(),
+        'url': trans.get_share_url(),
+        'url_translate': get_site_url(trans.get_absolute_url()),
+    }
+
+
+def get_stats_chunk(subprojects):
+    '''
+    Returns list of stats lists for subprojects.
+
+    The stats are cached per subproject and invalidated together with
+    other stats of the subproject. Missing ones are calculated using
+    fixed number of queries regardless number of translations.
+    '''
+    cache_keys = get_versioned_keys([
+        get_stats_key(subproject) for subproject in subprojects
+    ])
+    stats = cache.get_many(cache_keys)
+
+    missing = dict([
+        (subproject.id, key)
+        for subproject, key in zip(subprojects, cache_keys)
+        if key not in stats
+    ])
+    if missing:
+        translations = Translation.objects.filter(
+            subproject__in=missing.keys()
+        ).select_related(
+            'language', 'subproject__project', 'last_author'
+        ).order_by('subproject', 'language__name')
+
+        for key in missing.values():
+            stats[key] = []
+        for trans in translations.iterator():
+            stats[missing[trans.subproject_id]].append(
+                get_translation_stats(trans)
+            )
+        cache.set_many(dict([
+            (key, stats[key]) for key in missing.values()
+        ]))
+
+    return [stats[key] for key in cache_keys]
+
+
+def get_stats(subprojects, chunk_size=STATS_CHUNK_SIZE):
+    '''
+    Yields stats dictionaries for translations in subprojects.
+
+    Subprojects are processed in chunks, so that only stats of single
+    chunk are kept in memory.
+    '''
+    subprojects = iter(subprojects)
+    while True:
+        chunk = list(islice(subprojects, chunk_size))
+        if not chunk:
+            return
+        for stats in get_stats_chunk(chunk):
+            for item in stats:
+                yield item
+
 
+def stats_response(request, subprojects):
+    '''
+    Returns JSON response with stats for subprojects.
+    '''
     try:
         indent = int(request.GET['indent'])
     except:
         indent = None
 
-    response = []
-    for trans in subprj.translation_set.all():
-        response.append({
-            'code': trans.language.code,
-            'name': trans.language.name,
-            'total': trans.total,
-            'last_change': trans.get_last_change(),
-            'last_author': trans.get_last_author(False),
-            'translated': trans.translated,
-            'translated_percent': trans.get_translated_percent(),
-            'fuzzy': trans.fuzzy,
-            'fuzzy_percent': trans.get_fuzzy_percent(),
-            'failing': trans.get_failing_checks(),
-            'failing_percent': trans.get_failing_checks_percent(),
-            'url': trans.get_share_url(),
-            'url_translate': get_site_url(trans.get_absolute_url()),
-        })
-    return HttpResponse(
-        json.dumps(
-            response,
-            default=json_dt_handler,
+    return StreamingHttpResponse(
+        export_json(
+            get_stats(subprojects),
             indent=indent,
+            default=json_dt_handler,
         ),
-        mimetype='application/json'
+        content_type='application/json'
+    )
+
+
+def export_stats(request, project, subproject):
+    '''
+    Exports stats of subproject in JSON format.
+    '''
+    subprj = get_subproject(request, project, subproject)
+    return stats_response(request, [subprj])
+
+
+def export_stats_project(request, project):
+    '''
+    Exports stats of all subprojects in project in JSON format.
+    '''
+    prj = get_project(request, project)
+    return stats_response(request, prj.subproject_set.all())
+
+
+def export_stats_root(request):
+    '''
+    Exports stats of all projects user can access in JSON format.
+    '''
+    return stats_response(
+        request,
+        SubProject.objects.filter(
+            project__in=Project.objects.all_acl(request.user)
+        )
     )
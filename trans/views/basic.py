@@ -56,10 +56,15 @@ def home(request):
     '''
     projects = Project.objects.all_acl(request.user)
     acl_projects = projects
-    if projects.count() == 1:
-        projects = SubProject.objects.filter(
-            project=projects[0]
-        ).select_related()
+    if len(projects) == 1:
+        projects = Translation.objects.prefetch_percents(
+            SubProject.objects.filter(
+                project=projects[0]
+            ).select_related(),
+            'subproject'
+        )
+    else:
+        projects = Translation.objects.prefetch_percents(projects, 'project')
 
     # Warn about not filled in username (usually caused by migration of
     # users from older system
@@ -83,7 +88,7 @@ def home(request):
     # Some stats
     top_translations = Profile.objects.order_by('-translated')[:10]
     top_suggestions = Profile.objects.order_by('-suggested')[:10]
-    last_changes = Change.objects.filter(
+    last_changes = Change.objects.prefetch().filter(
         translation__subproject__project__in=acl_projects,
     ).order_by('-timestamp')[:10]
 
@@ -100,14 +105,17 @@ def home(request):
 
 def show_languages(request):
     return render_to_response('languages.html', RequestContext(request, {
-        'languages': Language.objects.have_translation(),
+        'languages': Translation.objects.prefetch_percents(
+            Language.objects.have_translation(),
+            'language'
+        ),
         'title': _('Languages'),
     }))
 
 
 def show_language(request, lang):
     obj = get_object_or_404(Language, code=lang)
-    last_changes = Change.objects.filter(
+    last_changes = Change.objects.prefetch().filter(
         translation__language=obj
     ).order_by('-timestamp')[:10]
     dicts = Dictionary.objects.filter(
@@ -175,12 +183,18 @@ def show_project(request, project):
         'language', flat=True
     ).distinct()
 
-    last_changes = Change.objects.filter(
+    last_changes = Change.objects.prefetch().filter(
         translation__subproject__project=obj
     ).order_by('-timestamp')[:10]
 
+    subprojects = Translation.objects.prefetch_percents(
+        obj.subproject_set.select_related(),
+        'subproject'
+    )
+
     return render_to_response('project.html', RequestContext(request, {
         'object': obj,
+        'subprojects': subprojects,
         'dicts': Language.objects.filter(id__in=dicts),
         'last_changes': last_changes,
         'last_changes_rss': reverse(
@@ -196,7 +210,7 @@ def show_project(request, project):
 def show_subproject(request, project, subproject):
     obj = get_subproject(request, project, subproject)
 
-    last_changes = Change.objects.filter(
+    last_changes = Change.objects.prefetch().filter(
         translation__subproject=obj
     ).order_by('-timestamp')[:10]
 
@@ -274,7 +288,7 @@ def show_source(request, project, subproject):
 
 def show_translation(request, project, subproject, lang):
     obj = get_translation(request, project, subproject, lang)
-    last_changes = Change.objects.filter(
+    last_changes = Change.objects.prefetch().filter(
         translation=obj
     ).order_by('-timestamp')[:10]
 
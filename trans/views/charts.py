@@ -22,23 +22,44 @@ Charting library for Weblate.
 '''
 
 from trans.models import Change
+from trans import svg
+from trans.models.changes import ACTIVITY_CACHE_TIMEOUT
 from lang.models import Language
-from trans.views.helper import get_project_translation
+from trans.views.helper import (
+    get_project_translation, is_not_modified, not_modified
+)
 from django.shortcuts import render_to_response, get_object_or_404
 from django.template import RequestContext
 from django.http import HttpResponse
 from django.contrib.auth.models import User
 from cStringIO import StringIO
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
+from django.utils.http import http_date, quote_etag
 import cairo
 import pango
 import pangocairo
 import math
+import hashlib
+import time
 
 
-def render_activity(activity):
+# Content types for image formats
+IMAGE_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+# Static part of SVG chart
+AXIS_SVG = (
+    '<path d="M 15 5 L 15 85 L 795 85" fill="none" stroke="#000000" '
+    'stroke-width="1"/>\n'
+)
+
+
+def draw_activity(activity):
     '''
-    Helper for rendering activity charts.
+    Draws activity chart and returns it as PNG data.
     '''
     # Preprocess data for chart
     maximum = max([l[1] for l in activity] + [1])
@@ -126,11 +147,97 @@ def render_activity(activity):
     out = StringIO()
     surface.write_to_png(out)
 
-    # Return response
-    return HttpResponse(content_type='image/png', content=out.getvalue())
+    return out.getvalue()
+
+
+def draw_activity_svg(activity):
+    '''
+    Draws activity chart as SVG, it does not need any font rendering.
+    '''
+    # Preprocess data for chart
+    maximum = max([item[1] for item in activity] + [1])
+    step = 780.0 / len(activity)
+    width = step / 2
+    size = 8 * svg.POINT_SIZE
+
+    content = [
+        # Background
+        svg.render_rect(0, 0, 800, 100, fill=(1, 1, 1)),
+        # Axises
+        AXIS_SVG,
+        # Y axis label
+        svg.render_text(
+            str(maximum), -5, 0, size, (0, 0, 0),
+            extra=' text-anchor="end" transform="rotate(-90)"'
+        ),
+    ]
+
+    # Counter for rendering ticks
+    last = -40
+
+    # Render activity itself
+    for offset, value in enumerate(activity):
+        # Calculate position
+        current = offset * step
+
+        # Render bar
+        height = 1.0 + value[1] * 78.0 / maximum
+        content.append(svg.render_rect(
+            20 + current, 84 - height, width, height,
+            fill=(0, 67.0 / 255, 118.0 / 255)
+        ))
+
+        # Skip axis labels if they are too frequent
+        if current < last + 40:
+            continue
+        last = current
+
+        content.append(svg.render_text(
+            value[0].strftime('%m/%d'), 15 + current, 86, size, (0, 0, 0)
+        ))
+
+    return svg.render_svg(800, 100, content)
+
+
+def render_activity(request, activity, extension=None):
+    '''
+    Helper for rendering activity charts.
+
+    Rendered images are cached based on the activity data, so chart is
+    drawn again only when there is new change in the scope or the time
+    buckets move.
+    '''
+    if extension is None:
+        extension = 'png'
+    etag = hashlib.md5(repr((extension, activity))).hexdigest()
+
+    # Rendered image with its timestamp
+    cache_key = 'activity-chart-%s' % etag
+    cached = cache.get(cache_key)
+    if cached is None:
+        if extension == 'svg':
+            data = draw_activity_svg(activity)
+        else:
+            data = draw_activity(activity)
+        cached = (time.time(), data)
+        cache.set(cache_key, cached, ACTIVITY_CACHE_TIMEOUT)
+    last_modified, data = cached
+
+    # Conditional GET
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    response = HttpResponse(
+        content_type=IMAGE_TYPES[extension],
+        content=data
+    )
+    response['ETag'] = quote_etag(etag)
+    response['Last-Modified'] = http_date(last_modified)
+    return response
 
 
-def monthly_activity(request, project=None, subproject=None, lang=None):
+def monthly_activity(request, project=None, subproject=None, lang=None,
+                     extension=None):
     '''
     Show monthly activity chart.
     '''
@@ -151,10 +258,11 @@ def monthly_activity(request, project=None, subproject=None, lang=None):
     )
 
     # Render chart
-    return render_activity(activity)
+    return render_activity(request, activity, extension)
 
 
-def yearly_activity(request, project=None, subproject=None, lang=None):
+def yearly_activity(request, project=None, subproject=None, lang=None,
+                    extension=None):
     '''
     Show yearly activity chart.
     '''
@@ -175,10 +283,10 @@ def yearly_activity(request, project=None, subproject=None, lang=None):
     )
 
     # Render chart
-    return render_activity(activity)
+    return render_activity(request, activity, extension)
 
 
-def monthly_language_activity(request, lang):
+def monthly_language_activity(request, lang, extension=None):
     '''
     Show monthly activity chart.
     '''
@@ -192,10 +300,10 @@ def monthly_language_activity(request, lang):
     )
 
     # Render chart
-    return render_activity(activity)
+    return render_activity(request, activity, extension)
 
 
-def yearly_language_activity(request, lang):
+def yearly_language_activity(request, lang, extension=None):
     '''
     Show yearly activity chart.
     '''
@@ -209,10 +317,10 @@ def yearly_language_activity(request, lang):
     )
 
     # Render chart
-    return render_activity(activity)
+    return render_activity(request, activity, extension)
 
 
-def monthly_user_activity(request, user):
+def monthly_user_activity(request, user, extension=None):
     '''
     Show monthly activity chart.
     '''
@@ -226,10 +334,10 @@ def monthly_user_activity(request, user):
     )
 
     # Render chart
-    return render_activity(activity)
+    return render_activity(request, activity, extension)
 
 
-def yearly_user_activity(request, user):
+def yearly_user_activity(request, user, extension=None):
     '''
     Show yearly activity chart.
     '''
@@ -243,7 +351,7 @@ def yearly_user_activity(request, user):
     )
 
     # Render chart
-    return render_activity(activity)
+    return render_activity(request, activity, extension)
 
 
 def view_activity(request, project=None, subproject=None, lang=None):
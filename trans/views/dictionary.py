@@ -21,7 +21,7 @@
 from django.shortcuts import render_to_response, get_object_or_404
 from django.utils.translation import ugettext as _
 from django.template import RequestContext
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponseRedirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
@@ -29,12 +29,9 @@ from django.core.urlresolvers import reverse
 
 from trans.models import Translation, Dictionary
 from lang.models import Language
-from trans.util import get_site_url
 from trans.forms import WordForm, DictUploadForm, LetterForm
-from trans.views.helper import get_project
-import weblate
-
-import csv
+from trans.exporters import export_csv, export_po, export_tbx
+from trans.views.helper import get_project, StreamingHttpResponse
 
 
 def show_dictionaries(request, project):
@@ -116,13 +113,13 @@ def upload_dictionary(request, project, lang):
         form = DictUploadForm(request.POST, request.FILES)
         if form.is_valid():
             try:
-                count = Dictionary.objects.upload(
+                result = Dictionary.objects.upload(
                     prj,
                     lang,
                     request.FILES['file'],
                     form.cleaned_data['method']
                 )
-                if count == 0:
+                if result['created'] == 0 and result['updated'] == 0:
                     messages.warning(
                         request,
                         _('No words to import found in file.')
@@ -130,7 +127,10 @@ def upload_dictionary(request, project, lang):
                 else:
                     messages.info(
                         request,
-                        _('Imported %d words from file.') % count
+                        _(
+                            'Imported %(created)d new words and updated '
+                            '%(updated)d existing words from file.'
+                        ) % result
                     )
             except Exception as e:
                 messages.error(
@@ -147,65 +147,6 @@ def upload_dictionary(request, project, lang):
     ))
 
 
-def download_dictionary_ttkit(export_format, prj, lang, words):
-    '''
-    Translate-toolkit builder for dictionary downloads.
-    '''
-    # Use translate-toolkit for other formats
-    if export_format == 'po':
-        # Construct store
-        from translate.storage.po import pofile
-        store = pofile()
-
-        # Export parameters
-        mimetype = 'text/x-po'
-        extension = 'po'
-        has_lang = False
-
-        # Set po file header
-        store.updateheader(
-            add=True,
-            language=lang.code,
-            x_generator='Weblate %s' % weblate.VERSION,
-            project_id_version='%s (%s)' % (lang.name, prj.name),
-            language_team='%s <%s>' % (
-                lang.name,
-                get_site_url(reverse(
-                    'show_dictionary',
-                    kwargs={'project': prj.slug, 'lang': lang.code}
-                )),
-            )
-        )
-    else:
-        # Construct store
-        from translate.storage.tbx import tbxfile
-        store = tbxfile()
-
-        # Export parameters
-        mimetype = 'application/x-tbx'
-        extension = 'tbx'
-        has_lang = True
-
-    # Setup response and headers
-    response = HttpResponse(mimetype='%s; charset=utf-8' % mimetype)
-    filename = 'glossary-%s-%s.%s' % (prj.slug, lang.code, extension)
-    response['Content-Disposition'] = 'attachment; filename=%s' % filename
-
-    # Add words
-    for word in words.iterator():
-        unit = store.UnitClass(word.source)
-        if has_lang:
-            unit.settarget(word.target, lang.code)
-        else:
-            unit.target = word.target
-        store.addunit(unit)
-
-    # Save to response
-    store.savefile(response)
-
-    return response
-
-
 def download_dictionary(request, project, lang):
     '''
     Exports dictionary into various formats.
@@ -224,23 +165,30 @@ def download_dictionary(request, project, lang):
     words = Dictionary.objects.filter(
         project=prj,
         language=lang
-    ).order_by('source')
-
-    # Translate toolkit based export
-    if export_format in ('po', 'tbx'):
-        return download_dictionary_ttkit(export_format, prj, lang, words)
-
-    # Manually create CSV file
-    response = HttpResponse(mimetype='text/csv; charset=utf-8')
-    filename = 'dictionary-%s-%s.csv' % (prj.slug, lang.code)
-    response['Content-Disposition'] = 'attachment; filename=%s' % filename
-
-    writer = csv.writer(response)
+    )
 
-    for word in words.iterator():
-        writer.writerow((
-            word.source.encode('utf8'), word.target.encode('utf8')
-        ))
+    # Generate content
+    if export_format == 'po':
+        content = export_po(words, prj, lang)
+        mimetype = 'text/x-po'
+        filename = 'glossary-%s-%s.po'
+    elif export_format == 'tbx':
+        content = export_tbx(words, lang)
+        mimetype = 'application/x-tbx'
+        filename = 'glossary-%s-%s.tbx'
+    else:
+        content = export_csv(words)
+        mimetype = 'text/csv'
+        filename = 'dictionary-%s-%s.csv'
+
+    # Stream content to the client
+    response = StreamingHttpResponse(
+        content,
+        content_type='%s; charset=utf-8' % mimetype
+    )
+    response['Content-Disposition'] = 'attachment; filename=%s' % (
+        filename % (prj.slug, lang.code)
+    )
 
     return response
 
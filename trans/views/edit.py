@@ -26,8 +26,6 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.urlresolvers import reverse
 from django.utils import formats
-import uuid
-import time
 from urllib import urlencode
 
 from trans.models import SubProject, Unit, Change
@@ -39,6 +37,9 @@ from trans.forms import (
 )
 from trans.views.helper import get_translation
 from trans.checks import CHECKS
+from trans.searchstore import (
+    SearchResult, SEARCH_STORE, get_cursor, parse_cursor
+)
 from trans.util import join_plural, get_distinct_translations
 
 
@@ -70,14 +71,15 @@ def get_search_name(search_type, search_query):
         return _('Substring search for "%s"') % search_query
 
 
-def cleanup_session(session):
+def get_search_owner(request):
     '''
-    Deletes old search results from session storage.
+    Returns identification of user (or anonymous session) owning search.
     '''
-    now = int(time.time())
-    for key in session.keys():
-        if key.startswith('search_') and session[key]['ttl'] < now:
-            del session[key]
+    if request.user.is_authenticated():
+        return 'user-%d' % request.user.id
+    if request.session.session_key is None:
+        request.session.save()
+    return 'session-%s' % request.session.session_key
 
 
 def search(translation, request):
@@ -87,15 +89,17 @@ def search(translation, request):
 
     # Already performed search
     if 'sid' in request.GET:
-        # Grab from session storage
-        search_id = 'search_%s' % request.GET['sid']
+        # Grab from search store
+        search_result = SEARCH_STORE.get(request.GET['sid'])
 
-        # Check if we know the search
-        if search_id not in request.session:
+        # Check if we know the search and it belongs to the user
+        if (search_result is None
+                or search_result.translation_id != translation.id
+                or search_result.owner != get_search_owner(request)):
             messages.error(request, _('Invalid search string!'))
             return HttpResponseRedirect(translation.get_absolute_url())
 
-        return request.session[search_id]
+        return search_result
 
     # Possible new search
     rqtype = request.GET.get('type', 'all')
@@ -135,38 +139,27 @@ def search(translation, request):
 
         name = get_filter_name(rqtype)
 
-    # Grab unit IDs
-    unit_ids = list(allunits.values_list('id', flat=True))
+    # Unit IDs are fetched lazily when needed
+    search_result = SearchResult(
+        translation, name, allunits, get_search_owner(request)
+    )
 
     # Check empty search results
-    if len(unit_ids) == 0:
+    if len(search_result) == 0:
         messages.warning(request, _('No string matched your search!'))
         return HttpResponseRedirect(translation.get_absolute_url())
 
     # Checksum unit access
-    offset = 0
     if 'checksum' in request.GET:
         try:
             unit = allunits.filter(checksum=request.GET['checksum'])[0]
-            offset = unit_ids.index(unit.id)
+            search_result.offset = search_result.get_offset(unit)
         except (Unit.DoesNotExist, IndexError):
             messages.warning(request, _('No string matched your search!'))
             return HttpResponseRedirect(translation.get_absolute_url())
 
-    # Remove old search results
-    cleanup_session(request.session)
-
-    # Store in cache and return
-    search_id = str(uuid.uuid1())
-    search_result = {
-        'name': name,
-        'ids': unit_ids,
-        'search_id': search_id,
-        'ttl': int(time.time()) + 86400,
-        'offset': offset,
-    }
-
-    request.session['search_%s' % search_id] = search_result
+    # Store and return
+    SEARCH_STORE.set(search_result)
 
     return search_result
 
@@ -361,6 +354,39 @@ def handle_suggestions(obj, request, this_unit_url):
     return HttpResponseRedirect(this_unit_url)
 
 
+def get_search_unit(translation, request, search_result, offset):
+    '''
+    Returns unit to show from search result.
+
+    Unit is located by keyset cursor when navigating to next or previous
+    unit, so that no list of units is needed, or by offset otherwise.
+    '''
+    if 'unit' in request.GET:
+        try:
+            unit_id = int(request.GET['unit'])
+        except ValueError:
+            raise Unit.DoesNotExist()
+        return translation.unit_set.get(pk=unit_id)
+
+    for param, method in (('after', search_result.get_next),
+                          ('before', search_result.get_previous)):
+        if param in request.GET:
+            cursor = parse_cursor(request.GET[param])
+            if cursor is None:
+                raise Unit.DoesNotExist()
+            return method(*cursor)
+
+    # Grab unit ID, possibly fetching more of them
+    loaded = len(search_result.ids)
+    unit_id = search_result.get_id(offset)
+    if len(search_result.ids) != loaded:
+        SEARCH_STORE.set(search_result)
+
+    if unit_id is None:
+        return None
+    return translation.unit_set.get(pk=unit_id)
+
+
 def translate(request, project, subproject, lang):
     '''
     Generic entry point for translating, suggesting and searching.
@@ -379,29 +405,40 @@ def translate(request, project, subproject, lang):
         return search_result
 
     # Get numer of results
-    num_results = len(search_result['ids'])
+    num_results = len(search_result)
 
     # Search offset
     try:
-        offset = int(request.GET.get('offset', search_result.get('offset', 0)))
+        offset = int(request.GET.get('offset', search_result.offset))
     except ValueError:
         offset = 0
 
+    # Grab actual unit
+    try:
+        unit = get_search_unit(obj, request, search_result, offset)
+    except Unit.DoesNotExist:
+        # Can happen when using SID for other translation
+        messages.error(request, _('Invalid search string!'))
+        return HttpResponseRedirect(obj.get_absolute_url())
+
     # Check boundaries
-    if offset < 0 or offset >= num_results:
+    if unit is None:
         messages.info(request, _('You have reached end of translating.'))
-        # Delete search
-        del request.session['search_%s' % search_result['search_id']]
-        # Redirect to translation
+        # Redirect to translation, search expires on its own
         return HttpResponseRedirect(obj.get_absolute_url())
 
+    # Avoid fetching translation again
+    unit.translation = obj
+
     # Some URLs we will most likely use
     base_unit_url = '%s?sid=%s&offset=' % (
         obj.get_translate_url(),
-        search_result['search_id'],
+        search_result.search_id,
     )
-    this_unit_url = base_unit_url + str(offset)
-    next_unit_url = base_unit_url + str(offset + 1)
+    cursor = get_cursor(unit)
+    this_unit_url = '%s%d&unit=%d' % (base_unit_url, offset, unit.id)
+    next_unit_url = '%s%d&after=%s' % (base_unit_url, offset + 1, cursor)
+    prev_unit_url = '%s%d&before=%s' % (base_unit_url, offset - 1, cursor)
 
     response = None
 
@@ -423,14 +460,6 @@ def translate(request, project, subproject, lang):
     if response is not None:
         return response
 
-    # Grab actual unit
-    try:
-        unit = obj.unit_set.get(pk=search_result['ids'][offset])
-    except Unit.DoesNotExist:
-        # Can happen when using SID for other translation
-        messages.error(request, _('Invalid search string!'))
-        return HttpResponseRedirect(obj.get_absolute_url())
-
     # Show secondary languages for logged in users
     if request.user.is_authenticated():
         profile = request.user.get_profile()
@@ -444,7 +473,7 @@ def translate(request, project, subproject, lang):
                 translated=True,
                 translation__subproject__project=project,
                 translation__language__in=secondary_langs,
-            )
+            ).select_related('translation__language')
         )
         antispam = None
     else:
@@ -467,19 +496,21 @@ def translate(request, project, subproject, lang):
                 'first_unit_url': base_unit_url + '0',
                 'last_unit_url': base_unit_url + str(num_results - 1),
                 'next_unit_url': next_unit_url,
-                'prev_unit_url': base_unit_url + str(offset - 1),
+                'prev_unit_url': prev_unit_url,
                 'object': obj,
                 'unit': unit,
-                'last_changes': unit.change_set.all()[:10],
+                'last_changes': Change.objects.prefetch().filter(
+                    unit=unit
+                )[:10],
                 'last_changes_rss': reverse(
                     'rss-translation',
                     kwargs=obj.get_kwargs(),
                 ),
                 'last_changes_url': urlencode(obj.get_kwargs()),
-                'total': obj.unit_set.all().count(),
-                'search_id': search_result['search_id'],
+                'total': obj.total,
+                'search_id': search_result.search_id,
                 'offset': offset,
-                'filter_name': search_result['name'],
+                'filter_name': search_result.name,
                 'filter_count': num_results,
                 'filter_pos': offset + 1,
                 'form': form,
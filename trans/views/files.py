@@ -18,52 +18,122 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from weblate import appsettings
 from django.utils.translation import ugettext as _
 from django.http import HttpResponse, HttpResponseRedirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.http import Http404
+from django.core.servers.basehttp import FileWrapper
+from django.utils.http import quote_etag
+import os.path
 
 from trans.forms import UploadForm, SimpleUploadForm, ExtraUploadForm
-from trans.views.helper import get_translation
+from trans.views.helper import (
+    get_translation, get_subproject, is_not_modified, not_modified,
+    StreamingHttpResponse,
+)
+
+
+def send_file(filename, content_type, attachment=None):
+    '''
+    Returns response with file content, the actual sending can be
+    offloaded to the web server using SENDFILE_HEADER.
+    '''
+    if appsettings.SENDFILE_HEADER is None:
+        # Stream file content
+        response = StreamingHttpResponse(
+            FileWrapper(open(filename, 'rb')),
+            content_type=content_type
+        )
+        response['Content-Length'] = os.path.getsize(filename)
+    else:
+        # Let web server send the file
+        response = HttpResponse(content_type=content_type)
+        if appsettings.SENDFILE_URL is None:
+            location = filename
+        else:
+            location = appsettings.SENDFILE_URL + os.path.relpath(
+                filename, appsettings.GIT_ROOT
+            )
+        response[appsettings.SENDFILE_HEADER] = location
+
+    if attachment is not None:
+        response['Content-Disposition'] = (
+            'attachment; filename=%s' % attachment
+        )
+
+    return response
 
 
 def download_translation(request, project, subproject, lang):
     obj = get_translation(request, project, subproject, lang)
 
+    # Conditional GET
+    etag = obj.get_etag()
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
     srcfilename = obj.get_filename()
+    file_format = obj.subproject.file_format_cls
 
     # Construct file name (do not use real filename as it is usually not
     # that useful)
-    filename = '%s-%s-%s.%s' % (project, subproject, lang, obj.store.extension)
+    filename = '%s-%s-%s.%s' % (
+        project, subproject, lang, file_format.get_extension(srcfilename)
+    )
 
     # Create response
-    response = HttpResponse(
-        file(srcfilename).read(),
-        mimetype=obj.store.mimetype
+    response = send_file(
+        srcfilename,
+        file_format.get_mimetype(srcfilename),
+        filename
     )
-
-    # Fill in response headers
-    response['Content-Disposition'] = 'attachment; filename=%s' % filename
+    response['ETag'] = quote_etag(etag)
 
     return response
 
 
 def download_language_pack(request, project, subproject, lang):
     obj = get_translation(request, project, subproject, lang)
-    if not obj.store.supports_language_pack():
+    if not obj.supports_language_pack():
         raise Http404('Language pack download not supported')
 
-    filename, mime = obj.store.get_language_pack_meta()
+    # Conditional GET
+    etag = obj.get_etag()
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    filename, mime = obj.get_language_pack_meta()
+
+    # Create response from precompiled language pack
+    response = send_file(obj.get_language_pack(), mime, filename)
+    response['ETag'] = quote_etag(etag)
+
+    return response
 
-    # Create response
-    response = HttpResponse(
-        obj.store.get_language_pack(),
-        mimetype=mime
-    )
 
-    # Fill in response headers
-    response['Content-Disposition'] = 'attachment; filename=%s' % filename
+def download_language_packs(request, project, subproject):
+    '''
+    Downloads compiled language packs for all translations in single
+    archive.
+    '''
+    obj = get_subproject(request, project, subproject)
+    if not obj.supports_language_pack() or not obj.translation_set.exists():
+        raise Http404('Language pack download not supported')
+
+    # Conditional GET
+    etag = obj.get_language_packs_etag()
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    # Create response from precompiled archive
+    response = send_file(
+        obj.get_language_packs_archive(),
+        'application/zip',
+        '%s-%s.zip' % (project, subproject)
+    )
+    response['ETag'] = quote_etag(etag)
 
     return response
 
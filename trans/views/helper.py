@@ -24,8 +24,18 @@ Helper methods for views.
 from trans.models import Project, SubProject, Translation
 from lang.models import Language
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import (
+    parse_etags, quote_etag, parse_http_date_safe, http_date
+)
 import django.utils.translation
 
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Django 1.4 streams iterators passed to standard response
+    StreamingHttpResponse = HttpResponse
+
 
 def get_translation(request, project, subproject, lang, skip_acl=False):
     '''
@@ -108,3 +118,36 @@ def try_set_language(lang):
         return Language.objects.get(code=lang)
     except Language.DoesNotExist:
         return None
+
+
+def is_not_modified(request, etag, last_modified=None):
+    '''
+    Checks whether client already has current version of the content.
+
+    The last_modified is optional timestamp (seconds since epoch) which
+    is checked if client does not send ETag.
+    '''
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return etag in etags or '*' in etags
+
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since is None or last_modified is None:
+        return False
+    if_modified_since = parse_http_date_safe(if_modified_since)
+    return (
+        if_modified_since is not None
+        and int(last_modified) <= if_modified_since
+    )
+
+
+def not_modified(etag, last_modified=None):
+    '''
+    Returns response for conditional GET with current content.
+    '''
+    response = HttpResponseNotModified()
+    response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
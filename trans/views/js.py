@@ -22,14 +22,13 @@ from django.shortcuts import render_to_response, get_object_or_404
 from django.template import RequestContext
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.contrib.auth.decorators import permission_required, login_required
-from django.db.models import Q
 
-from trans.models import Unit, Check, Dictionary
+from trans.models import Unit, Check
+from trans.dictionaryindex import DICTIONARY_INDEX
 from trans.machine import MACHINE_TRANSLATION_SERVICES
 from trans.decorators import any_permission_required
 from trans.views.helper import get_project, get_subproject, get_translation
 
-from whoosh.analysis import StandardAnalyzer, StemmingAnalyzer
 import json
 
 
@@ -110,35 +109,13 @@ def get_dictionary(request, unit_id):
     '''
     unit = get_object_or_404(Unit, pk=int(unit_id))
     unit.check_acl(request)
-    words = set()
-
-    # Prepare analyzers
-    # - standard analyzer simply splits words
-    # - stemming extracts stems, to catch things like plurals
-    analyzers = (StandardAnalyzer(), StemmingAnalyzer())
-
-    # Extract words from all plurals and from context
-    for text in unit.get_source_plurals() + [unit.context]:
-        for analyzer in analyzers:
-            words = words.union([token.text for token in analyzer(text)])
-
-    # Grab all words in the dictionary
-    dictionary = Dictionary.objects.filter(
-        project=unit.translation.subproject.project,
-        language=unit.translation.language
-    )
 
-    if len(words) == 0:
-        # No extracted words, no dictionary
-        dictionary = dictionary.none()
-    else:
-        # Build the query (can not use __in as we want case insensitive lookup)
-        query = Q()
-        for word in words:
-            query |= Q(source__iexact=word)
-
-        # Filter dictionary
-        dictionary = dictionary.filter(query)
+    # Find dictionary terms in all plurals and in context
+    index = DICTIONARY_INDEX.get(
+        unit.translation.subproject.project,
+        unit.translation.language
+    )
+    dictionary = index.match(unit.get_source_plurals() + [unit.context])
 
     return render_to_response('js/dictionary.html', RequestContext(request, {
         'dictionary': dictionary,
@@ -18,18 +18,29 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from django.http import HttpResponse, Http404
+from django.http import Http404, HttpResponse
 from django.template import RequestContext
 from django.shortcuts import render_to_response
 from django.core.urlresolvers import reverse
-from django.views.decorators.cache import cache_page
+from django.utils.http import http_date, quote_etag
+from django.utils.cache import add_never_cache_headers
 
 from trans.util import get_site_url
+from trans.storecache import get_file_stamp
 from trans.models import Project
 from lang.models import Language
 from trans.forms import EnageLanguageForm
-from trans.widgets import WIDGETS
-from trans.views.helper import get_project, try_set_language
+from trans.widgets import (
+    WIDGETS, get_widget_filename, get_widget_placeholder,
+    render_widget_background, update_widgets_background,
+)
+from trans.views.helper import (
+    get_project, try_set_language, is_not_modified, not_modified
+)
+from trans.views.files import send_file
+from trans.views.charts import IMAGE_TYPES
+import hashlib
+import os.path
 
 
 def widgets_root(request):
@@ -71,6 +82,7 @@ def widgets(request, project):
                         'project': obj.slug,
                         'widget': widget_name,
                         'color': color,
+                        'extension': 'png',
                     }
                 )
             else:
@@ -80,7 +92,8 @@ def widgets(request, project):
                         'project': obj.slug,
                         'widget': widget_name,
                         'color': color,
-                        'lang': lang.code
+                        'lang': lang.code,
+                        'extension': 'png',
                     }
                 )
             color_list.append({
@@ -103,8 +116,8 @@ def widgets(request, project):
     }))
 
 
-@cache_page(3600)
-def render(request, project, widget='287x66', color=None, lang=None):
+def render(request, project, widget='287x66', color=None, lang=None,
+           extension='png'):
     obj = get_project(request, project)
 
     # Handle language parameter
@@ -116,14 +129,29 @@ def render(request, project, widget='287x66', color=None, lang=None):
         widget_class = WIDGETS[widget]
     except KeyError:
         raise Http404()
-
-    # Construct object
-    widget = widget_class(obj, color, lang)
-
-    # Render widget
-    widget.render()
-
-    # Get image data
-    data = widget.get_image()
-
-    return HttpResponse(content_type='image/png', content=data)
+    color = widget_class.get_color_name(color)
+
+    # Widgets are pre-rendered, serve placeholder until it is done
+    filename = get_widget_filename(obj, widget, color, lang, extension)
+    if not os.path.exists(filename):
+        render_widget_background(obj, widget, color, lang, extension)
+        response = HttpResponse(
+            get_widget_placeholder(widget, color, extension),
+            content_type=IMAGE_TYPES[extension]
+        )
+        add_never_cache_headers(response)
+        return response
+
+    # Render again if stats have changed
+    update_widgets_background(obj)
+
+    # Conditional GET
+    etag = hashlib.md5(repr(get_file_stamp(filename))).hexdigest()
+    last_modified = os.path.getmtime(filename)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    response = send_file(filename, IMAGE_TYPES[extension])
+    response['ETag'] = quote_etag(etag)
+    response['Last-Modified'] = http_date(last_modified)
+    return response
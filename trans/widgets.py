@@ -20,11 +20,19 @@
 
 from django.conf import settings
 from django.utils.translation import ugettext as _
+from django.utils import translation as django_translation
+from django.core.cache import cache
 import cairo
 import pango
 import pangocairo
 from cStringIO import StringIO
+import os
 import os.path
+import tempfile
+import threading
+import weblate
+from trans import svg
+from trans.models.translation import get_widgets_cache_key
 
 
 COLOR_DATA = {
@@ -84,12 +92,13 @@ class Widget(object):
         self.pango_context = None
         self.width = 0
 
-    def get_color_name(self, color):
+    @classmethod
+    def get_color_name(cls, color):
         '''
         Return color name based on allowed ones.
         '''
-        if color not in self.colors:
-            return self.colors[0]
+        if color not in cls.colors:
+            return cls.colors[0]
         return color
 
     def get_line_width(self):
@@ -111,19 +120,26 @@ class Widget(object):
             'percent': self.percent,
         }
 
-    def get_filename(self):
+    @classmethod
+    def get_background_filename(cls, color):
         '''
-        Returns widgets filename.
+        Returns filename of widget background in given color.
         '''
         return os.path.join(
             settings.MEDIA_ROOT,
             'widgets',
             '%(widget)s-%(color)s.png' % {
-                'color': self.color,
-                'widget': self.name,
+                'color': color,
+                'widget': cls.name,
             }
         )
 
+    def get_filename(self):
+        '''
+        Returns widgets filename.
+        '''
+        return self.get_background_filename(self.color)
+
     def render(self):
         '''
         Renders widget.
@@ -199,14 +215,19 @@ class Widget(object):
 
         return layout
 
-    def render_text(self, text, lang_text, font_face, font_size, pos_x, pos_y):
-        # Use language variant if desired
+    def format_text(self, text, lang_text):
+        '''
+        Returns formatted text, using language variant if desired.
+        '''
         if self.lang is not None and lang_text is not None:
             text = lang_text
             if 'English' in text:
                 text = text.replace('English', self.lang.name)
+        return text % self.params
+
+    def render_text(self, text, lang_text, font_face, font_size, pos_x, pos_y):
         # Format text
-        text = text % self.params
+        text = self.format_text(text, lang_text)
 
         # Iterate until text fits into widget
         layout_width = self.width + pos_x + 1
@@ -223,12 +244,22 @@ class Widget(object):
         self.pango_context.update_layout(layout)
         self.pango_context.show_layout(layout)
 
-    def render_texts(self):
+    def get_texts(self):
         '''
-        Text rendering method to be overridden.
+        Returns list of texts to render, method to be overridden.
+
+        Every text is described by tuple (text, language variant of text,
+        font face, font size, x position, y position).
         '''
         raise NotImplementedError()
 
+    def render_texts(self):
+        '''
+        Renders all texts.
+        '''
+        for text in self.get_texts():
+            self.render_text(*text)
+
     def get_image(self):
         '''
         Returns PNG data.
@@ -237,6 +268,73 @@ class Widget(object):
         self.surface.write_to_png(out)
         return out.getvalue()
 
+    def get_svg_text(self, text, lang_text, font_face, font_size, pos_x,
+                     pos_y):
+        '''
+        Returns SVG code for text, shrinking it same way as render_text.
+        '''
+        text = self.format_text(text, lang_text)
+        bold = 'Bold' in font_face
+
+        # Iterate until text fits into widget
+        while True:
+            size = font_size * svg.POINT_SIZE
+            layout_width = max([
+                svg.get_text_width(line, size, bold)
+                for line in text.split('\n')
+            ])
+            if layout_width + pos_x <= self.width or font_size <= 5:
+                break
+            font_size -= 1
+
+        return svg.render_text(
+            text, pos_x, pos_y, size, COLOR_DATA[self.color]['text'], bold
+        )
+
+    def get_svg(self):
+        '''
+        Returns widget as SVG data, which does not need any font rendering.
+        '''
+        filename = self.get_filename()
+        self.width, height, dummy = svg.get_png_image(filename)
+
+        content = [svg.render_image(filename)]
+
+        # Progress bar
+        if self.progress:
+            if self.progress['horizontal']:
+                bar = (
+                    self.progress['x'],
+                    self.progress['y'],
+                    self.progress['width'] / 100.0 * self.percent,
+                    self.progress['height'],
+                )
+            else:
+                diff = self.progress['height'] / 100.0 * (100 - self.percent)
+                bar = (
+                    self.progress['x'],
+                    self.progress['y'] + diff,
+                    self.progress['width'],
+                    self.progress['height'] - diff,
+                )
+            content.append(svg.render_rect(
+                *bar, fill=COLOR_DATA[self.color]['bar']
+            ))
+            content.append(svg.render_rect(
+                self.progress['x'],
+                self.progress['y'],
+                self.progress['width'],
+                self.progress['height'],
+                stroke=COLOR_DATA[self.color]['border'],
+                line_width=self.get_line_width(),
+            ))
+
+        # Texts
+        for text in self.get_texts():
+            content.append(self.get_svg_text(*text))
+
+        return svg.render_svg(self.width, height, content)
+
 
 class NormalWidget(Widget):
     name = '287x66'
@@ -248,25 +346,28 @@ class NormalWidget(Widget):
         'horizontal': True,
     }
 
-    def render_texts(self):
-        self.render_text(
-            '%(name)s',
-            None,
-            'Sans Bold', 10,
-            72, 6
-        )
-        self.render_text(
-            _(
-                'translating %(count)d strings into %(languages)d languages\n'
-                '%(percent)d%% complete, help us improve!'
+    def get_texts(self):
+        return (
+            (
+                '%(name)s',
+                None,
+                'Sans Bold', 10,
+                72, 6
             ),
-            # Translators: please use your language name instead of English
-            _(
-                'translating %(count)d strings into English\n'
-                '%(percent)d%% complete, help us improve!'
+            (
+                _(
+                    'translating %(count)d strings into %(languages)d '
+                    'languages\n%(percent)d%% complete, help us improve!'
+                ),
+                # Translators: please use your language name instead of
+                # English
+                _(
+                    'translating %(count)d strings into English\n'
+                    '%(percent)d%% complete, help us improve!'
+                ),
+                'Sans', 8,
+                72, 22
             ),
-            'Sans', 8,
-            72, 22
         )
 
 register_widget(NormalWidget)
@@ -275,19 +376,187 @@ register_widget(NormalWidget)
 class SmallWidget(Widget):
     name = '88x31'
 
-    def render_texts(self):
-        self.render_text(
-            '%(name)s',
-            None,
-            'Sans Bold', 7,
-            23, 2
-        )
-        self.render_text(
-            _('translation\n%(percent)d%% done'),
-            # Translators: please use your language name instead of English
-            _('English translation\n%(percent)d%% done'),
-            'Sans', 7,
-            23, 11
+    def get_texts(self):
+        return (
+            (
+                '%(name)s',
+                None,
+                'Sans Bold', 7,
+                23, 2
+            ),
+            (
+                _('translation\n%(percent)d%% done'),
+                # Translators: please use your language name instead of
+                # English
+                _('English translation\n%(percent)d%% done'),
+                'Sans', 7,
+                23, 11
+            ),
         )
 
 register_widget(SmallWidget)
+
+
+# Projects and widget files which are currently being rendered
+RENDERING = set()
+RENDERING_LOCK = threading.Lock()
+
+
+def get_widget_filename(project, widget, color, lang=None, extension='png'):
+    '''
+    Returns filename of pre-rendered widget.
+    '''
+    if lang is None:
+        name = '%s-%s.%s' % (widget, color, extension)
+    else:
+        name = '%s-%s-%s.%s' % (widget, color, lang.code, extension)
+    return os.path.join(project.get_widgets_path(), name)
+
+
+def render_widget(project, widget, color, lang=None, extension='png'):
+    '''
+    Renders widget to disk as PNG or SVG image.
+
+    Widget is rendered in its language or in default language if none
+    is specified, so that texts do not depend on who triggered it.
+    '''
+    filename = get_widget_filename(project, widget, color, lang, extension)
+    dirname = os.path.dirname(filename)
+    if not os.path.exists(dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError:
+            # Created meanwhile by other thread
+            pass
+
+    current_language = django_translation.get_language()
+    if lang is None:
+        django_translation.activate(settings.LANGUAGE_CODE)
+    else:
+        django_translation.activate(lang.code)
+    try:
+        obj = WIDGETS[widget](project, color, lang)
+        if extension == 'svg':
+            data = obj.get_svg()
+        else:
+            obj.render()
+            data = obj.get_image()
+    finally:
+        django_translation.activate(current_language)
+
+    # Atomically replace the file so that it is never served incomplete
+    handle, tmpname = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    try:
+        os.write(handle, data)
+    finally:
+        os.close(handle)
+    os.chmod(tmpname, 0644)
+    os.rename(tmpname, filename)
+
+
+def get_widget_placeholder(widget, color, extension='png'):
+    '''
+    Returns widget background without any texts, it is served until the
+    widget is rendered.
+    '''
+    filename = WIDGETS[widget].get_background_filename(color)
+    if extension == 'svg':
+        width, height, dummy = svg.get_png_image(filename)
+        return svg.render_svg(width, height, [svg.render_image(filename)])
+    with open(filename, 'rb') as handle:
+        return handle.read()
+
+
+def render_widget_background(project, widget, color, lang=None,
+                             extension='png'):
+    '''
+    Renders widget in background thread unless it is already being
+    rendered.
+    '''
+    filename = get_widget_filename(project, widget, color, lang, extension)
+
+    with RENDERING_LOCK:
+        if filename in RENDERING:
+            return
+        RENDERING.add(filename)
+
+    def render():
+        try:
+            render_widget(project, widget, color, lang, extension)
+        except Exception as exc:
+            weblate.logger.warning(
+                'failed to render widget %s: %s',
+                filename,
+                str(exc)
+            )
+        finally:
+            with RENDERING_LOCK:
+                RENDERING.discard(filename)
+
+    thread = threading.Thread(target=render)
+    thread.start()
+
+
+def render_project_widgets(project):
+    '''
+    Renders again all widgets of project which were already rendered.
+    '''
+    from lang.models import Language
+
+    # Mark widgets current first, so that any later change
+    # triggers rendering again
+    cache.set(get_widgets_cache_key(project.id), True)
+
+    dirname = project.get_widgets_path()
+    if not os.path.exists(dirname):
+        return
+
+    for name in os.listdir(dirname):
+        name, extension = os.path.splitext(name)
+        if extension not in ('.png', '.svg'):
+            continue
+        parts = name.split('-', 2)
+        if len(parts) < 2 or parts[0] not in WIDGETS:
+            continue
+        if len(parts) == 3:
+            try:
+                lang = Language.objects.get(code=parts[2])
+            except Language.DoesNotExist:
+                continue
+        else:
+            lang = None
+        render_widget(project, parts[0], parts[1], lang, extension[1:])
+
+
+def update_widgets_background(project):
+    '''
+    Renders project widgets in background thread if stats have changed
+    since they were rendered.
+    '''
+    # Nothing has been rendered yet
+    if not os.path.exists(project.get_widgets_path()):
+        return
+
+    if cache.get(get_widgets_cache_key(project.id)) is not None:
+        return
+
+    with RENDERING_LOCK:
+        if project.id in RENDERING:
+            return
+        RENDERING.add(project.id)
+
+    def render_widgets():
+        try:
+            render_project_widgets(project)
+        except Exception as exc:
+            weblate.logger.warning(
+                'failed to render widgets for %s: %s',
+                project.slug,
+                str(exc)
+            )
+        finally:
+            with RENDERING_LOCK:
+                RENDERING.discard(project.id)
+
+    thread = threading.Thread(target=render_widgets)
+    thread.start()
@@ -81,11 +81,30 @@ LAZY_COMMITS = get('LAZY_COMMITS', True)
 # Offload indexing
 OFFLOAD_INDEXING = get('OFFLOAD_INDEXING', False)
 
+# Offload sending of notifications
+OFFLOAD_NOTIFICATIONS = get('OFFLOAD_NOTIFICATIONS', False)
+
+# Number of repositories fetched or pushed in parallel
+PARALLEL_REPOSITORIES = get('PARALLEL_REPOSITORIES', 4)
+
 # Translation locking
 AUTO_LOCK = get('AUTO_LOCK', True)
 AUTO_LOCK_TIME = get('AUTO_LOCK_TIME', 60)
 LOCK_TIME = get('LOCK_TIME', 15 * 60)
 
+# Approximate memory used for caching parsed translation files
+STORE_CACHE_SIZE = get('STORE_CACHE_SIZE', 100 * 1024 * 1024)
+
+# Header to use for offloading file downloads to the web server
+# (eg. X-Sendfile or X-Accel-Redirect)
+SENDFILE_HEADER = get('SENDFILE_HEADER', None)
+
+# URL prefix mapped to GIT_ROOT by the web server (for X-Accel-Redirect)
+SENDFILE_URL = get('SENDFILE_URL', None)
+
+# Requests taking longer (in seconds) are logged by instrumentation
+SLOW_REQUEST_TIME = get('SLOW_REQUEST_TIME', 1.0)
+
 # Where to put Whoosh index
 WHOOSH_INDEX = get('WHOOSH_INDEX', os.path.join(WEB_ROOT, 'whoosh-index'))
 
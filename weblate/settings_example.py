@@ -152,6 +152,7 @@ TEMPLATE_LOADERS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'trans.instrumentation.InstrumentationMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -334,6 +335,12 @@ LAZY_COMMITS = True
 # Offload indexing
 OFFLOAD_INDEXING = False
 
+# Offload sending of notifications
+OFFLOAD_NOTIFICATIONS = False
+
+# Number of repositories fetched or pushed in parallel
+PARALLEL_REPOSITORIES = 4
+
 # Translation locking
 AUTO_LOCK = True
 AUTO_LOCK_TIME = 60
@@ -401,6 +408,18 @@ DEFAULT_FROM_EMAIL = 'noreply@weblate.org'
 #    }
 #}
 
+# Example of counting cache access in instrumentation
+#CACHES = {
+#    'default': {
+#        'BACKEND': 'trans.instrumentation.CountingCache',
+#        'LOCATION': 'counted',
+#    },
+#    'counted': {
+#        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+#        'LOCATION': '127.0.0.1:11211',
+#    },
+#}
+
 # Example for restricting access to logged in users
 #LOGIN_REQUIRED_URLS = (
 #    r'/(.*)$',
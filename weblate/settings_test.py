@@ -30,6 +30,17 @@ GIT_ROOT = '%s/test-repos/' % WEB_ROOT
 # Avoid migrating during testsuite
 SOUTH_TESTS_MIGRATE = False
 
+# Count cache access in instrumentation
+CACHES = {
+    'default': {
+        'BACKEND': 'trans.instrumentation.CountingCache',
+        'LOCATION': 'counted',
+    },
+    'counted': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
 # Test access to Microsoft Translator
 # Do not use in production!
 MT_MICROSOFT_ID = 'weblate'
@@ -49,6 +49,12 @@ PROJECT_LANG = PROJECT + LANGUAGE + '/'
 # URL regexp used as base for widgets
 WIDGET = r'(?P<project>[^/]+)-(?P<widget>[^/-]+)-(?P<color>[^/-]+)'
 
+# URL regexp for image format
+EXTENSION = r'(?P<extension>png|svg)'
+
+# URL regexp for optional chart image name to choose format
+CHART = r'(?:chart\.' + EXTENSION + ')?'
+
 admin.autodiscover()
 
 handler404 = 'trans.views.basic.not_found'
@@ -132,6 +138,11 @@ urlpatterns = patterns(
         'trans.views.basic.review_source',
         name='review_source',
     ),
+    url(
+        r'^projects/' + SUBPROJECT + 'language_pack/$',
+        'trans.views.files.download_language_packs',
+        name='download_language_packs',
+    ),
 
     # Translation pages
     url(
@@ -189,44 +200,44 @@ urlpatterns = patterns(
 
     # Monthly activity
     url(
-        r'^activity/month/$',
+        r'^activity/month/' + CHART + '$',
         'trans.views.charts.monthly_activity',
         name='monthly_activity',
     ),
     url(
-        r'^activity/month/' + PROJECT + '$',
+        r'^activity/month/' + PROJECT + CHART + '$',
         'trans.views.charts.monthly_activity',
         name='monthly_activity_project',
     ),
     url(
-        r'^activity/month/' + SUBPROJECT + '$',
+        r'^activity/month/' + SUBPROJECT + CHART + '$',
         'trans.views.charts.monthly_activity',
         name='monthly_activity_subproject',
     ),
     url(
-        r'^activity/month/' + TRANSLATION + '$',
+        r'^activity/month/' + TRANSLATION + CHART + '$',
         'trans.views.charts.monthly_activity',
         name='monthly_activity_translation',
     ),
 
     # Yearly activity
     url(
-        r'^activity/year/$',
+        r'^activity/year/' + CHART + '$',
         'trans.views.charts.yearly_activity',
         name='yearly_activity',
     ),
     url(
-        r'^activity/year/' + PROJECT + '$',
+        r'^activity/year/' + PROJECT + CHART + '$',
         'trans.views.charts.yearly_activity',
         name='yearly_activity_project',
     ),
     url(
-        r'^activity/year/' + SUBPROJECT + '$',
+        r'^activity/year/' + SUBPROJECT + CHART + '$',
         'trans.views.charts.yearly_activity',
         name='yearly_activity_subproject',
     ),
     url(
-        r'^activity/year/' + TRANSLATION + '$',
+        r'^activity/year/' + TRANSLATION + CHART + '$',
         'trans.views.charts.yearly_activity',
         name='yearly_activity_translation',
     ),
@@ -238,24 +249,24 @@ urlpatterns = patterns(
         name='view_language_activity',
     ),
     url(
-        r'^activity/language/month/' + LANGUAGE + '/$',
+        r'^activity/language/month/' + LANGUAGE + '/' + CHART + '$',
         'trans.views.charts.monthly_language_activity',
         name='monthly_language_activity',
     ),
     url(
-        r'^activity/language/year/' + LANGUAGE + '/$',
+        r'^activity/language/year/' + LANGUAGE + '/' + CHART + '$',
         'trans.views.charts.yearly_language_activity',
         name='yearly_language_activity',
     ),
 
     # Per user activity
     url(
-        r'^activity/user/month/(?P<user>[^/]+)/$',
+        r'^activity/user/month/(?P<user>[^/]+)/' + CHART + '$',
         'trans.views.charts.monthly_user_activity',
         name='monthly_user_activity',
     ),
     url(
-        r'^activity/user/year/(?P<user>[^/]+)/$',
+        r'^activity/user/year/(?P<user>[^/]+)/' + CHART + '$',
         'trans.views.charts.yearly_user_activity',
         name='yearly_user_activity',
     ),
@@ -431,6 +442,16 @@ urlpatterns = patterns(
     ),
 
     # Stats exports
+    url(
+        r'^exports/stats/$',
+        'trans.views.api.export_stats_root',
+        name='export_stats_root',
+    ),
+    url(
+        r'^exports/stats/' + PROJECT + '$',
+        'trans.views.api.export_stats_project',
+        name='export_stats_project',
+    ),
     url(
         r'^exports/stats/' + SUBPROJECT + '$',
         'trans.views.api.export_stats',
@@ -478,12 +499,12 @@ urlpatterns = patterns(
 
     # Engagement widgets
     url(
-        r'^widgets/' + WIDGET + '-' + LANGUAGE + r'\.png$',
+        r'^widgets/' + WIDGET + '-' + LANGUAGE + r'\.' + EXTENSION + '$',
         'trans.views.widgets.render',
         name='widget-image-lang',
     ),
     url(
-        r'^widgets/' + WIDGET + '\.png$',
+        r'^widgets/' + WIDGET + r'\.' + EXTENSION + '$',
         'trans.views.widgets.render',
         name='widget-image',
     ),